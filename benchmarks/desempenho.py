@@ -0,0 +1,240 @@
+"""
+Benchmarks das etapas de produção com dados sintéticos.
+
+Mede conversão de coordenadas, leitura e escrita de KML/KMZ e GeoPackage,
+montagem do mapa e geração do PDF, com polígonos de 10, 1 mil e 100 mil
+vértices, KMZ com milhares de Placemarks e relatórios de 1 a 12 imagens.
+Para cada caso informa o menor tempo entre as repetições, a vazão, o pico
+de memória alocada (tracemalloc, em uma execução à parte) e o tamanho da
+saída, e compara com a linha de base gravada: sai com código 1 se o tempo
+ou a memória piorarem mais que o limiar.
+
+Uso:
+    python benchmarks/desempenho.py [--filtro kmz] [--repeticoes 3] [--limiar 0.25]
+    python benchmarks/desempenho.py --salvar   # grava a linha de base
+"""
+# Bibliotecas padrão do Python
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from functools import lru_cache
+from io import BytesIO
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO_PROJETO)
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.conversao_coordenadas import gms_to_decimal, interpretar_coordenadas
+from extrator.exportacao import FORMATO_GPKG, FORMATO_KMZ, exportar
+from extrator.geometria import ColecaoGeometrias
+from extrator.leitura_kml import carregar_geometrias
+
+ARQUIVO_LINHA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linha_base.json")
+LIMIAR_PADRAO = 0.25  # Piora relativa tolerada antes de acusar regressão
+CENTRO = (-23.5, -46.6)
+
+# ==========================================
+# Dados sintéticos
+# ==========================================
+
+def poligono_sintetico(vertices, centro=CENTRO, raio=0.01, semente=0):
+    """Contorno irregular (lat, lon) com "vertices" pontos ao redor de "centro"."""
+    gerador = np.random.default_rng(semente)
+    angulos = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    raios = raio * (1 + 0.2 * gerador.standard_normal(vertices).clip(-2, 2))
+    return np.column_stack([centro[0] + raios * np.sin(angulos), centro[1] + raios * np.cos(angulos)])
+
+# As coleções e KMZ não mudam entre repetições: são gerados uma vez
+@lru_cache(maxsize=None)
+def colecao_sintetica(feicoes, vertices):
+    colecao = ColecaoGeometrias()
+    for indice in range(feicoes):
+        centro = (CENTRO[0] + (indice // 100) * 0.03, CENTRO[1] + (indice % 100) * 0.03)
+        colecao.adicionar_feicao([[poligono_sintetico(vertices, centro, semente=indice)]], nome=f"Área {indice}")
+    return colecao
+
+@lru_cache(maxsize=None)
+def kmz_sintetico(feicoes, vertices):
+    destino = BytesIO()
+    exportar(colecao_sintetica(feicoes, vertices), FORMATO_KMZ, destino)
+    return destino.getvalue()
+
+def texto_coordenadas(linhas, semente=0):
+    """Texto com coordenadas em GMS, graus decimais e no formato compacto, alternados."""
+    gerador = random.Random(semente)
+    modelos = (
+        lambda lat, lon: f"-{int(lat)}°{int(lat % 1 * 60):02d}'{lat * 3600 % 60:05.2f}\" -{int(lon)}°{int(lon % 1 * 60):02d}'{lon * 3600 % 60:05.2f}\"",
+        lambda lat, lon: f"-{lat:.6f} -{lon:.6f}",
+        lambda lat, lon: f"{int(lat)}{int(lat % 1 * 60):02d}{lat * 3600 % 60:05.2f} {int(lon)}{int(lon % 1 * 60):02d}{lon * 3600 % 60:05.2f}".replace(".", ","),
+    )
+    return "\n".join(
+        modelos[indice % 3](gerador.uniform(20, 25), gerador.uniform(44, 53)) for indice in range(linhas)
+    )
+
+def imagem_sintetica(semente, tamanho=(2000, 1500)):
+    """JPEG com ruído (não comprime bem, como uma foto de satélite)."""
+    from PIL import Image
+
+    gerador = np.random.default_rng(semente)
+    base = gerador.integers(0, 255, (tamanho[1] // 8, tamanho[0] // 8, 3), dtype=np.uint8)
+    imagem = Image.fromarray(base).resize(tamanho)
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def relatorio_sintetico(imagens, semente):
+    relatorio = {
+        "numero_relatorio": "123/2024", "data_relatorio": "01/01/2024", "municipio": "Cotia",
+        "endereco": "Estrada sem número", "lat_gms": "23°30'00\" S", "lon_gms": "46°36'00\" O",
+        "numero_webaia": "98765", "tipo_area": "Área Comum", "bioma": "Mata Atlântica",
+        "fiscalizacao_info": "Nenhuma", "conclusao_fiscalizacao": True, "responsavel": "CB PM ALVES",
+    }
+    # Imagens novas a cada repetição: o cache de imagens não mascara a decodificação
+    relatorio["imagens"] = [
+        {"imagem": imagem_sintetica(semente * 100 + indice), "data": f"{indice + 1:02d}/01/2024", "fonte": "Sentinel"}
+        for indice in range(imagens)
+    ]
+    return relatorio
+
+# ==========================================
+# Casos
+# ==========================================
+
+def _escrever(colecao, formato):
+    destino = BytesIO()
+    exportar(colecao, formato, destino)
+    return destino.getvalue()
+
+def _ler_kmz(dados):
+    colecao = carregar_geometrias(BytesIO(dados), "entrada.kmz")
+    return colecao.total_vertices
+
+def _mapa(colecao):
+    from extrator.mapa import gerar_mapa
+
+    return gerar_mapa(colecao).get_root().render().encode("utf-8")
+
+def _pdf(relatorio):
+    from extrator.relatorio_pdf import gerar_pdf
+
+    return gerar_pdf(relatorio).getvalue()
+
+def montar_casos():
+    """
+    Lista de (nome, unidades, unidade, preparar, executar). "preparar(repeticao)"
+    gera a entrada fora da medição; "executar(entrada)" retorna a saída
+    (bytes para medir o tamanho, ou qualquer outro valor).
+    """
+    casos = [
+        ("coordenadas_texto_100k", 100_000, "linhas", lambda r: texto_coordenadas(100_000), interpretar_coordenadas),
+        ("gms_to_decimal_10k", 10_000, "valores",
+         lambda r: [f"{random.randint(0, 89)}°{random.randint(0, 59)}'{random.uniform(0, 59):.2f}\"" for _ in range(10_000)],
+         lambda valores: [gms_to_decimal(valor) for valor in valores]),
+    ]
+    for vertices in (10, 1_000, 100_000):
+        rotulo = f"{vertices // 1000}k" if vertices >= 1000 else str(vertices)
+        casos += [
+            (f"kmz_escrever_{rotulo}", vertices, "vértices",
+             lambda r, v=vertices: colecao_sintetica(1, v), lambda colecao: _escrever(colecao, FORMATO_KMZ)),
+            (f"kmz_ler_{rotulo}", vertices, "vértices", lambda r, v=vertices: kmz_sintetico(1, v), _ler_kmz),
+        ]
+    casos += [
+        ("kmz_ler_5000_placemarks", 5000 * 200, "vértices", lambda r: kmz_sintetico(5000, 200), _ler_kmz),
+        ("kmz_escrever_5000_placemarks", 5000 * 200, "vértices",
+         lambda r: colecao_sintetica(5000, 200), lambda colecao: _escrever(colecao, FORMATO_KMZ)),
+        ("gpkg_escrever_5000_placemarks", 5000 * 200, "vértices",
+         lambda r: colecao_sintetica(5000, 200), lambda colecao: _escrever(colecao, FORMATO_GPKG)),
+        ("mapa_1k", 1_000, "vértices", lambda r: colecao_sintetica(1, 1_000), _mapa),
+        ("mapa_100k", 100_000, "vértices", lambda r: colecao_sintetica(1, 100_000), _mapa),
+    ]
+    for imagens in (1, 4, 12):
+        casos.append((f"pdf_{imagens}_imagens", imagens, "imagens",
+                      lambda r, n=imagens: relatorio_sintetico(n, semente=n * 1000 + r), _pdf))
+    return casos
+
+def medir(preparar, executar, repeticoes):
+    """
+    Retorna (menor tempo em segundos, pico de memória em KiB, bytes de saída).
+    """
+    tempos = []
+    saida = None
+    for repeticao in range(repeticoes):
+        entrada = preparar(repeticao)
+        inicio = time.perf_counter()
+        saida = executar(entrada)
+        tempos.append(time.perf_counter() - inicio)
+    # Memória em uma execução separada: o tracemalloc deixa tudo mais lento
+    entrada = preparar(repeticoes)
+    tracemalloc.start()
+    executar(entrada)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tamanho = len(saida) if isinstance(saida, (bytes, bytearray)) else None
+    return min(tempos), pico / 1024, tamanho
+
+# ==========================================
+# Linha de base
+# ==========================================
+
+def comparar(nome, resultado, linha_base, limiar):
+    """Lista de regressões (texto) do caso em relação à linha de base."""
+    base = linha_base.get(nome)
+    if not base:
+        return []
+    regressoes = []
+    for campo, rotulo in (("segundos", "tempo"), ("pico_kb", "memória")):
+        if base.get(campo) and resultado[campo] > base[campo] * (1 + limiar):
+            regressoes.append(f"{rotulo} {resultado[campo] / base[campo] - 1:+.0%}")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filtro", default="", help="Expressão regular: roda só os casos cujo nome combina")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Medições por caso (vale a menor)")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_PADRAO, help="Piora relativa tolerada (0.25 = 25%%)")
+    parser.add_argument("--linha-base", default=ARQUIVO_LINHA_BASE, help="Arquivo JSON da linha de base")
+    parser.add_argument("--salvar", action="store_true", help="Grava os resultados como nova linha de base")
+    args = parser.parse_args(argv)
+
+    linha_base = {}
+    if os.path.exists(args.linha_base):
+        with open(args.linha_base, encoding="utf-8") as arquivo:
+            linha_base = json.load(arquivo)["casos"]
+    resultados = {}
+    falhas = 0
+    print(f"{'caso':32} {'tempo':>10} {'vazão':>22} {'pico mem.':>12} {'saída':>12}")
+    for nome, unidades, unidade, preparar, executar in montar_casos():
+        if not re.search(args.filtro, nome):
+            continue
+        segundos, pico_kb, tamanho = medir(preparar, executar, args.repeticoes)
+        resultado = resultados[nome] = {"segundos": segundos, "pico_kb": round(pico_kb), "bytes_saida": tamanho}
+        regressoes = comparar(nome, resultado, linha_base, args.limiar)
+        falhas += bool(regressoes)
+        vazao = f"{unidades / segundos:,.0f} {unidade}/s" if segundos else "-"
+        saida = f"{tamanho / 1024:,.1f} KiB" if tamanho is not None else "-"
+        situacao = f"  [ERRO: {', '.join(regressoes)}]" if regressoes else ""
+        print(f"{nome:32} {segundos * 1000:8.1f} ms {vazao:>22} {pico_kb / 1024:9.1f} MiB {saida:>12}{situacao}")
+    if args.salvar:
+        dados = {
+            "python": platform.python_version(),
+            "maquina": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU(s)",
+            "casos": {**linha_base, **resultados},
+        }
+        with open(args.linha_base, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+            arquivo.write("\n")
+        print(f"Linha de base gravada em {args.linha_base}")
+        return 0
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Orçamento de tempo de importação da interface (python -X importtime).
+
+Para cada módulo abaixo, abre um interpretador novo, importa o Streamlit
+(custo fixo de qualquer execução) e depois o módulo, medindo o tempo
+acumulado informado pelo -X importtime. Também confere que as dependências
+pesadas só são carregadas pelas funções que as usam. Sai com código 1 se
+algum orçamento for excedido.
+
+Uso:
+    python benchmarks/tempo_importacao.py [--repeticoes 5] [--folga 1.0]
+"""
+# Bibliotecas padrão do Python
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento (ms) do import de cada módulo, com o Streamlit já carregado.
+# As páginas incluem o NumPy (~70 ms), usado na conversão de coordenadas.
+ORCAMENTOS_MS = {
+    "coordenadas_extraidas": 20,
+    "pagina_analise": 250,
+    "pagina_extrator": 250,
+}
+
+# Módulos que não podem ser carregados só por importar a página
+PROIBIDOS = {
+    "coordenadas_extraidas": ("numpy", "folium", "reportlab", "PIL"),
+    "pagina_analise": ("folium", "reportlab", "PIL"),
+    "pagina_extrator": ("folium", "reportlab", "PIL"),
+}
+
+_LINHA_IMPORTTIME = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$")
+
+def medir_importacao(modulo):
+    """
+    Importa "modulo" em um processo novo e retorna (milissegundos, módulos carregados).
+    """
+    codigo = f"import json, sys, streamlit; import {modulo}; print(json.dumps(sorted(sys.modules)))"
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=DIRETORIO_PROJETO, capture_output=True, text=True, check=True,
+    )
+    microssegundos = next(
+        int(m.group(1)) for m in map(_LINHA_IMPORTTIME.match, processo.stderr.splitlines()) if m and m.group(2) == modulo
+    )
+    return microssegundos / 1000, set(json.loads(processo.stdout))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5, help="Medições por módulo (vale a menor)")
+    parser.add_argument("--folga", type=float, default=1.0, help="Multiplicador dos orçamentos (máquinas lentas)")
+    args = parser.parse_args(argv)
+
+    falhas = 0
+    for modulo, orcamento in ORCAMENTOS_MS.items():
+        medicoes = [medir_importacao(modulo) for _ in range(args.repeticoes)]
+        tempo = min(ms for ms, _ in medicoes)
+        carregados = medicoes[0][1]
+        proibidos = [nome for nome in PROIBIDOS.get(modulo, ()) if nome in carregados]
+        limite = orcamento * args.folga
+        ok = tempo <= limite and not proibidos
+        falhas += not ok
+        detalhe = f" - carregou {', '.join(proibidos)}" if proibidos else ""
+        print(f"[{'ok' if ok else 'ERRO'}] {modulo}: {tempo:.1f} ms (orçamento {limite:.0f} ms){detalhe}")
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Componente Streamlit do mapa incremental do extrator.
+
+O navegador carrega o Leaflet e o mapa base uma única vez
+(componentes/mapa_incremental/index.html); a cada execução do script só
+as diferenças calculadas por extrator.diferencas_mapa são enviadas.
+"""
+# Bibliotecas padrão do Python
+import os
+
+# Bibliotecas de terceiros
+import streamlit as st
+import streamlit.components.v1 as components
+
+# Módulos do projeto
+from extrator.diferencas_mapa import SincronizadorMapa
+from extrator.instrumentacao import contar, medir
+
+DIRETORIO_COMPONENTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "componentes", "mapa_incremental")
+
+_mapa_incremental = components.declare_component("mapa_incremental", path=DIRETORIO_COMPONENTE)
+
+def mapa_incremental(geometrias, key="mapa_incremental", altura=500):
+    """
+    Exibe "geometrias" no mapa incremental. O estado já enviado fica na
+    sessão, em st.session_state[key + "_sincronizador"].
+    """
+    sincronizador = st.session_state.setdefault(f"{key}_sincronizador", SincronizadorMapa())
+    # O componente devolve {"ressincronizar": n} quando o mapa do navegador
+    # não tem a versão esperada (acabou de ser aberto, por exemplo)
+    pedido = (st.session_state.get(key) or {}).get("ressincronizar")
+    completo = pedido is not None and pedido != sincronizador.ultimo_pedido
+    sincronizador.ultimo_pedido = pedido
+    with medir("mapa.diferencas"):
+        mensagem = sincronizador.mensagem(geometrias, completo=completo)
+    contar("mapa.operacoes", len(mensagem["operacoes"]))
+    _mapa_incremental(mensagem=mensagem, altura=altura, key=key, default=None)
@@ -0,0 +1,33 @@
+"""
+Núcleo do extrator de coordenadas e dos relatórios de análise de ocorrências.
+
+Os módulos deste pacote não dependem do Streamlit e podem ser usados em
+scripts, tarefas agendadas e processos de trabalho:
+
+    conversao_coordenadas .. leitura de coordenadas (GMS, decimal, compacto, UTM)
+    geometria .............. armazenamento colunar de polígonos (ColecaoGeometrias)
+    leitura_kml ............ leitura em fluxo de KML/KMZ
+    leitura_geojson ........ leitura de GeoJSON
+    exportacao ............. escrita em KMZ, GeoJSON, CSV e GeoPackage
+    simplificacao .......... níveis de detalhe para o mapa
+    mapa ................... mapa folium com níveis de detalhe
+    diferencas_mapa ........ diferenças entre estados do mapa incremental
+    indice_espacial ........ índice STR, ponto em polígono, áreas
+    municipios ............. município de uma coordenada
+    imagens ................ ingestão das imagens do relatório
+    deteccao_mudancas ...... perda e ganho de vegetação entre duas imagens
+    modelo_relatorio ....... campos, imagens e chave do relatório
+    mapa_estatico .......... mapa de localização vetorial do PDF
+    relatorio_pdf .......... geração do PDF
+    historico .............. histórico dos relatórios gerados (SQLite)
+    armazenamento .......... armazém de arquivos em disco (LRU e validade)
+    lote_relatorios ........ geração de PDFs em lote
+    lote_kml ............... consolidação de KML/KMZ em lote
+    servico ................ serviço HTTP de relatórios e conversão
+    instrumentacao ......... tempos por etapa, contadores e perfil
+    cli .................... linha de comando (python -m extrator)
+
+A interface Streamlit (coordenadas_extraidas.py e pagina_*.py) é apenas uma
+camada sobre estes módulos. Este arquivo não importa nada, para que cada
+página carregue só o que usa.
+"""
@@ -0,0 +1,7 @@
+# Bibliotecas padrão do Python
+import sys
+
+# Módulos do projeto
+from extrator.cli import main
+
+sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Armazém de arquivos (blobs) em disco, endereçado pelo conteúdo.
+
+Guarda imagens enviadas, PDFs gerados e arquivos exportados fora da
+memória das sessões: a sessão guarda só o Blob (hash, tamanho e nome do
+arquivo) e os bytes são lidos do disco quando necessários. Cada arquivo
+fica em <diretório>/<2 primeiros caracteres do hash>/<hash><extensão>,
+então o mesmo conteúdo enviado por várias sessões ocupa espaço uma vez.
+
+O armazém é limitado em bytes (os arquivos usados há mais tempo saem
+primeiro) e por tempo desde o último uso. O último uso é a data de
+modificação do arquivo, então a ordem sobrevive a reinícios do servidor.
+
+O diretório padrão fica em dados/.cache/blobs, fora do que o Streamlit
+serve: imagens enviadas, relatórios e exportações só chegam ao navegador
+pela sessão que os gerou (download ou PDF embutido na página).
+
+Servir os blobs como arquivos estáticos é opcional: com a variável de
+ambiente EXTRATOR_BLOBS_PUBLICOS=1 (e server.enableStaticServing ligado)
+o armazém fica em static/blobs e a visualização do PDF aponta para
+app/static/blobs/..., sem embutir o conteúdo na página. Esses arquivos
+ficam acessíveis, sem autenticação, a quem tiver a URL enquanto não forem
+descartados; a única proteção é o nome (SHA-256 do conteúdo), que não pode
+ser adivinhado. Use só quando o servidor não for acessível a terceiros.
+"""
+# Bibliotecas padrão do Python
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+# Módulos do projeto
+from extrator.instrumentacao import contar, medir
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_BLOBS = os.path.join(DIRETORIO_RAIZ, "dados", ".cache", "blobs")
+DIRETORIO_ESTATICO = os.path.join(DIRETORIO_RAIZ, "static")
+DIRETORIO_BLOBS_PUBLICOS = os.path.join(DIRETORIO_ESTATICO, "blobs")
+VARIAVEL_BLOBS = "EXTRATOR_BLOBS"
+VARIAVEL_BLOBS_PUBLICOS = "EXTRATOR_BLOBS_PUBLICOS"
+ROTA_ESTATICA = "app/static"  # Caminho em que o Streamlit serve DIRETORIO_ESTATICO
+CAPACIDADE_PADRAO = 512 * 1024 * 1024  # Bytes
+VALIDADE_PADRAO = 24 * 3600  # Segundos desde o último uso
+MAXIMO_CHAVES = 1024  # Associações chave -> blob lembradas por obter()
+
+# Blob guardado: "nome" é o caminho relativo ao diretório do armazém
+Blob = namedtuple("Blob", ["hash", "tamanho", "nome"])
+
+class ArmazemBlobs:
+    """
+    Blobs em "diretorio", com no máximo "capacidade" bytes e descartados
+    "validade" segundos após o último uso. Seguro entre threads.
+    """
+
+    def __init__(self, diretorio, capacidade=CAPACIDADE_PADRAO, validade=VALIDADE_PADRAO, prefixo_url=None):
+        self.diretorio = diretorio
+        self.capacidade = capacidade
+        self.validade = validade
+        self.prefixo_url = prefixo_url
+        self._trava = threading.Lock()
+        self._arquivos = OrderedDict()  # nome -> (tamanho, último uso), do mais antigo ao mais recente
+        self._chaves = OrderedDict()  # chave -> Blob (ver obter)
+        self.total = 0
+        os.makedirs(diretorio, exist_ok=True)
+        self._indexar()
+
+    def _indexar(self):
+        """Lê os arquivos que já estão no diretório (de execuções anteriores)."""
+        arquivos = []
+        for subdiretorio in os.scandir(self.diretorio):
+            if not subdiretorio.is_dir():
+                continue
+            for entrada in os.scandir(subdiretorio.path):
+                if entrada.is_file() and not entrada.name.startswith("."):
+                    estado = entrada.stat()
+                    arquivos.append((estado.st_mtime, f"{subdiretorio.name}/{entrada.name}", estado.st_size))
+        for uso, nome, tamanho in sorted(arquivos):
+            self._arquivos[nome] = (tamanho, uso)
+            self.total += tamanho
+        with self._trava:
+            self._descartar(time.time())
+
+    def caminho(self, blob):
+        """Caminho do arquivo do blob no disco."""
+        return os.path.join(self.diretorio, *blob.nome.split("/"))
+
+    def url(self, blob):
+        """URL relativa do blob servido como arquivo estático, ou None."""
+        return f"{self.prefixo_url}/{blob.nome}" if self.prefixo_url else None
+
+    def _remover(self, nome):
+        tamanho, _ = self._arquivos.pop(nome)
+        self.total -= tamanho
+        try:
+            os.remove(os.path.join(self.diretorio, *nome.split("/")))
+        except FileNotFoundError:
+            pass
+        contar("blobs.descartados")
+
+    def _descartar(self, agora):
+        """Remove os blobs vencidos e, acima da capacidade, os usados há mais tempo."""
+        while self._arquivos:
+            nome, (_, uso) = next(iter(self._arquivos.items()))
+            if self.total <= self.capacidade and agora - uso <= self.validade:
+                break
+            self._remover(nome)
+
+    def _usar(self, nome, agora):
+        tamanho, _ = self._arquivos[nome]
+        self._arquivos[nome] = (tamanho, agora)
+        self._arquivos.move_to_end(nome)
+        try:
+            os.utime(os.path.join(self.diretorio, *nome.split("/")), (agora, agora))
+        except FileNotFoundError:
+            # Apagado por fora: esquece o blob
+            self._arquivos.pop(nome)
+            self.total -= tamanho
+            return False
+        return True
+
+    def guardar(self, dados, extensao="", hash_conteudo=None):
+        """
+        Guarda "dados" (bytes) e retorna o Blob. "hash_conteudo" é o SHA-256
+        já conhecido dos dados (evita recalcular); conteúdo já guardado não
+        é gravado de novo, só marcado como usado.
+        """
+        hash_conteudo = hash_conteudo or hashlib.sha256(dados).hexdigest()
+        nome = f"{hash_conteudo[:2]}/{hash_conteudo}{extensao}"
+        blob = Blob(hash_conteudo, len(dados), nome)
+        agora = time.time()
+        with self._trava:
+            if nome in self._arquivos and self._usar(nome, agora):
+                return blob
+        with medir("blobs.gravar"):
+            caminho = self.caminho(blob)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Grava em um temporário e renomeia: quem lê nunca vê o arquivo pela metade
+            descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix=".")
+            try:
+                with os.fdopen(descritor, "wb") as arquivo:
+                    arquivo.write(dados)
+                os.replace(temporario, caminho)
+            except BaseException:
+                os.remove(temporario)
+                raise
+        with self._trava:
+            if nome not in self._arquivos:
+                self._arquivos[nome] = (len(dados), agora)
+                self.total += len(dados)
+            self._usar(nome, agora)
+            self._descartar(agora)
+        return blob
+
+    def existe(self, blob):
+        """True se o blob ainda está no armazém (e o marca como usado)."""
+        agora = time.time()
+        with self._trava:
+            if blob.nome not in self._arquivos:
+                return False
+            if agora - self._arquivos[blob.nome][1] > self.validade:
+                self._remover(blob.nome)
+                return False
+            return self._usar(blob.nome, agora)
+
+    def ler(self, blob):
+        """Bytes do blob, ou None se já foi descartado."""
+        if not self.existe(blob):
+            return None
+        try:
+            with open(self.caminho(blob), "rb") as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            return None
+
+    def obter(self, chave, gerar, extensao=""):
+        """
+        Blob associado a "chave" (ex.: a chave de um relatório). Se ainda não
+        foi gerado ou já foi descartado, chama gerar() para obter os bytes.
+        """
+        with self._trava:
+            blob = self._chaves.get(chave)
+            if blob is not None:
+                self._chaves.move_to_end(chave)
+        if blob is not None and self.existe(blob):
+            contar("blobs.acerto")
+            return blob
+        contar("blobs.falta")
+        blob = self.guardar(gerar(), extensao)
+        with self._trava:
+            self._chaves[chave] = blob
+            while len(self._chaves) > MAXIMO_CHAVES:
+                self._chaves.popitem(last=False)
+        return blob
+
+    def ler_ou_gerar(self, chave, gerar, extensao=""):
+        """
+        Bytes do blob associado a "chave" (ver obter). Para downloads
+        adiados: se o blob foi descartado (validade ou capacidade) antes do
+        clique, gerar() é chamado de novo em vez de faltar o arquivo.
+        """
+        dados = self.ler(self.obter(chave, gerar, extensao))
+        if dados is None:
+            # Descartado entre obter e ler
+            dados = gerar()
+            self.guardar(dados, extensao)
+        return dados
+
+@lru_cache(maxsize=None)
+def armazem_padrao():
+    """
+    Armazém do processo: o diretório da variável de ambiente
+    EXTRATOR_BLOBS ou dados/.cache/blobs, sem URL. Só com
+    EXTRATOR_BLOBS_PUBLICOS=1 usa static/blobs, servido pelo Streamlit.
+    """
+    if os.environ.get(VARIAVEL_BLOBS_PUBLICOS) == "1":
+        return ArmazemBlobs(DIRETORIO_BLOBS_PUBLICOS, prefixo_url=f"{ROTA_ESTATICA}/blobs")
+    return ArmazemBlobs(os.environ.get(VARIAVEL_BLOBS) or DIRETORIO_BLOBS)
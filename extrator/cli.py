@@ -0,0 +1,128 @@
+"""
+Linha de comando do extrator, sem o Streamlit.
+
+Exemplos:
+    python -m extrator convert area.kmz -o area.geojson
+    python -m extrator convert coordenadas.txt --zona-utm 22 -o area.kmz
+    python -m extrator report relatorio.json -o relatorio.pdf
+    python -m extrator batch manifesto.csv -o relatorios.zip --processos 8
+    python -m extrator merge kmls.zip -o consolidado.kmz --processos 8
+    python -m extrator serve --porta 8765 --processos 4
+
+Em "convert", arquivos que não são KML/KMZ/GeoJSON são lidos como texto,
+com uma coordenada por linha em qualquer formato aceito pela inserção
+manual; os vértices formam um único polígono. Use "-" como entrada ou
+saída para a entrada/saída padrão.
+"""
+# Bibliotecas padrão do Python
+import argparse
+import json
+import os
+import sys
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator import lote_kml, lote_relatorios, servico
+from extrator.conversao_coordenadas import ZONA_UTM_PADRAO, interpretar_coordenadas, linhas_invalidas
+from extrator.exportacao import FORMATO_KMZ, FORMATOS, exportar, formato_pela_extensao
+from extrator.geometria import ColecaoGeometrias
+from extrator.leitura_geojson import carregar_geojson
+from extrator.leitura_kml import carregar_geometrias
+
+def ler_geometrias(entrada, zona_utm=ZONA_UTM_PADRAO):
+    """
+    Lê KML/KMZ, GeoJSON ou texto com coordenadas. Retorna (geometrias, erros).
+    """
+    nome = entrada.lower()
+    if nome.endswith((".kml", ".kmz")):
+        return carregar_geometrias(entrada), []
+    if nome.endswith((".geojson", ".json")):
+        return carregar_geojson(entrada), []
+    if entrada == "-":
+        texto = sys.stdin.read()
+    else:
+        with open(entrada, encoding="utf-8-sig") as arquivo:
+            texto = arquivo.read()
+    convertidas = interpretar_coordenadas(texto, zona_utm=zona_utm)
+    geometrias = ColecaoGeometrias()
+    pontos = np.column_stack([convertidas.latitudes, convertidas.longitudes])[convertidas.validos]
+    if len(pontos):
+        geometrias.adicionar_vertices(pontos)
+    erros = [f"Formato inválido na linha {numero}: {linha}" for numero, linha in linhas_invalidas(convertidas)]
+    return geometrias, erros
+
+def comando_convert(args):
+    try:
+        # Na saída padrão não há extensão: KMZ, se o formato não for informado
+        formato = args.formato or (FORMATO_KMZ if args.saida == "-" else formato_pela_extensao(args.saida))
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    geometrias, erros = ler_geometrias(args.entrada, args.zona_utm)
+    for erro in erros:
+        print(erro, file=sys.stderr)
+    if not geometrias:
+        print("Nenhuma coordenada encontrada.", file=sys.stderr)
+        return 1
+    exportar(geometrias, formato, sys.stdout.buffer if args.saida == "-" else args.saida)
+    print(
+        f"{len(geometrias)} feição(ões), {geometrias.total_poligonos} polígono(s), "
+        f"{geometrias.total_vertices} vértice(s) -> {args.saida} ({formato})",
+        file=sys.stderr,
+    )
+    return 1 if erros else 0
+
+def comando_report(args):
+    if args.relatorio == "-":
+        entrada, diretorio_base = json.load(sys.stdin), os.getcwd()
+    else:
+        with open(args.relatorio, encoding="utf-8") as arquivo:
+            entrada = json.load(arquivo)
+        diretorio_base = os.path.dirname(os.path.abspath(args.relatorio))
+    _, dados, segundos, erro = lote_relatorios.renderizar_entrada(0, entrada, diretorio_base)
+    if erro:
+        print(f"Erro ao gerar o relatório: {erro}", file=sys.stderr)
+        return 1
+    saida = args.saida or os.path.splitext(os.path.basename(args.relatorio))[0] + ".pdf"
+    if saida == "-":
+        sys.stdout.buffer.write(dados)
+    else:
+        with open(saida, "wb") as arquivo:
+            arquivo.write(dados)
+    print(f"Relatório gerado em {segundos:.2f}s -> {saida}", file=sys.stderr)
+    return 0
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="python -m extrator", description="Extrator de coordenadas e relatórios de análise de ocorrências.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    convert = comandos.add_parser("convert", help="Converte KML/KMZ, GeoJSON ou texto de coordenadas")
+    convert.add_argument("entrada", help="Arquivo de entrada ('-' para ler texto da entrada padrão)")
+    convert.add_argument("-o", "--saida", default="poligono.kmz", help="Arquivo de saída ('-' para a saída padrão)")
+    convert.add_argument("-f", "--formato", choices=list(FORMATOS), help="Formato de saída (padrão: pela extensão da saída; KMZ na saída padrão)")
+    convert.add_argument("--zona-utm", type=int, default=ZONA_UTM_PADRAO, help="Fuso UTM das linhas que não o informam")
+    convert.set_defaults(funcao=comando_convert)
+
+    report = comandos.add_parser("report", help="Gera o PDF de um relatório descrito em JSON")
+    report.add_argument("relatorio", help="JSON com os campos do relatório (imagens relativas ao arquivo)")
+    report.add_argument("-o", "--saida", help="PDF de saída ('-' para a saída padrão)")
+    report.set_defaults(funcao=comando_report)
+
+    batch = comandos.add_parser("batch", help="Gera relatórios em lote a partir de um manifesto JSON/CSV")
+    lote_relatorios.configurar_argumentos(batch)
+    batch.set_defaults(funcao=lote_relatorios.executar)
+
+    merge = comandos.add_parser("merge", help="Consolida os KML/KMZ de um diretório ou ZIP em um único arquivo")
+    lote_kml.configurar_argumentos(merge)
+    merge.set_defaults(funcao=lote_kml.executar)
+
+    serve = comandos.add_parser("serve", help="Serviço HTTP local de relatórios e conversão (ver extrator.servico)")
+    servico.configurar_argumentos(serve)
+    serve.set_defaults(funcao=servico.executar)
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    return args.funcao(args)
@@ -0,0 +1,277 @@
+"""
+Conversão em massa de coordenadas digitadas ou coladas.
+
+Cada linha traz um par de coordenadas em qualquer um dos formatos aceitos,
+detectado automaticamente:
+
+    GMS ........ -24°01'37.72" -49°21'42.51"   (ou 24°01'37.72"S 49°21'42.51"O)
+    Decimal .... -24.027144 -49.361808          (vírgula decimal também é aceita)
+    Compacto ... 240137,72 492142,51            (GGMMSS,ss, hemisfério sul/oeste)
+    UTM ........ 22J 745000 7340000             (SIRGAS 2000; zona opcional)
+
+O norte UTM não começa com zero: "240137,72 0492142,51" é o par compacto
+GGMMSS,ss/GGGMMSS,ss, não leste/norte.
+
+Todas as linhas são reconhecidas por uma única expressão regular compilada
+e a conversão numérica é feita de uma vez com NumPy. O resultado traz os
+arrays de latitude/longitude e uma máscara com as linhas válidas, em vez de
+interromper a leitura a cada erro.
+"""
+# Bibliotecas padrão do Python
+import re
+from collections import namedtuple
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.instrumentacao import medir
+
+ZONA_UTM_PADRAO = 23  # Fuso da maior parte da área do 5° BPAMB
+
+FORMATO_INVALIDO = ""
+FORMATO_GMS = "gms"
+FORMATO_DECIMAL = "decimal"
+FORMATO_COMPACTO = "compacto"
+FORMATO_UTM = "utm"
+
+# Faixas aceitas nas coordenadas UTM (fora delas a linha é inválida)
+LESTE_UTM_MINIMO, LESTE_UTM_MAXIMO = 100_000, 900_000
+NORTE_UTM_MAXIMO = 10_000_000
+LATITUDE_UTM_MINIMA, LATITUDE_UTM_MAXIMA = -80, 84
+
+CoordenadasConvertidas = namedtuple(
+    "CoordenadasConvertidas", ["latitudes", "longitudes", "validos", "formatos", "linhas", "numeros_linhas"]
+)
+
+def _padrao_valor(prefixo):
+    """
+    Expressão de uma coordenada isolada (GMS, compacta ou decimal).
+    """
+    return (
+        rf"(?P<{prefixo}_sinal>[-+]?)\s*(?:"
+        # GMS: 24°01'37.72" (aceita º, espaços, aspas tipográficas e '' no lugar de ")
+        rf"(?P<{prefixo}_g>\d{{1,3}})\s*[°º]\s*(?P<{prefixo}_m>\d{{1,2}})\s*['′’]\s*"
+        rf"(?P<{prefixo}_s>\d{{1,2}}(?:[.,]\d+)?)\s*(?:\"|″|”|''|’’)?"
+        # Compacto: 240137,72 (GGMMSS,ss ou GGGMMSS,ss)
+        rf"|(?P<{prefixo}_c>\d{{6,7}}(?:[.,]\d+)?)"
+        # Decimal: -24.027144 ou -24,027144
+        rf"|(?P<{prefixo}_d>\d{{1,3}}(?:[.,]\d+)?)\s*°?"
+        rf")\s*(?P<{prefixo}_h>[NSEWLO])?"
+    )
+
+_SEPARADOR = r"(?:\s*[;\t]\s*|\s*,\s+|\s*,(?=[-+\d])|\s+)"
+
+_PADRAO_UTM = (
+    r"(?:(?P<zona>\d{1,2})\s*(?P<banda>[C-HJ-NP-X])?\s*[\s;,]\s*)?"
+    r"(?P<leste>\d{6}(?:[.,]\d+)?)\s*(?:mE|E)?"
+    + _SEPARADOR +
+    r"(?P<norte>[1-9]\d{6}(?:[.,]\d+)?)\s*(?:mN|N)?"
+)
+
+_PADRAO_LINHA = re.compile(
+    r"^\s*(?:" + _PADRAO_UTM + "|" + _padrao_valor("lat") + _SEPARADOR + _padrao_valor("lon") + r")\s*$",
+    re.IGNORECASE,
+)
+_PADRAO_VALOR = re.compile(r"^\s*" + _padrao_valor("v") + r"\s*$", re.IGNORECASE)
+
+def _numeros(textos):
+    """Converte uma lista de strings (ou None) em array float, com NaN nas ausentes."""
+    return np.array(
+        [t.replace(",", ".") if t else "nan" for t in textos], dtype=np.float64
+    )
+
+def _valores_decimais(grupos, prefixo):
+    """
+    Converte os grupos capturados de uma coordenada em graus decimais.
+
+    Retorna (valores, formatos, validos) como arrays.
+    """
+    sinal = np.array([g[f"{prefixo}_sinal"] or "" for g in grupos])
+    hemisferio = np.array([(g[f"{prefixo}_h"] or "").upper() for g in grupos])
+    graus = _numeros([g[f"{prefixo}_g"] for g in grupos])
+    minutos = _numeros([g[f"{prefixo}_m"] for g in grupos])
+    segundos = _numeros([g[f"{prefixo}_s"] for g in grupos])
+    compacto = _numeros([g[f"{prefixo}_c"] for g in grupos])
+    decimal = _numeros([g[f"{prefixo}_d"] for g in grupos])
+
+    e_gms = ~np.isnan(graus)
+    e_compacto = ~np.isnan(compacto)
+    # O formato compacto GGMMSS,ss é decomposto com a mesma aritmética de
+    # converter_coordenada
+    graus = np.where(e_compacto, compacto // 10000, graus)
+    minutos = np.where(e_compacto, (compacto % 10000) // 100, minutos)
+    segundos = np.where(e_compacto, compacto % 100, segundos)
+
+    valores = np.where(e_gms | e_compacto, graus + minutos / 60 + segundos / 3600, decimal)
+    negativo = (sinal == "-") | np.isin(hemisferio, ["S", "W", "O"])
+    # Sem sinal explícito, o formato compacto é do hemisfério sul/oeste
+    negativo |= e_compacto & (sinal == "") & (hemisferio == "")
+    valores = np.where(negativo, -valores, valores)
+
+    validos = ~np.isnan(valores) & np.where(e_gms | e_compacto, (minutos < 60) & (segundos < 60), True)
+    formatos = np.where(e_gms, FORMATO_GMS, np.where(e_compacto, FORMATO_COMPACTO, FORMATO_DECIMAL))
+    return valores, formatos, validos
+
+def utm_para_geograficas(leste, norte, zona, hemisferio_sul=True):
+    """
+    Converte coordenadas UTM (SIRGAS 2000 / GRS80) em latitude e longitude.
+
+    Aceita arrays (ou escalares) para "leste", "norte", "zona" e
+    "hemisferio_sul". Usa as séries da projeção transversa de Mercator
+    (Snyder, 1987), com erro bem abaixo de um centímetro dentro do fuso.
+    """
+    leste, norte, zona = np.broadcast_arrays(
+        np.asarray(leste, dtype=np.float64), np.asarray(norte, dtype=np.float64), np.asarray(zona, dtype=np.float64)
+    )
+    a = 6378137.0
+    f = 1 / 298.257222101
+    k0 = 0.9996
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+
+    x = leste - 500000.0
+    y = np.where(hemisferio_sul, norte - 10000000.0, norte)
+    mu = y / k0 / (a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+    phi1 = (
+        mu
+        + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu)
+        + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+        + (151 * e1 ** 3 / 96) * np.sin(6 * mu)
+        + (1097 * e1 ** 4 / 512) * np.sin(8 * mu)
+    )
+    sen, cos, tan = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+    c1 = ep2 * cos ** 2
+    t1 = tan ** 2
+    n1 = a / np.sqrt(1 - e2 * sen ** 2)
+    r1 = a * (1 - e2) / (1 - e2 * sen ** 2) ** 1.5
+    d = x / (n1 * k0)
+
+    latitude = phi1 - (n1 * tan / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720
+    )
+    longitude = (
+        d
+        - (1 + 2 * t1 + c1) * d ** 3 / 6
+        + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120
+    ) / cos
+    meridiano_central = zona * 6 - 183
+    return np.degrees(latitude), meridiano_central + np.degrees(longitude)
+
+@medir("coordenadas.interpretar")
+def interpretar_coordenadas(texto, zona_utm=ZONA_UTM_PADRAO, hemisferio_sul=True):
+    """
+    Converte um bloco de texto (uma coordenada "lat lon" por linha).
+
+    Linhas em branco são ignoradas. "zona_utm" e "hemisferio_sul" valem para
+    as linhas UTM que não informam a zona/banda. Retorna
+    CoordenadasConvertidas com um item por linha não vazia; as linhas com
+    "validos" falso não puderam ser interpretadas e ficam com NaN;
+    "numeros_linhas" traz o número (a partir de 1) de cada linha no texto.
+    """
+    numeradas = [(numero, linha) for numero, linha in enumerate(texto.splitlines(), 1) if linha.strip()]
+    linhas = [linha for _, linha in numeradas]
+    total = len(linhas)
+    correspondencias = [_PADRAO_LINHA.match(linha) for linha in linhas]
+    reconhecidas = np.array([c is not None for c in correspondencias], dtype=bool)
+
+    latitudes = np.full(total, np.nan)
+    longitudes = np.full(total, np.nan)
+    formatos = np.full(total, FORMATO_INVALIDO, dtype=object)
+    validos = np.zeros(total, dtype=bool)
+
+    e_utm = np.array([c is not None and c["norte"] is not None for c in correspondencias], dtype=bool)
+    if e_utm.any():
+        grupos = [correspondencias[i] for i in np.flatnonzero(e_utm)]
+        zonas = np.array([float(g["zona"]) if g["zona"] else zona_utm for g in grupos])
+        bandas = [(g["banda"] or "").upper() for g in grupos]
+        sul = np.array([banda < "N" if banda else hemisferio_sul for banda in bandas], dtype=bool)
+        leste, norte = _numeros([g["leste"] for g in grupos]), _numeros([g["norte"] for g in grupos])
+        lat, lon = utm_para_geograficas(leste, norte, zonas, sul)
+        latitudes[e_utm], longitudes[e_utm] = lat, lon
+        formatos[e_utm] = FORMATO_UTM
+        validos[e_utm] = (
+            (zonas >= 1) & (zonas <= 60)
+            & (leste >= LESTE_UTM_MINIMO) & (leste <= LESTE_UTM_MAXIMO) & (norte <= NORTE_UTM_MAXIMO)
+            & (lat >= LATITUDE_UTM_MINIMA) & (lat <= LATITUDE_UTM_MAXIMA)
+        )
+
+    e_geografica = reconhecidas & ~e_utm
+    if e_geografica.any():
+        grupos = [correspondencias[i] for i in np.flatnonzero(e_geografica)]
+        lat, formato_lat, lat_valida = _valores_decimais(grupos, "lat")
+        lon, formato_lon, lon_valida = _valores_decimais(grupos, "lon")
+        latitudes[e_geografica], longitudes[e_geografica] = lat, lon
+        formatos[e_geografica] = np.where(formato_lat == formato_lon, formato_lat, np.char.add(np.char.add(formato_lat, "/"), formato_lon))
+        validos[e_geografica] = lat_valida & lon_valida
+
+    validos &= (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+    latitudes[~validos] = np.nan
+    longitudes[~validos] = np.nan
+    return CoordenadasConvertidas(latitudes, longitudes, validos, formatos, linhas, [numero for numero, _ in numeradas])
+
+def converter_valores(valores):
+    """
+    Converte uma coluna de coordenadas isoladas (ex.: coluna de um CSV).
+
+    Cada item pode estar em GMS, decimal ou no formato compacto. Retorna
+    (graus_decimais, validos); itens inválidos ficam com NaN.
+    """
+    textos = ["" if v is None else str(v) for v in valores]
+    correspondencias = [_PADRAO_VALOR.match(t) for t in textos]
+    reconhecidos = np.array([c is not None for c in correspondencias], dtype=bool)
+    resultado = np.full(len(textos), np.nan)
+    validos = np.zeros(len(textos), dtype=bool)
+    if reconhecidos.any():
+        grupos = [correspondencias[i] for i in np.flatnonzero(reconhecidos)]
+        convertidos, _, convertidos_validos = _valores_decimais(grupos, "v")
+        convertidos_validos &= np.abs(convertidos) <= 180
+        resultado[reconhecidos] = np.where(convertidos_validos, convertidos, np.nan)
+        validos[reconhecidos] = convertidos_validos
+    return resultado, validos
+
+def linhas_invalidas(convertidas):
+    """Lista (número da linha no texto, conteúdo) das linhas que não foram convertidas."""
+    return [(convertidas.numeros_linhas[i], convertidas.linhas[i]) for i in np.flatnonzero(~convertidas.validos)]
+
+# ==========================================
+# Conversões individuais usadas nos formulários
+# ==========================================
+
+def gms_to_decimal(gms_str):
+    match = re.match(r"(-?\d+)°(\d+)'([\d\.]+)\"?", gms_str.strip(), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Formato inválido: {gms_str}")
+    graus, minutos, segundos = map(float, match.groups())
+    decimal = abs(graus) + (minutos / 60) + (segundos / 3600)
+    return -decimal if graus < 0 else decimal
+
+def decimal_to_gms(coord, is_latitude=True):
+    abs_val = abs(coord)
+    graus = int(abs_val)
+    minutos = int((abs_val - graus) * 60)
+    segundos = (abs_val - graus - minutos / 60) * 3600
+    sinal = "-" if coord < 0 else ""
+    return f"{sinal}{graus}°{minutos:02d}'{segundos:.2f}\""
+
+# Função para converter coordenadas no formato 123456,78 para -12°34'56,78"
+def converter_coordenada(coord):
+    try:
+        # Remove vírgulas e converte para float
+        coord = float(coord.replace(",", "."))
+        # Separa graus, minutos e segundos
+        graus = int(coord // 10000)
+        minutos = int((coord % 10000) // 100)
+        segundos = coord % 100
+        return f"-{graus}°{minutos:02d}'{segundos:.2f}\""
+    except Exception as e:
+        return "Formato inválido"
+
+def decimal_para_gms(valor):
+    graus = int(valor)
+    minutos = int((abs(valor) - abs(graus)) * 60)
+    segundos = (abs(valor) - abs(graus) - minutos / 60) * 3600
+    return f"{graus}°{minutos:02d}'{segundos:.2f}\""
@@ -0,0 +1,143 @@
+"""
+Detecção de mudanças na vegetação entre duas imagens datadas.
+
+As duas imagens são levadas a uma grade comum (no máximo LADO_GRADE px no
+lado maior; os JPEG já são decodificados em escala reduzida pelo draft do
+Pillow, então uma foto de 20 megapixels não é expandida por inteiro na
+memória). Em cada bloco de LINHAS_POR_BLOCO linhas calcula-se o índice de
+excesso de verde normalizado, ExG = (2G - R - B) / (R + G + B): pixels com
+vegetação antes e sem depois (com queda do índice acima de LIMIAR_QUEDA)
+são perda, o inverso é ganho. A máscara é limpa em células de
+LADO_CELULA x LADO_CELULA pixels, que só contam como mudança se a maioria
+dos pixels mudou, para descartar ruído e pequenos desalinhamentos.
+
+O Pillow é importado só quando uma comparação é feita.
+"""
+# Bibliotecas padrão do Python
+from collections import namedtuple
+from io import BytesIO
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.instrumentacao import medir
+
+LADO_GRADE = 1024
+LINHAS_POR_BLOCO = 256
+LADO_CELULA = 4
+LIMIAR_VEGETACAO = 0.05  # ExG normalizado acima disso conta como vegetação
+LIMIAR_QUEDA = 0.08  # Variação mínima do ExG para considerar mudança
+PERCENTUAL_SUGESTAO = 1.0  # Perda (% da área) a partir da qual a fiscalização é sugerida
+LADO_SOBREPOSICAO = 640
+QUALIDADE_JPEG = 85
+
+SUGESTAO_FISCALIZACAO = "conclusao_fiscalizacao"
+SUGESTAO_ENCERRAMENTO = "conclusao_encerramento"
+
+SEM_MUDANCA, PERDA, GANHO = 0, 1, 2
+_CORES_MASCARA = np.array([[0, 0, 0], [230, 30, 30], [40, 200, 40]], dtype=np.uint8)
+
+ResultadoMudancas = namedtuple("ResultadoMudancas", [
+    "tamanho_grade",          # (largura, altura) da grade comparada
+    "percentual_perda",       # % da área com perda de vegetação
+    "percentual_ganho",       # % da área com ganho de vegetação
+    "vegetacao_antes",        # % da área com vegetação na primeira imagem
+    "vegetacao_depois",       # % da área com vegetação na segunda imagem
+    "mascara",                # array (altura, largura) com SEM_MUDANCA, PERDA ou GANHO
+    "sobreposicao",           # JPEG da segunda imagem com a máscara sobreposta
+    "sugestao",               # SUGESTAO_FISCALIZACAO ou SUGESTAO_ENCERRAMENTO
+])
+
+def _tamanho_na_grade(tamanho, lado=LADO_GRADE):
+    largura, altura = tamanho
+    escala = min(1.0, lado / max(largura, altura))
+    # Múltiplos de LADO_CELULA, para a limpeza em células
+    return (
+        max(LADO_CELULA, int(largura * escala) // LADO_CELULA * LADO_CELULA),
+        max(LADO_CELULA, int(altura * escala) // LADO_CELULA * LADO_CELULA),
+    )
+
+def carregar_na_grade(dados, tamanho=None):
+    """
+    Decodifica a imagem (bytes) como array RGB uint8. Sem "tamanho", usa a
+    proporção da própria imagem limitada a LADO_GRADE; com "tamanho"
+    (largura, altura), reamostra exatamente para ele.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(dados)) as imagem:
+        alvo = tamanho or _tamanho_na_grade(imagem.size)
+        imagem.draft("RGB", alvo)
+        imagem = ImageOps.exif_transpose(imagem).convert("RGB")
+        if tamanho is None:
+            alvo = _tamanho_na_grade(imagem.size)
+        imagem = imagem.resize(alvo, Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(imagem)
+
+def excesso_verde(rgb):
+    """ExG normalizado (float32) de um array RGB uint8."""
+    rgb = rgb.astype(np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (2 * g - r - b) / (r + g + b + 1e-6)
+
+def _limpar_em_celulas(mascara):
+    """Cada célula vira a classe da maioria dos seus pixels (ou SEM_MUDANCA)."""
+    altura, largura = mascara.shape
+    formato = (altura // LADO_CELULA, LADO_CELULA, largura // LADO_CELULA, LADO_CELULA)
+    metade = LADO_CELULA * LADO_CELULA / 2
+    celulas = np.zeros(formato[::2], dtype=np.uint8)
+    for classe in (PERDA, GANHO):
+        celulas[(mascara == classe).reshape(formato).sum(axis=(1, 3)) > metade] = classe
+    return celulas.repeat(LADO_CELULA, axis=0).repeat(LADO_CELULA, axis=1)
+
+def _sobreposicao(rgb, mascara):
+    from PIL import Image
+
+    # Escurece a imagem e pinta as mudanças por cima
+    saida = (rgb * 0.6).astype(np.uint8)
+    mudou = mascara != SEM_MUDANCA
+    saida[mudou] = _CORES_MASCARA[mascara[mudou]]
+    imagem = Image.fromarray(saida)
+    imagem.thumbnail((LADO_SOBREPOSICAO, LADO_SOBREPOSICAO), Image.LANCZOS)
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=QUALIDADE_JPEG)
+    return buffer.getvalue()
+
+@medir("mudancas.comparar")
+def comparar_imagens(antes, depois):
+    """
+    Compara duas imagens (bytes de PNG/JPEG, a mais antiga primeiro) e
+    retorna um ResultadoMudancas.
+    """
+    with medir("mudancas.decodificar"):
+        rgb_antes = carregar_na_grade(antes)
+        altura, largura = rgb_antes.shape[:2]
+        rgb_depois = carregar_na_grade(depois, (largura, altura))
+    mascara = np.zeros((altura, largura), dtype=np.uint8)
+    vegetacao_antes = vegetacao_depois = 0
+    with medir("mudancas.indice"):
+        for inicio in range(0, altura, LINHAS_POR_BLOCO):
+            bloco = slice(inicio, inicio + LINHAS_POR_BLOCO)
+            exg_antes, exg_depois = excesso_verde(rgb_antes[bloco]), excesso_verde(rgb_depois[bloco])
+            verde_antes, verde_depois = exg_antes > LIMIAR_VEGETACAO, exg_depois > LIMIAR_VEGETACAO
+            variacao = exg_depois - exg_antes
+            mascara[bloco][verde_antes & ~verde_depois & (variacao < -LIMIAR_QUEDA)] = PERDA
+            mascara[bloco][~verde_antes & verde_depois & (variacao > LIMIAR_QUEDA)] = GANHO
+            vegetacao_antes += int(np.count_nonzero(verde_antes))
+            vegetacao_depois += int(np.count_nonzero(verde_depois))
+        mascara = _limpar_em_celulas(mascara)
+    total = altura * largura
+    percentual_perda = 100 * int(np.count_nonzero(mascara == PERDA)) / total
+    with medir("mudancas.sobreposicao"):
+        sobreposicao = _sobreposicao(rgb_depois, mascara)
+    return ResultadoMudancas(
+        tamanho_grade=(largura, altura),
+        percentual_perda=percentual_perda,
+        percentual_ganho=100 * int(np.count_nonzero(mascara == GANHO)) / total,
+        vegetacao_antes=100 * vegetacao_antes / total,
+        vegetacao_depois=100 * vegetacao_depois / total,
+        mascara=mascara,
+        sobreposicao=sobreposicao,
+        sugestao=SUGESTAO_FISCALIZACAO if percentual_perda >= PERCENTUAL_SUGESTAO else SUGESTAO_ENCERRAMENTO,
+    )
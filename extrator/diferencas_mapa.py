@@ -0,0 +1,117 @@
+"""
+Diferenças entre dois estados dos polígonos do extrator, para atualizar o
+mapa no navegador sem reenviar toda a geometria.
+
+Cada feição da ColecaoGeometrias é uma camada do mapa. O
+SincronizadorMapa guarda a última versão enviada e, a cada execução,
+produz só as operações que levam o mapa do navegador ao estado atual:
+vértices anexados, removidos do fim ou movidos em um anel, anéis
+substituídos e camadas novas ou removidas. Incluir um vértice em um
+polígono de 100 mil vértices custa algumas dezenas de bytes.
+
+Mensagem enviada ao navegador:
+    {"versao": n, "base": versão a que as operações se aplicam (None = do zero),
+     "operacoes": [...], "enquadrar": [[lat_min, lon_min], [lat_max, lon_max]] ou None}
+
+Operações ("op"):
+    limpar                                  remove todas as camadas
+    camada   id, nome, estrutura, aneis     cria ou substitui uma camada
+    remover  id                             remove a camada
+    nome     id, nome                       renomeia a camada
+    anexar   id, anel, pontos               acrescenta vértices ao fim do anel
+    truncar  id, anel, tamanho              mantém só os "tamanho" primeiros vértices
+    mover    id, anel, indices, pontos      troca os vértices nas posições dadas
+    anel     id, anel, pontos               substitui o anel inteiro
+
+"estrutura" é o número de anéis de cada polígono da camada; "anel" é o
+índice do anel na lista achatada de anéis da camada.
+"""
+# Bibliotecas de terceiros
+import numpy as np
+
+CASAS_DECIMAIS = 7  # ~1 cm, suficiente para o mapa
+FRACAO_MAXIMA_MOVIDOS = 0.5  # Acima disso, o anel é reenviado inteiro
+
+def _pontos(anel):
+    return anel.tolist()
+
+def instantaneo(colecao):
+    """
+    Estado do mapa para a coleção: {id: (nome, estrutura, [anéis])}, com as
+    coordenadas arredondadas para CASAS_DECIMAIS.
+    """
+    coordenadas = np.round(colecao.coordenadas, CASAS_DECIMAIS)
+    inicio_aneis = colecao.inicio_aneis
+    camadas = {}
+    for indice in range(len(colecao)):
+        estrutura, aneis = [], []
+        for poligono in colecao.poligonos_da_feicao(indice):
+            indices_aneis = colecao.aneis_do_poligono(poligono)
+            estrutura.append(len(indices_aneis))
+            aneis.extend(coordenadas[inicio_aneis[anel]:inicio_aneis[anel + 1]] for anel in indices_aneis)
+        camadas[indice] = (colecao.nomes[indice], tuple(estrutura), aneis)
+    return camadas
+
+def _operacao_camada(identificador, camada):
+    nome, estrutura, aneis = camada
+    return {"op": "camada", "id": identificador, "nome": nome, "estrutura": list(estrutura), "aneis": [_pontos(anel) for anel in aneis]}
+
+def _diferencas_anel(identificador, indice, antigo, novo):
+    if len(antigo) == len(novo):
+        movidos = np.flatnonzero((antigo != novo).any(axis=1))
+        if not len(movidos):
+            return []
+        if len(movidos) <= FRACAO_MAXIMA_MOVIDOS * len(novo):
+            return [{"op": "mover", "id": identificador, "anel": indice, "indices": movidos.tolist(), "pontos": _pontos(novo[movidos])}]
+    elif len(novo) > len(antigo) and np.array_equal(novo[:len(antigo)], antigo):
+        return [{"op": "anexar", "id": identificador, "anel": indice, "pontos": _pontos(novo[len(antigo):])}]
+    elif len(novo) < len(antigo) and np.array_equal(antigo[:len(novo)], novo):
+        return [{"op": "truncar", "id": identificador, "anel": indice, "tamanho": len(novo)}]
+    return [{"op": "anel", "id": identificador, "anel": indice, "pontos": _pontos(novo)}]
+
+def diferencas(anterior, atual):
+    """Operações que transformam o estado "anterior" no "atual" (ver instantaneo)."""
+    operacoes = [{"op": "remover", "id": identificador} for identificador in anterior if identificador not in atual]
+    for identificador, camada in atual.items():
+        antiga = anterior.get(identificador)
+        # Camada nova ou com outra divisão em polígonos/anéis: vai inteira
+        if antiga is None or antiga[1] != camada[1]:
+            operacoes.append(_operacao_camada(identificador, camada))
+            continue
+        if antiga[0] != camada[0]:
+            operacoes.append({"op": "nome", "id": identificador, "nome": camada[0]})
+        for indice, (anel_antigo, anel_novo) in enumerate(zip(antiga[2], camada[2])):
+            operacoes.extend(_diferencas_anel(identificador, indice, anel_antigo, anel_novo))
+    return operacoes
+
+class SincronizadorMapa:
+    """
+    Lembra o que já foi enviado ao mapa de uma sessão e gera as mensagens
+    seguintes.
+    """
+
+    def __init__(self):
+        self.versao = 0
+        self.estado = {}
+        self.ultimo_pedido = None  # Último pedido de ressincronização atendido
+
+    def mensagem(self, colecao, completo=False):
+        """
+        Mensagem que leva o mapa ao estado de "colecao". Com completo=True
+        (mapa recém-aberto ou fora de sincronia) o mapa é refeito do zero.
+        """
+        atual = instantaneo(colecao)
+        if completo:
+            operacoes = [{"op": "limpar"}] + [_operacao_camada(identificador, camada) for identificador, camada in atual.items()]
+            base = None
+        else:
+            operacoes = diferencas(self.estado, atual)
+            base = self.versao
+        enquadrar = None
+        if operacoes and (completo or not self.estado) and colecao.total_vertices:
+            (lat_min, lon_min), (lat_max, lon_max) = colecao.limites()
+            enquadrar = [[float(lat_min), float(lon_min)], [float(lat_max), float(lon_max)]]
+        if operacoes or completo:
+            self.versao += 1
+        self.estado = atual
+        return {"versao": self.versao, "base": base, "operacoes": operacoes, "enquadrar": enquadrar}
@@ -0,0 +1,375 @@
+"""
+Exportação de uma ColecaoGeometrias em KMZ, KML, GeoJSON, CSV (decimal ou
+decimal e GMS) ou GeoPackage.
+
+Os arquivos são escritos em fluxo, feição a feição, direto no destino (o
+KML vai direto para dentro do zip do KMZ). As coordenadas são formatadas
+em blocos a partir dos arrays da coleção, sem montar uma árvore de objetos
+do documento inteiro. Assim a memória usada não cresce com o número de
+polígonos.
+"""
+# Bibliotecas padrão do Python
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import zipfile
+from collections import namedtuple
+from xml.sax.saxutils import escape, quoteattr
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.geometria import formatar_gms
+from extrator.instrumentacao import medir
+
+FORMATO_KMZ = "kmz"
+FORMATO_KML = "kml"
+FORMATO_GEOJSON = "geojson"
+FORMATO_CSV = "csv"
+FORMATO_CSV_GMS = "csv_gms"
+FORMATO_GPKG = "gpkg"
+
+VERTICES_POR_BLOCO = 4096
+CASAS_DECIMAIS = 8  # ~1 mm
+
+# Cores no formato do KML: aabbggrr (o padrão segue o azul do mapa)
+EstiloKml = namedtuple("EstiloKml", ["cor_linha", "largura_linha", "cor_preenchimento"])
+ESTILO_PADRAO = EstiloKml("ffff0000", 2, "66ff0000")
+
+def _escrever_pontos(partes, pontos, formato, separador):
+    """
+    Acrescenta a "partes" o texto dos pontos (n, 2), em blocos de
+    VERTICES_POR_BLOCO, formatando cada bloco com uma única operação.
+    """
+    for inicio in range(0, len(pontos), VERTICES_POR_BLOCO):
+        bloco = pontos[inicio:inicio + VERTICES_POR_BLOCO]
+        if inicio:
+            partes.append(separador)
+        partes.append(separador.join((formato,) * len(bloco)) % tuple(bloco.ravel().tolist()))
+
+def _abrir_destino(destino):
+    """
+    Permite usar um caminho ou um arquivo binário já aberto como destino.
+    Retorna (arquivo, deve_fechar).
+    """
+    if isinstance(destino, (str, os.PathLike)):
+        return open(destino, "wb"), True
+    return destino, False
+
+# ----------------------------------------------------------------------
+# KMZ e KML
+# ----------------------------------------------------------------------
+
+def _estilo_kml(identificador, estilo):
+    return (
+        f'<Style id="{identificador}">'
+        f"<LineStyle><color>{estilo.cor_linha}</color><width>{estilo.largura_linha}</width></LineStyle>"
+        f"<PolyStyle><color>{estilo.cor_preenchimento}</color></PolyStyle>"
+        "</Style>\n"
+    )
+
+def _placemark_kml(geometrias, indice, id_estilo):
+    nome = geometrias.nomes[indice] or "Polígono"
+    partes = [f"<Placemark><name>{escape(nome)}</name><styleUrl>#{id_estilo}</styleUrl>"]
+    dados = geometrias.dados[indice]
+    if dados:
+        partes.append("<ExtendedData>")
+        for chave, valor in dados.items():
+            partes.append(f"<Data name={quoteattr(str(chave))}><value>{escape(str(valor))}</value></Data>")
+        partes.append("</ExtendedData>")
+    poligonos = geometrias.poligonos_da_feicao(indice)
+    if len(poligonos) > 1:
+        partes.append("<MultiGeometry>")
+    formato = f"%.{CASAS_DECIMAIS}f,%.{CASAS_DECIMAIS}f"
+    for indice_poligono in poligonos:
+        partes.append("<Polygon>")
+        for posicao, anel in enumerate(geometrias.aneis_do_poligono(indice_poligono)):
+            contorno = "outerBoundaryIs" if posicao == 0 else "innerBoundaryIs"
+            partes.append(f"<{contorno}><LinearRing><coordinates>")
+            # KML usa (lon, lat) e exige o anel fechado
+            _escrever_pontos(partes, geometrias.anel_fechado(anel)[:, ::-1], formato, " ")
+            partes.append(f"</coordinates></LinearRing></{contorno}>")
+        partes.append("</Polygon>")
+    if len(poligonos) > 1:
+        partes.append("</MultiGeometry>")
+    partes.append("</Placemark>\n")
+    return "".join(partes)
+
+def _escrever_documento_kml(kml, geometrias, estilos, nome_documento):
+    """Escreve o documento KML no arquivo binário "kml", feição a feição."""
+    estilos = list(estilos) if estilos is not None else [ESTILO_PADRAO] * len(geometrias)
+    ids_estilos = {estilo: f"estilo{i}" for i, estilo in enumerate(dict.fromkeys(estilos))}
+    kml.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+        f"<name>{escape(nome_documento)}</name>\n".encode("utf-8")
+    )
+    kml.write("".join(_estilo_kml(id_estilo, estilo) for estilo, id_estilo in ids_estilos.items()).encode("utf-8"))
+    for indice in range(len(geometrias)):
+        kml.write(_placemark_kml(geometrias, indice, ids_estilos[estilos[indice]]).encode("utf-8"))
+    kml.write(b"</Document></kml>\n")
+
+def escrever_kmz(geometrias, destino, estilos=None, nome_documento="Polígonos"):
+    """
+    Grava as feições como Placemarks de um KMZ (doc.kml compactado).
+
+    "estilos" é uma sequência opcional de EstiloKml, um por feição; sem ela
+    todas usam ESTILO_PADRAO. Estilos iguais são declarados uma única vez.
+    Feições com mais de um polígono viram MultiGeometry; furos viram
+    innerBoundaryIs.
+    """
+    arquivo, fechar = _abrir_destino(destino)
+    try:
+        with zipfile.ZipFile(arquivo, "w", zipfile.ZIP_DEFLATED) as kmz, kmz.open("doc.kml", "w") as kml:
+            _escrever_documento_kml(kml, geometrias, estilos, nome_documento)
+    finally:
+        if fechar:
+            arquivo.close()
+
+def escrever_kml(geometrias, destino, estilos=None, nome_documento="Polígonos"):
+    """
+    Grava o mesmo documento do KMZ (ver escrever_kmz) como KML simples, sem
+    compactar.
+    """
+    arquivo, fechar = _abrir_destino(destino)
+    try:
+        _escrever_documento_kml(arquivo, geometrias, estilos, nome_documento)
+    finally:
+        if fechar:
+            arquivo.close()
+
+# ----------------------------------------------------------------------
+# GeoJSON
+# ----------------------------------------------------------------------
+
+def escrever_geojson(geometrias, destino):
+    """
+    Grava uma FeatureCollection com um Polygon/MultiPolygon por feição e as
+    propriedades {"nome": ..., **dados}.
+    """
+    formato = f"[%.{CASAS_DECIMAIS}f,%.{CASAS_DECIMAIS}f]"
+    arquivo, fechar = _abrir_destino(destino)
+    try:
+        arquivo.write(b'{"type":"FeatureCollection","features":[\n')
+        for indice in range(len(geometrias)):
+            poligonos = geometrias.poligonos_da_feicao(indice)
+            tipo = "MultiPolygon" if len(poligonos) > 1 else "Polygon"
+            propriedades = {"nome": geometrias.nomes[indice], **geometrias.dados[indice]}
+            partes = [",\n" if indice else "", '{"type":"Feature","properties":', json.dumps(propriedades, ensure_ascii=False)]
+            if not len(poligonos):
+                partes.append(',"geometry":null}')
+                arquivo.write("".join(partes).encode("utf-8"))
+                continue
+            partes.append(f',"geometry":{{"type":"{tipo}","coordinates":' + ("[" if tipo == "MultiPolygon" else ""))
+            for posicao_poligono, indice_poligono in enumerate(poligonos):
+                partes.append(",[" if posicao_poligono else "[")
+                for posicao, anel in enumerate(geometrias.aneis_do_poligono(indice_poligono)):
+                    partes.append(",[" if posicao else "[")
+                    _escrever_pontos(partes, geometrias.anel_fechado(anel)[:, ::-1], formato, ",")
+                    partes.append("]")
+                partes.append("]")
+            partes.append("]}}" if tipo == "MultiPolygon" else "}}")
+            arquivo.write("".join(partes).encode("utf-8"))
+        arquivo.write(b"\n]}\n")
+    finally:
+        if fechar:
+            arquivo.close()
+
+# ----------------------------------------------------------------------
+# CSV
+# ----------------------------------------------------------------------
+
+def escrever_csv(geometrias, destino):
+    """
+    Grava um vértice por linha: feicao, nome, poligono, anel, latitude, longitude.
+
+    Os anéis não repetem o vértice de fechamento, como na entrada manual.
+    """
+    arquivo, fechar = _abrir_destino(destino)
+    try:
+        arquivo.write(b"feicao,nome,poligono,anel,latitude,longitude\r\n")
+        for indice in range(len(geometrias)):
+            nome = '"' + geometrias.nomes[indice].replace('"', '""').replace("%", "%%") + '"'
+            for indice_poligono in geometrias.poligonos_da_feicao(indice):
+                for posicao, anel in enumerate(geometrias.aneis_do_poligono(indice_poligono)):
+                    partes = []
+                    formato = f"{indice + 1},{nome},{indice_poligono + 1},{posicao},%.{CASAS_DECIMAIS}f,%.{CASAS_DECIMAIS}f"
+                    _escrever_pontos(partes, geometrias.anel(anel), formato, "\r\n")
+                    partes.append("\r\n")
+                    arquivo.write("".join(partes).encode("utf-8"))
+    finally:
+        if fechar:
+            arquivo.close()
+
+def _campo_csv(textos):
+    return ['"' + texto.replace('"', '""') + '"' for texto in textos]
+
+def escrever_csv_gms(geometrias, destino):
+    """
+    Tabela de coordenadas com um vértice por linha, em graus decimais e em
+    GMS: feicao, nome, poligono, anel, latitude, longitude, latitude_gms,
+    longitude_gms.
+    """
+    arquivo, fechar = _abrir_destino(destino)
+    try:
+        arquivo.write(b"feicao,nome,poligono,anel,latitude,longitude,latitude_gms,longitude_gms\r\n")
+        for indice in range(len(geometrias)):
+            nome = _campo_csv([geometrias.nomes[indice]])[0]
+            for indice_poligono in geometrias.poligonos_da_feicao(indice):
+                for posicao, anel in enumerate(geometrias.aneis_do_poligono(indice_poligono)):
+                    pontos = geometrias.anel(anel)
+                    prefixo = f"{indice + 1},{nome},{indice_poligono + 1},{posicao},"
+                    for inicio in range(0, len(pontos), VERTICES_POR_BLOCO):
+                        bloco = pontos[inicio:inicio + VERTICES_POR_BLOCO]
+                        latitudes_gms = _campo_csv(formatar_gms(bloco[:, 0]))
+                        longitudes_gms = _campo_csv(formatar_gms(bloco[:, 1]))
+                        linhas = [
+                            f"{prefixo}{latitude:.{CASAS_DECIMAIS}f},{longitude:.{CASAS_DECIMAIS}f},{latitude_gms},{longitude_gms}\r\n"
+                            for (latitude, longitude), latitude_gms, longitude_gms in zip(bloco.tolist(), latitudes_gms, longitudes_gms)
+                        ]
+                        arquivo.write("".join(linhas).encode("utf-8"))
+    finally:
+        if fechar:
+            arquivo.close()
+
+# ----------------------------------------------------------------------
+# GeoPackage
+# ----------------------------------------------------------------------
+
+_WKT_WGS84 = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],'
+    'PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433],AUTHORITY["EPSG","4326"]]'
+)
+
+_TABELAS_GPKG = """
+CREATE TABLE gpkg_spatial_ref_sys (
+    srs_name TEXT NOT NULL, srs_id INTEGER NOT NULL PRIMARY KEY, organization TEXT NOT NULL,
+    organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+CREATE TABLE gpkg_contents (
+    table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+    description TEXT DEFAULT '', last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+    min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+    srs_id INTEGER REFERENCES gpkg_spatial_ref_sys(srs_id));
+CREATE TABLE gpkg_geometry_columns (
+    table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+    srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+    PRIMARY KEY (table_name, column_name));
+CREATE TABLE poligonos (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom MULTIPOLYGON, nome TEXT, dados TEXT);
+"""
+
+def _geometria_gpkg(geometrias, indice):
+    """
+    Blob GeoPackage (cabeçalho "GP" com envelope XY + WKB little-endian) do
+    MultiPolygon da feição "indice".
+    """
+    poligonos = geometrias.poligonos_da_feicao(indice)
+    inicio = geometrias.inicio_aneis[geometrias.inicio_poligonos[poligonos.start]]
+    fim = geometrias.inicio_aneis[geometrias.inicio_poligonos[poligonos.stop]]
+    coordenadas = geometrias.coordenadas[inicio:fim]
+    (lat_min, lon_min), (lat_max, lon_max) = coordenadas.min(axis=0), coordenadas.max(axis=0)
+    # Flags 0b011: little-endian, envelope [minx, maxx, miny, maxy]
+    partes = [b"GP\x00\x03", struct.pack("<i4d", 4326, lon_min, lon_max, lat_min, lat_max)]
+    partes.append(struct.pack("<BII", 1, 6, len(poligonos)))
+    for indice_poligono in poligonos:
+        aneis = geometrias.aneis_do_poligono(indice_poligono)
+        partes.append(struct.pack("<BII", 1, 3, len(aneis)))
+        for anel in aneis:
+            pontos = geometrias.anel_fechado(anel)[:, ::-1]
+            partes.append(struct.pack("<I", len(pontos)))
+            partes.append(np.ascontiguousarray(pontos, dtype="<f8").tobytes())
+    return b"".join(partes)
+
+def _gravar_gpkg(geometrias, caminho):
+    conexao = sqlite3.connect(caminho)
+    try:
+        conexao.execute("PRAGMA application_id = 1196444487")  # "GPKG"
+        conexao.execute("PRAGMA user_version = 10300")
+        conexao.executescript(_TABELAS_GPKG)
+        conexao.executemany(
+            "INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+                ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+                ("WGS 84 geodetic", 4326, "EPSG", 4326, _WKT_WGS84, None),
+            ],
+        )
+        (lat_min, lon_min), (lat_max, lon_max) = geometrias.limites() if geometrias else ((None, None), (None, None))
+        conexao.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier, min_x, min_y, max_x, max_y, srs_id) "
+            "VALUES ('poligonos', 'features', 'poligonos', ?, ?, ?, ?, 4326)",
+            (lon_min, lat_min, lon_max, lat_max),
+        )
+        conexao.execute("INSERT INTO gpkg_geometry_columns VALUES ('poligonos', 'geom', 'MULTIPOLYGON', 4326, 0, 0)")
+        conexao.executemany(
+            "INSERT INTO poligonos (geom, nome, dados) VALUES (?, ?, ?)",
+            (
+                (_geometria_gpkg(geometrias, i), geometrias.nomes[i], json.dumps(geometrias.dados[i], ensure_ascii=False))
+                for i in range(len(geometrias))
+                if len(geometrias.poligonos_da_feicao(i))
+            ),
+        )
+        conexao.commit()
+    finally:
+        conexao.close()
+
+def escrever_gpkg(geometrias, destino):
+    """
+    Grava as feições em um GeoPackage (tabela "poligonos", EPSG:4326).
+
+    O SQLite só escreve em arquivos; para destinos já abertos o banco é
+    gerado em um arquivo temporário e copiado em seguida.
+    """
+    if isinstance(destino, (str, os.PathLike)):
+        if os.path.exists(destino):
+            os.remove(destino)
+        _gravar_gpkg(geometrias, destino)
+        return
+    descritor, temporario = tempfile.mkstemp(suffix=".gpkg")
+    os.close(descritor)
+    try:
+        os.remove(temporario)
+        _gravar_gpkg(geometrias, temporario)
+        with open(temporario, "rb") as arquivo:
+            shutil.copyfileobj(arquivo, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+# ----------------------------------------------------------------------
+# Formatos disponíveis
+# ----------------------------------------------------------------------
+
+FormatoExportacao = namedtuple("FormatoExportacao", ["descricao", "extensao", "mime", "escrever"])
+
+FORMATOS = {
+    FORMATO_KMZ: FormatoExportacao("KMZ (Google Earth)", "kmz", "application/vnd.google-earth.kmz", escrever_kmz),
+    FORMATO_KML: FormatoExportacao("KML (Google Earth, sem compactar)", "kml", "application/vnd.google-earth.kml+xml", escrever_kml),
+    FORMATO_GEOJSON: FormatoExportacao("GeoJSON", "geojson", "application/geo+json", escrever_geojson),
+    FORMATO_CSV: FormatoExportacao("CSV (um vértice por linha)", "csv", "text/csv", escrever_csv),
+    FORMATO_CSV_GMS: FormatoExportacao("CSV com GMS (um vértice por linha, decimal e GMS)", "csv", "text/csv", escrever_csv_gms),
+    FORMATO_GPKG: FormatoExportacao("GeoPackage", "gpkg", "application/geopackage+sqlite3", escrever_gpkg),
+}
+
+def formato_pela_extensao(caminho, formato=None):
+    """
+    Formato pedido, ou deduzido da extensão de "caminho". Levanta
+    ValueError se a extensão não for de nenhum formato: gravar outro
+    formato com aquela extensão geraria um arquivo ilegível.
+    """
+    if formato:
+        return formato
+    extensao = os.path.splitext(caminho)[1].lstrip(".").lower()
+    for chave, dados in FORMATOS.items():
+        if dados.extensao == extensao:
+            return chave
+    aceitas = ", ".join(sorted({f".{dados.extensao}" for dados in FORMATOS.values()}))
+    raise ValueError(f"extensão desconhecida em {caminho!r} ({f'.{extensao}' if extensao else 'sem extensão'}); use {aceitas} ou informe --formato")
+
+def exportar(geometrias, formato, destino):
+    """Grava "geometrias" em "destino" (caminho ou arquivo binário) no formato dado."""
+    with medir(f"exportar.{formato}"):
+        FORMATOS[formato].escrever(geometrias, destino)
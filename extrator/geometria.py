@@ -0,0 +1,345 @@
+"""
+Armazenamento compacto de geometrias (polígonos com furos) em arrays.
+
+Todas as coordenadas ficam em um único array contíguo de float64 no formato
+(latitude, longitude); anéis, polígonos e feições são descritos apenas por
+arrays de deslocamentos, no mesmo esquema usado por formatos colunares como
+GeoArrow. Os anéis são guardados sem repetir o primeiro vértice no final.
+"""
+# Bibliotecas padrão do Python
+import json
+import os
+import shutil
+import tempfile
+
+# Bibliotecas de terceiros
+import numpy as np
+
+ARRAYS_COLECAO = ("coordenadas", "inicio_aneis", "inicio_poligonos", "inicio_feicoes")
+
+def _como_pontos(anel):
+    """
+    Converte um anel em array (n, 2) de float64, removendo o vértice de fechamento.
+    """
+    pontos = np.asarray(anel, dtype=np.float64).reshape(-1, 2)
+    if len(pontos) > 1 and np.array_equal(pontos[0], pontos[-1]):
+        pontos = pontos[:-1]
+    return pontos
+
+def formatar_gms(valores):
+    """
+    Formata um array de graus decimais como strings GMS (-23°01'37.72").
+
+    A decomposição em graus, minutos e segundos é feita de uma vez para todo
+    o array; apenas a montagem final das strings é feita item a item.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    absolutos = np.abs(valores)
+    graus = np.floor(absolutos)
+    minutos = np.floor((absolutos - graus) * 60)
+    segundos = (absolutos - graus - minutos / 60) * 3600
+    sinais = np.where(valores < 0, "-", "")
+    return [
+        f"{sinal}{g}°{m:02d}'{s:.2f}\""
+        for sinal, g, m, s in zip(sinais.tolist(), graus.astype(np.int64).tolist(), minutos.astype(np.int64).tolist(), segundos.tolist())
+    ]
+
+class _BufferCrescente:
+    """
+    Array NumPy com crescimento amortizado (capacidade dobra quando enche).
+
+    Ao crescer, um novo bloco é alocado; visões obtidas antes continuam
+    válidas (apontando para os dados antigos), ao contrário de array.array,
+    que não pode ser redimensionado enquanto houver visões exportadas.
+    """
+
+    def __init__(self, dtype, colunas=None, valores=()):
+        forma = (16,) if colunas is None else (16, colunas)
+        self._dados = np.empty(forma, dtype=dtype)
+        self._tamanho = 0
+        if len(valores):
+            self.estender(valores)
+
+    @classmethod
+    def sobre(cls, dados):
+        """
+        Usa "dados" diretamente, sem cópia (inclusive arrays mapeados em
+        memória somente leitura); a cópia só acontece se o buffer crescer.
+        """
+        buffer = cls.__new__(cls)
+        buffer._dados = dados
+        buffer._tamanho = len(dados)
+        return buffer
+
+    def __len__(self):
+        return self._tamanho
+
+    def _reservar(self, quantidade):
+        necessario = self._tamanho + quantidade
+        if necessario > len(self._dados):
+            capacidade = max(necessario, 2 * len(self._dados))
+            novos = np.empty((capacidade,) + self._dados.shape[1:], dtype=self._dados.dtype)
+            novos[:self._tamanho] = self._dados[:self._tamanho]
+            self._dados = novos
+
+    def estender(self, valores):
+        valores = np.asarray(valores, dtype=self._dados.dtype)
+        self._reservar(len(valores))
+        self._dados[self._tamanho:self._tamanho + len(valores)] = valores
+        self._tamanho += len(valores)
+
+    def anexar(self, valor):
+        self._reservar(1)
+        self._dados[self._tamanho] = valor
+        self._tamanho += 1
+
+    def __setitem__(self, indice, valor):
+        self.visao()[indice] = valor
+
+    def __getitem__(self, indice):
+        return self.visao()[indice]
+
+    def visao(self):
+        return self._dados[:self._tamanho]
+
+class ColecaoGeometrias:
+    """
+    Coleção de feições (Placemarks), cada uma com um ou mais polígonos.
+
+    Cada polígono é uma lista de anéis: o primeiro é o contorno externo e os
+    demais são furos. As coordenadas de todos os anéis ficam em
+    "coordenadas" e os arrays "inicio_aneis", "inicio_poligonos" e
+    "inicio_feicoes" indicam onde cada anel, polígono e feição começa.
+    """
+
+    def __init__(self):
+        self.limpar()
+
+    def limpar(self):
+        """Remove todas as feições."""
+        self._coordenadas = _BufferCrescente(np.float64, colunas=2)
+        self._inicio_aneis = _BufferCrescente(np.int64, valores=[0])
+        self._inicio_poligonos = _BufferCrescente(np.int64, valores=[0])
+        self._inicio_feicoes = _BufferCrescente(np.int64, valores=[0])
+        self.nomes = []
+        self.dados = []
+
+    @classmethod
+    def de_arrays(cls, coordenadas, inicio_aneis, inicio_poligonos, inicio_feicoes, nomes=None, dados=None):
+        """
+        Cria a coleção a partir dos arrays já prontos, sem copiá-los.
+        """
+        colecao = cls.__new__(cls)
+        colecao._coordenadas = _BufferCrescente.sobre(coordenadas)
+        colecao._inicio_aneis = _BufferCrescente.sobre(inicio_aneis)
+        colecao._inicio_poligonos = _BufferCrescente.sobre(inicio_poligonos)
+        colecao._inicio_feicoes = _BufferCrescente.sobre(inicio_feicoes)
+        total = len(inicio_feicoes) - 1
+        colecao.nomes = list(nomes) if nomes is not None else [""] * total
+        colecao.dados = list(dados) if dados is not None else [{} for _ in range(total)]
+        return colecao
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def __bool__(self):
+        return self.total_vertices > 0
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    def adicionar_feicao(self, poligonos, nome="", dados=None):
+        """
+        Adiciona uma feição.
+
+        "poligonos" é uma lista de polígonos e cada polígono é uma lista de
+        anéis (sequências de pares latitude/longitude), sendo o primeiro o
+        contorno externo. Anéis vazios são ignorados.
+        """
+        for aneis in poligonos:
+            adicionados = 0
+            for anel in aneis:
+                pontos = _como_pontos(anel)
+                if not len(pontos):
+                    continue
+                self._coordenadas.estender(pontos)
+                self._inicio_aneis.anexar(len(self._coordenadas))
+                adicionados += 1
+            if adicionados:
+                self._inicio_poligonos.anexar(len(self._inicio_aneis) - 1)
+        self._inicio_feicoes.anexar(len(self._inicio_poligonos) - 1)
+        self.nomes.append(nome or "")
+        self.dados.append(dict(dados or {}))
+
+    def adicionar_vertices(self, pontos, nome="Polígono"):
+        """
+        Acrescenta vértices (lat, lon) ao último anel da coleção.
+
+        É o modo de edição do extrator: os pontos digitados vão sempre para
+        o contorno do último polígono. Se a coleção estiver vazia, cria uma
+        feição "nome" com um polígono.
+        """
+        pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+        if not len(pontos):
+            return
+        if not self.total_vertices:
+            self.limpar()
+            self.adicionar_feicao([[pontos]], nome=nome)
+            return
+        # O último anel é sempre o último trecho do array de coordenadas
+        self._coordenadas.estender(pontos)
+        self._inicio_aneis[-1] = len(self._coordenadas)
+
+    # ------------------------------------------------------------------
+    # Acesso
+    # ------------------------------------------------------------------
+
+    @property
+    def coordenadas(self):
+        """Array (n, 2) com todas as coordenadas (latitude, longitude)."""
+        return self._coordenadas.visao()
+
+    @property
+    def inicio_aneis(self):
+        return self._inicio_aneis.visao()
+
+    @property
+    def inicio_poligonos(self):
+        return self._inicio_poligonos.visao()
+
+    @property
+    def inicio_feicoes(self):
+        return self._inicio_feicoes.visao()
+
+    @property
+    def total_poligonos(self):
+        return len(self._inicio_poligonos) - 1
+
+    @property
+    def total_vertices(self):
+        return len(self._coordenadas)
+
+    def anel(self, indice):
+        """Coordenadas (visão, sem cópia) do anel de índice "indice"."""
+        inicio, fim = self._inicio_aneis[indice], self._inicio_aneis[indice + 1]
+        return self._coordenadas[inicio:fim]
+
+    def anel_fechado(self, indice):
+        """Cópia do anel com o primeiro vértice repetido no final (KML, GeoJSON)."""
+        anel = self.anel(indice)
+        return np.concatenate([anel, anel[:1]]) if len(anel) else anel
+
+    def aneis_do_poligono(self, indice):
+        """Índices dos anéis do polígono "indice" (contorno externo primeiro)."""
+        return range(self._inicio_poligonos[indice], self._inicio_poligonos[indice + 1])
+
+    def poligono(self, indice):
+        """Lista de anéis do polígono "indice" (contorno externo primeiro)."""
+        return [self.anel(i) for i in self.aneis_do_poligono(indice)]
+
+    def poligonos_da_feicao(self, indice):
+        """Índices dos polígonos da feição "indice"."""
+        return range(self._inicio_feicoes[indice], self._inicio_feicoes[indice + 1])
+
+    def feicao(self, indice):
+        """Retorna (nome, dados, poligonos) da feição "indice"."""
+        poligonos = [self.poligono(i) for i in self.poligonos_da_feicao(indice)]
+        return self.nomes[indice], self.dados[indice], poligonos
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self.feicao(indice)
+
+    def aneis_externos(self):
+        """Índices do contorno externo de cada polígono."""
+        return self.inicio_poligonos[:-1]
+
+    def feicoes_dos_poligonos(self):
+        """Índice da feição de cada polígono."""
+        return np.repeat(np.arange(len(self)), np.diff(self.inicio_feicoes))
+
+    def indices_vertices(self):
+        """
+        Retorna (feição, polígono, anel) de cada vértice, como arrays.
+        """
+        anel_por_vertice = np.repeat(np.arange(len(self._inicio_aneis) - 1), np.diff(self.inicio_aneis))
+        poligono_por_anel = np.repeat(np.arange(self.total_poligonos), np.diff(self.inicio_poligonos))
+        feicao_por_poligono = self.feicoes_dos_poligonos()
+        poligono_por_vertice = poligono_por_anel[anel_por_vertice]
+        return feicao_por_poligono[poligono_por_vertice], poligono_por_vertice, anel_por_vertice
+
+    # ------------------------------------------------------------------
+    # Operações vetorizadas
+    # ------------------------------------------------------------------
+
+    def limites(self):
+        """Retorna ((lat_min, lon_min), (lat_max, lon_max)) de toda a coleção."""
+        coordenadas = self.coordenadas
+        return tuple(coordenadas.min(axis=0).tolist()), tuple(coordenadas.max(axis=0).tolist())
+
+    def centroide(self):
+        """
+        Centroide (lat, lon) dos contornos externos, ponderado pela área.
+
+        Usa a fórmula do polígono (shoelace) no plano lat/lon, suficiente
+        para centralizar mapas em áreas pequenas. Quando a área é nula
+        (pontos colineares ou menos de 3 vértices), retorna a média dos
+        vértices.
+        """
+        coordenadas = self.coordenadas
+        externos = np.zeros(len(self._inicio_aneis) - 1, dtype=bool)
+        externos[self.aneis_externos()] = True
+        _, _, anel = self.indices_vertices()
+        # Próximo vértice de cada vértice dentro do próprio anel
+        proximo = np.arange(1, len(coordenadas) + 1)
+        fim_aneis = self.inicio_aneis[1:] - 1
+        proximo[fim_aneis] = self.inicio_aneis[:-1]
+        y, x = coordenadas[:, 0], coordenadas[:, 1]
+        y1, x1 = y[proximo], x[proximo]
+        cruzado = np.where(externos[anel], x * y1 - x1 * y, 0.0)
+        area = cruzado.sum() / 2
+        if abs(area) < 1e-15:
+            return tuple(coordenadas.mean(axis=0).tolist())
+        lon = ((x + x1) * cruzado).sum() / (6 * area)
+        lat = ((y + y1) * cruzado).sum() / (6 * area)
+        return float(lat), float(lon)
+
+    def formatar_gms(self):
+        """Retorna as listas (latitudes, longitudes) de todos os vértices em GMS."""
+        coordenadas = self.coordenadas
+        return formatar_gms(coordenadas[:, 0]), formatar_gms(coordenadas[:, 1])
+
+def salvar_colecao(colecao, diretorio):
+    """
+    Grava a coleção em "diretorio" como arquivos .npy (mais nomes/dados em
+    JSON), substituindo o conteúdo anterior de forma atômica.
+    """
+    pai = os.path.dirname(os.path.abspath(diretorio))
+    os.makedirs(pai, exist_ok=True)
+    temporario = tempfile.mkdtemp(dir=pai)
+    try:
+        for nome in ARRAYS_COLECAO:
+            np.save(os.path.join(temporario, f"{nome}.npy"), np.ascontiguousarray(getattr(colecao, nome)))
+        with open(os.path.join(temporario, "atributos.json"), "w", encoding="utf-8") as arquivo:
+            json.dump({"nomes": colecao.nomes, "dados": colecao.dados}, arquivo, ensure_ascii=False)
+        if os.path.isdir(diretorio):
+            shutil.rmtree(diretorio)
+        os.replace(temporario, diretorio)
+    except BaseException:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+
+def carregar_colecao(diretorio, mapear=True):
+    """
+    Lê uma coleção gravada por salvar_colecao.
+
+    Com "mapear" verdadeiro os arrays são mapeados em memória (somente
+    leitura): a leitura é imediata e as páginas são compartilhadas entre
+    processos que abrem o mesmo arquivo.
+    """
+    modo = "r" if mapear else None
+    arrays = [np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode=modo) for nome in ARRAYS_COLECAO]
+    with open(os.path.join(diretorio, "atributos.json"), encoding="utf-8") as arquivo:
+        atributos = json.load(arquivo)
+    return ColecaoGeometrias.de_arrays(*arrays, nomes=atributos["nomes"], dados=atributos["dados"])
@@ -0,0 +1,399 @@
+"""
+Histórico persistente dos relatórios de análise (SQLite).
+
+Cada relatório gerado é gravado com os campos de busca indexados (número
+da WEBAIA, município, data e geohash da coordenada) e o PDF é guardado uma
+única vez por conteúdo (SHA-256). A busca por fiscalizações anteriores
+perto de uma coordenada consulta só as células de geohash que cobrem o
+raio, pelo índice, e depois filtra pela distância geodésica exata. A
+contagem de relatórios por célula é mantida em algumas precisões
+(agregados_geohash), para que o mapa regional não precise ler os pontos.
+
+O banco fica em dados/historico.sqlite3, ou no caminho da variável de
+ambiente EXTRATOR_HISTORICO.
+"""
+# Bibliotecas padrão do Python
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime as dt
+from functools import lru_cache
+
+# Módulos do projeto
+from extrator.conversao_coordenadas import converter_valores
+from extrator.instrumentacao import medir
+from extrator.modelo_relatorio import chave_relatorio, relatorio_serializavel
+from extrator.municipios import DIRETORIO_DADOS, chave_nome
+
+ARQUIVO_HISTORICO = os.path.join(DIRETORIO_DADOS, "historico.sqlite3")
+VARIAVEL_HISTORICO = "EXTRATOR_HISTORICO"
+PRECISAO_GEOHASH = 9  # Células de ~5 m; prefixos menores servem às buscas por raio
+RAIO_PADRAO_M = 500
+PRECISOES_AGREGADOS = (3, 4, 5, 6)  # Células de ~156, 39, 4,9 e 1,2 km
+RAIO_TERRA_M = 6_371_008.8
+_METROS_POR_GRAU = math.pi * RAIO_TERRA_M / 180
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pdfs (
+    sha256 TEXT PRIMARY KEY,
+    tamanho INTEGER NOT NULL,
+    conteudo BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS relatorios (
+    id INTEGER PRIMARY KEY,
+    chave TEXT NOT NULL UNIQUE,
+    numero_relatorio TEXT,
+    numero_webaia TEXT,
+    municipio TEXT,
+    chave_municipio TEXT,
+    data TEXT,
+    latitude REAL,
+    longitude REAL,
+    geohash TEXT,
+    conclusao TEXT,
+    responsavel TEXT,
+    fiscalizacao_info TEXT,
+    dados TEXT NOT NULL,
+    pdf_sha256 TEXT REFERENCES pdfs(sha256),
+    criado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relatorios_webaia ON relatorios(numero_webaia);
+CREATE INDEX IF NOT EXISTS relatorios_municipio_data ON relatorios(chave_municipio, data);
+CREATE INDEX IF NOT EXISTS relatorios_data ON relatorios(data);
+CREATE INDEX IF NOT EXISTS relatorios_geohash ON relatorios(geohash);
+CREATE TABLE IF NOT EXISTS agregados_geohash (
+    precisao INTEGER NOT NULL,
+    celula TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    soma_latitude REAL NOT NULL,
+    soma_longitude REAL NOT NULL,
+    PRIMARY KEY (precisao, celula)
+) WITHOUT ROWID;
+"""
+
+COLUNAS_RESULTADO = (
+    "id", "numero_relatorio", "numero_webaia", "municipio", "data", "latitude", "longitude",
+    "conclusao", "responsavel", "fiscalizacao_info", "pdf_sha256",
+)
+
+# ==========================================
+# Geohash
+# ==========================================
+
+def geohash(latitude, longitude, precisao=PRECISAO_GEOHASH):
+    """Codifica a coordenada em geohash com "precisao" caracteres."""
+    faixa_lat, faixa_lon = [-90.0, 90.0], [-180.0, 180.0]
+    caracteres = []
+    valor = bits = 0
+    longitude_na_vez = True
+    while len(caracteres) < precisao:
+        faixa, coordenada = (faixa_lon, longitude) if longitude_na_vez else (faixa_lat, latitude)
+        meio = (faixa[0] + faixa[1]) / 2
+        if coordenada >= meio:
+            valor = (valor << 1) | 1
+            faixa[0] = meio
+        else:
+            valor <<= 1
+            faixa[1] = meio
+        longitude_na_vez = not longitude_na_vez
+        bits += 1
+        if bits == 5:
+            caracteres.append(_BASE32[valor])
+            valor = bits = 0
+    return "".join(caracteres)
+
+def limites_celula(celula):
+    """((lat_min, lon_min), (lat_max, lon_max)) da célula de geohash."""
+    faixa_lat, faixa_lon = [-90.0, 90.0], [-180.0, 180.0]
+    longitude_na_vez = True
+    for caractere in celula:
+        valor = _BASE32.index(caractere)
+        for deslocamento in range(4, -1, -1):
+            faixa = faixa_lon if longitude_na_vez else faixa_lat
+            faixa[0 if (valor >> deslocamento) & 1 else 1] = (faixa[0] + faixa[1]) / 2
+            longitude_na_vez = not longitude_na_vez
+    return (faixa_lat[0], faixa_lon[0]), (faixa_lat[1], faixa_lon[1])
+
+def _tamanho_celula(precisao):
+    """(altura, largura) em graus de uma célula de geohash."""
+    bits = 5 * precisao
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+def celulas_no_raio(latitude, longitude, raio_m):
+    """
+    Prefixos de geohash que cobrem o retângulo envolvente do círculo, na
+    maior precisão em que as células não são menores que o raio (no
+    máximo nove células).
+    """
+    dlat = raio_m / _METROS_POR_GRAU
+    dlon = dlat / max(math.cos(math.radians(latitude)), 1e-6)
+    precisao = 1
+    for candidata in range(PRECISAO_GEOHASH, 0, -1):
+        altura, largura = _tamanho_celula(candidata)
+        if altura >= dlat and largura >= dlon:
+            precisao = candidata
+            break
+    altura, largura = _tamanho_celula(precisao)
+    sul, norte = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    oeste, leste = longitude - dlon, longitude + dlon
+    celulas = set()
+    lat = sul
+    while True:
+        lon = oeste
+        while True:
+            celulas.add(geohash(lat, (lon + 180) % 360 - 180, precisao))
+            if lon >= leste:
+                break
+            lon = min(lon + largura, leste)
+        if lat >= norte:
+            break
+        lat = min(lat + altura, norte)
+    return sorted(celulas)
+
+def distancia_m(lat1, lon1, lat2, lon2):
+    """Distância pelo grande círculo (haversine), em metros."""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((fi2 - fi1) / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+# ==========================================
+# Banco de dados
+# ==========================================
+
+def _data_iso(data):
+    """dd/mm/aaaa (formulário) ou date -> aaaa-mm-dd, para ordenar e filtrar por faixa."""
+    if not data:
+        return None
+    if hasattr(data, "isoformat"):
+        return data.isoformat()
+    try:
+        return dt.strptime(data, "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return None
+
+def _conclusao(relatorio):
+    if relatorio.get("conclusao_fiscalizacao"):
+        return "fiscalização in loco"
+    if relatorio.get("conclusao_encerramento"):
+        return "encerramento"
+    return ""
+
+class HistoricoOcorrencias:
+    """
+    Relatórios já gerados, com busca indexada.
+
+    As escritas usam uma única conexão, serializadas por um lock. As
+    leituras usam outras conexões, somente leitura, tiradas de um pequeno
+    conjunto (uma por leitura em andamento, reaproveitadas pelas threads
+    seguintes do Streamlit): com o banco em WAL elas não esperam as
+    gravações e só veem transações já confirmadas. Um banco ":memory:" não
+    pode ser aberto por outra conexão; nele as leituras usam a conexão de
+    escrita, sob o lock.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or os.environ.get(VARIAVEL_HISTORICO) or ARQUIVO_HISTORICO
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        self.conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self.conexao.row_factory = sqlite3.Row
+        self.trava = threading.Lock()
+        self._leitores = []  # Conexões de leitura livres
+        with self.trava, self.conexao:
+            self.conexao.execute("PRAGMA journal_mode=WAL")
+            self.conexao.execute("PRAGMA synchronous=NORMAL")
+            self.conexao.executescript(ESQUEMA)
+        # Bancos gravados antes dos agregados (ou carregados por fora) são recontados
+        if not self.conexao.execute("SELECT 1 FROM agregados_geohash LIMIT 1").fetchone() and \
+                self.conexao.execute("SELECT 1 FROM relatorios WHERE geohash IS NOT NULL LIMIT 1").fetchone():
+            self.reconstruir_agregados()
+
+    def fechar(self):
+        while self._leitores:
+            self._leitores.pop().close()
+        self.conexao.close()
+
+    def _abrir_leitor(self):
+        # Usada por uma thread de cada vez, mas não sempre pela mesma
+        conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute("PRAGMA query_only = ON")
+        return conexao
+
+    @contextmanager
+    def _leitura(self):
+        """
+        Conexão para uma leitura. Os resultados devem ser lidos dentro do
+        bloco: a conexão volta ao conjunto ao sair dele.
+        """
+        if self.caminho == ":memory:":
+            with self.trava:
+                yield self.conexao
+            return
+        try:
+            conexao = self._leitores.pop()
+        except IndexError:
+            conexao = self._abrir_leitor()
+        try:
+            yield conexao
+        finally:
+            self._leitores.append(conexao)
+
+    def __len__(self):
+        with self._leitura() as conexao:
+            return conexao.execute("SELECT count(*) FROM relatorios").fetchone()[0]
+
+    def registrar(self, relatorio, pdf=None):
+        """
+        Grava o relatório (e o PDF, se dado). Relatórios com o mesmo
+        conteúdo são gravados uma única vez; retorna o id do registro.
+        """
+        chave = chave_relatorio(relatorio)
+        (lat, lon), validos = converter_valores([relatorio.get("latitude") or "", relatorio.get("longitude") or ""])
+        if validos.all():
+            lat, lon = float(lat), float(lon)
+            celula = geohash(lat, lon)
+        else:
+            lat = lon = celula = None
+        sha256 = hashlib.sha256(pdf).hexdigest() if pdf else None
+        registro = {
+            "chave": chave,
+            "numero_relatorio": relatorio.get("numero_relatorio"),
+            "numero_webaia": (relatorio.get("numero_webaia") or "").strip() or None,
+            "municipio": relatorio.get("municipio"),
+            "chave_municipio": chave_nome(relatorio.get("municipio")) or None,
+            "data": _data_iso(relatorio.get("data_relatorio")),
+            "latitude": lat,
+            "longitude": lon,
+            "geohash": celula,
+            "conclusao": _conclusao(relatorio),
+            "responsavel": relatorio.get("responsavel"),
+            "fiscalizacao_info": relatorio.get("fiscalizacao_info"),
+            "dados": json.dumps(relatorio_serializavel(relatorio), ensure_ascii=False, default=str),
+            "pdf_sha256": sha256,
+            "criado_em": dt.now().isoformat(timespec="seconds"),
+        }
+        with self.trava, self.conexao:
+            if pdf:
+                self.conexao.execute(
+                    "INSERT OR IGNORE INTO pdfs (sha256, tamanho, conteudo) VALUES (?, ?, ?)", (sha256, len(pdf), pdf)
+                )
+            existente = self.conexao.execute("SELECT id FROM relatorios WHERE chave = ?", (chave,)).fetchone()
+            if existente:
+                if sha256:
+                    self.conexao.execute("UPDATE relatorios SET pdf_sha256 = ? WHERE id = ?", (sha256, existente[0]))
+                return existente[0]
+            cursor = self.conexao.execute(
+                f"INSERT INTO relatorios ({', '.join(registro)}) VALUES ({', '.join('?' * len(registro))})",
+                tuple(registro.values()),
+            )
+            if celula:
+                self.conexao.executemany(
+                    "INSERT INTO agregados_geohash VALUES (?, ?, 1, ?, ?) ON CONFLICT(precisao, celula) DO UPDATE SET "
+                    "total = total + 1, soma_latitude = soma_latitude + excluded.soma_latitude, "
+                    "soma_longitude = soma_longitude + excluded.soma_longitude",
+                    [(precisao, celula[:precisao], lat, lon) for precisao in PRECISOES_AGREGADOS],
+                )
+            return cursor.lastrowid
+
+    def reconstruir_agregados(self):
+        """Recalcula as contagens por célula a partir dos relatórios."""
+        with self.trava, self.conexao:
+            self.conexao.execute("DELETE FROM agregados_geohash")
+            for precisao in PRECISOES_AGREGADOS:
+                self.conexao.execute(
+                    "INSERT INTO agregados_geohash SELECT ?, substr(geohash, 1, ?), count(*), sum(latitude), sum(longitude) "
+                    "FROM relatorios WHERE geohash IS NOT NULL GROUP BY 2",
+                    (precisao, precisao),
+                )
+
+    def agregados(self, precisao):
+        """
+        Relatórios por célula de geohash: lista de (celula, total, latitude
+        média, longitude média). "precisao" deve estar em PRECISOES_AGREGADOS.
+        """
+        if precisao not in PRECISOES_AGREGADOS:
+            raise ValueError(f"precisão sem agregados: {precisao} (disponíveis: {PRECISOES_AGREGADOS})")
+        with self._leitura() as conexao:
+            return conexao.execute(
+                "SELECT celula, total, soma_latitude / total, soma_longitude / total FROM agregados_geohash WHERE precisao = ?",
+                (precisao,),
+            ).fetchall()
+
+    @medir("historico.buscar")
+    def buscar(self, numero_webaia=None, municipio=None, data_inicio=None, data_fim=None, limite=100):
+        """
+        Relatórios que atendem a todos os filtros informados, do mais recente
+        para o mais antigo. As datas aceitam date ou dd/mm/aaaa.
+        """
+        condicoes, parametros = [], []
+        if numero_webaia:
+            condicoes.append("numero_webaia = ?")
+            parametros.append(numero_webaia.strip())
+        if municipio:
+            condicoes.append("chave_municipio = ?")
+            parametros.append(chave_nome(municipio))
+        if _data_iso(data_inicio):
+            condicoes.append("data >= ?")
+            parametros.append(_data_iso(data_inicio))
+        if _data_iso(data_fim):
+            condicoes.append("data <= ?")
+            parametros.append(_data_iso(data_fim))
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        consulta = f"SELECT {', '.join(COLUNAS_RESULTADO)} FROM relatorios {onde} ORDER BY data DESC, id DESC LIMIT ?"
+        with self._leitura() as conexao:
+            return [dict(linha) for linha in conexao.execute(consulta, (*parametros, limite))]
+
+    @medir("historico.proximos")
+    def proximos(self, latitude, longitude, raio_m=RAIO_PADRAO_M, limite=20):
+        """
+        Relatórios a até "raio_m" metros da coordenada, do mais próximo ao
+        mais distante, cada um com a chave "distancia_m".
+        """
+        consulta = (
+            f"SELECT {', '.join(COLUNAS_RESULTADO)} FROM relatorios "
+            "WHERE geohash >= ? AND geohash < ?"
+        )
+        encontrados = []
+        with self._leitura() as conexao:
+            for prefixo in celulas_no_raio(latitude, longitude, raio_m):
+                # "{" é o caractere seguinte a "z": o intervalo cobre todo o prefixo
+                for linha in conexao.execute(consulta, (prefixo, prefixo + "{")):
+                    distancia = distancia_m(latitude, longitude, linha["latitude"], linha["longitude"])
+                    if distancia <= raio_m:
+                        encontrados.append({**dict(linha), "distancia_m": distancia})
+        encontrados.sort(key=lambda registro: registro["distancia_m"])
+        return encontrados[:limite]
+
+    def pdf(self, sha256):
+        """Conteúdo do PDF guardado, ou None."""
+        with self._leitura() as conexao:
+            linha = conexao.execute("SELECT conteudo FROM pdfs WHERE sha256 = ?", (sha256,)).fetchone()
+        return bytes(linha[0]) if linha else None
+
+def resumo_fiscalizacoes(registros):
+    """
+    Texto para o campo "Existência de Fiscalizações do PAMB Anteriormente".
+    """
+    linhas = []
+    for registro in registros:
+        data = dt.strptime(registro["data"], "%Y-%m-%d").strftime("%d/%m/%Y") if registro["data"] else "data não informada"
+        descricao = f"Relatório nº {registro['numero_relatorio'] or '?'} de {data}"
+        if registro["numero_webaia"]:
+            descricao += f" (WEBAIA {registro['numero_webaia']})"
+        if "distancia_m" in registro:
+            descricao += f", a {registro['distancia_m']:.0f} m"
+        if registro["conclusao"]:
+            descricao += f": {registro['conclusao']}"
+        linhas.append(descricao + ".")
+    return "\n".join(linhas)
+
+@lru_cache(maxsize=1)
+def historico_padrao():
+    """Histórico no caminho configurado, aberto uma vez por processo."""
+    return HistoricoOcorrencias()
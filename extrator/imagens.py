@@ -0,0 +1,130 @@
+"""
+Ingestão das imagens de comparação (Google Earth, Sentinel...) do relatório.
+
+Cada arquivo enviado é decodificado uma única vez. Em JPEG, o modo draft
+do Pillow decodifica direto em 1/2, 1/4 ou 1/8 da resolução, e o restante
+da redução usa reduce() antes do filtro LANCZOS. Do resultado saem dois
+JPEGs com a proporção original: a miniatura exibida na interface e a versão
+de impressão embutida no PDF sem nova recompressão. Capturas de vários
+megapixels deixam de ficar inteiras na memória entre as execuções.
+
+Os resultados ficam em um cache do processo, indexado pelo hash do
+arquivo, e séries de imagens são processadas em paralelo em threads (o
+Pillow libera o GIL ao decodificar e redimensionar). O Pillow só é
+importado quando alguma imagem é de fato processada.
+"""
+# Bibliotecas padrão do Python
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# Módulos do projeto
+from extrator.instrumentacao import contar, medir
+
+# Tamanhos máximos (em pixels), mantendo a proporção. A miniatura é exibida
+# com 300 px de largura; a impressão ocupa um quadro de 150 pt no PDF, o que
+# com 640 px dá ~300 dpi.
+TAMANHO_MINIATURA = (400, 400)
+TAMANHO_IMPRESSAO = (640, 640)
+QUALIDADE_JPEG = 85
+MAXIMO_EM_CACHE = 64  # ~60 kB por imagem processada
+
+_cache = OrderedDict()
+_trava_cache = threading.Lock()
+
+ImagemProcessada = namedtuple("ImagemProcessada", ["hash", "tamanho_original", "tamanho", "miniatura", "impressao"])
+
+def hash_imagem(dados):
+    """Identificador (SHA-256) do conteúdo do arquivo de imagem."""
+    return hashlib.sha256(dados).hexdigest()
+
+def _para_rgb(imagem):
+    """
+    Converte para RGB, aplicando a transparência sobre fundo branco (JPEG não tem canal alfa).
+    """
+    from PIL import Image
+
+    if imagem.mode == "P" and "transparency" in imagem.info:
+        imagem = imagem.convert("RGBA")
+    if imagem.mode in ("RGBA", "LA"):
+        fundo = Image.new("RGB", imagem.size, "white")
+        fundo.paste(imagem, mask=imagem.getchannel("A"))
+        return fundo
+    return imagem.convert("RGB")
+
+def _codificar_jpeg(imagem):
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=QUALIDADE_JPEG)
+    return buffer.getvalue()
+
+def processar_imagem(dados, chave=None):
+    """
+    Decodifica "dados" (bytes de PNG/JPEG) uma única vez e retorna uma
+    ImagemProcessada com a miniatura e a versão de impressão em JPEG.
+
+    Imagens já processadas (mesmo hash) são devolvidas do cache.
+    """
+    chave = chave or hash_imagem(dados)
+    with _trava_cache:
+        if chave in _cache:
+            _cache.move_to_end(chave)
+            contar("imagens.cache_acerto")
+            return _cache[chave]
+    contar("imagens.cache_falta")
+    with medir("imagens.decodificar"):
+        processada = _decodificar(dados, chave)
+    with _trava_cache:
+        _cache[chave] = processada
+        while len(_cache) > MAXIMO_EM_CACHE:
+            _cache.popitem(last=False)
+    return processada
+
+def _decodificar(dados, chave):
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(dados)) as imagem:
+        tamanho_original = imagem.size
+        imagem.draft("RGB", TAMANHO_IMPRESSAO)
+        # Aplica a orientação EXIF das fotos de celular
+        imagem = ImageOps.exif_transpose(imagem)
+    imagem.thumbnail(TAMANHO_IMPRESSAO, Image.LANCZOS, reducing_gap=3.0)
+    impressao = _para_rgb(imagem)
+    miniatura = impressao.copy()
+    miniatura.thumbnail(TAMANHO_MINIATURA, Image.LANCZOS)
+    return ImagemProcessada(
+        hash=chave,
+        tamanho_original=tamanho_original,
+        tamanho=impressao.size,
+        miniatura=_codificar_jpeg(miniatura),
+        impressao=_codificar_jpeg(impressao),
+    )
+
+def como_imagem_processada(imagem):
+    """Aceita uma ImagemProcessada ou os bytes do arquivo."""
+    return imagem if isinstance(imagem, ImagemProcessada) else processar_imagem(imagem)
+
+def processar_imagens(imagens, max_threads=None):
+    """
+    Processa uma lista de imagens (bytes ou ImagemProcessada) em paralelo,
+    mantendo a ordem. Retorna a lista de ImagemProcessada.
+    """
+    pendentes = [i for i, imagem in enumerate(imagens) if not isinstance(imagem, ImagemProcessada)]
+    resultado = list(imagens)
+    if len(pendentes) <= 1:
+        return [como_imagem_processada(imagem) for imagem in resultado]
+    threads = min(len(pendentes), max_threads or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for indice, processada in zip(pendentes, executor.map(processar_imagem, [imagens[i] for i in pendentes])):
+            resultado[indice] = processada
+    return resultado
+
+def dimensoes_no_quadro(imagem, largura_maxima, altura_maxima):
+    """
+    Largura e altura para desenhar a imagem dentro do quadro, mantendo a proporção.
+    """
+    largura, altura = imagem.tamanho
+    escala = min(largura_maxima / largura, altura_maxima / altura)
+    return largura * escala, altura * escala
@@ -0,0 +1,299 @@
+"""
+Índice espacial (R-tree empacotada por STR) e análises sobre polígonos.
+
+Permite, para lotes de pontos (arrays NumPy), descobrir em quais polígonos
+de uma ColecaoGeometrias cada ponto está, qual o polígono mais próximo e a
+que distância, além de calcular área e perímetro geodésicos. A árvore é
+percorrida nível a nível com operações vetorizadas sobre todos os pares
+(ponto, nó) candidatos, sem varrer todos os polígonos para cada ponto.
+"""
+# Bibliotecas padrão do Python
+from collections import namedtuple
+
+# Bibliotecas de terceiros
+import numpy as np
+
+RAIO_AUTALICO = 6_371_007.2  # Raio da esfera de mesma área do elipsoide GRS80 (m)
+RAIO_MEDIO = 6_371_008.8
+CAPACIDADE_NO = 16
+ELEMENTOS_POR_BLOCO = 4_000_000  # limite de pares (ponto, aresta) avaliados de uma vez
+
+NivelArvore = namedtuple("NivelArvore", ["caixas", "inicio_filhos", "filhos"])
+
+def _caixas_dos_grupos(caixas, inicio_grupos):
+    """Caixa envolvente de cada grupo consecutivo de caixas."""
+    inicios = inicio_grupos[:-1]
+    return np.column_stack([
+        np.minimum.reduceat(caixas[:, 0], inicios),
+        np.minimum.reduceat(caixas[:, 1], inicios),
+        np.maximum.reduceat(caixas[:, 2], inicios),
+        np.maximum.reduceat(caixas[:, 3], inicios),
+    ])
+
+def _ordem_str(caixas, capacidade):
+    """
+    Ordem Sort-Tile-Recursive: fatias verticais pelo centro em x, e cada
+    fatia ordenada pelo centro em y.
+    """
+    total = len(caixas)
+    folhas = int(np.ceil(total / capacidade))
+    fatias = int(np.ceil(np.sqrt(folhas)))
+    por_fatia = fatias * capacidade
+    centro_x = (caixas[:, 0] + caixas[:, 2]) / 2
+    centro_y = (caixas[:, 1] + caixas[:, 3]) / 2
+    ordem_x = np.argsort(centro_x, kind="stable")
+    fatia = np.empty(total, dtype=np.int64)
+    fatia[ordem_x] = np.arange(total) // por_fatia
+    return np.lexsort((centro_y, fatia))
+
+def _distancia_caixa(x, y, caixas):
+    """Distância (no plano) de pontos a caixas; zero quando o ponto está dentro."""
+    dx = np.maximum(np.maximum(caixas[:, 0] - x, x - caixas[:, 2]), 0)
+    dy = np.maximum(np.maximum(caixas[:, 1] - y, y - caixas[:, 3]), 0)
+    return np.hypot(dx, dy)
+
+def _distancia_maxima_caixa(x, y, caixas):
+    """Distância ao canto mais distante da caixa (limite superior para os objetos nela)."""
+    dx = np.maximum(np.abs(x - caixas[:, 0]), np.abs(x - caixas[:, 2]))
+    dy = np.maximum(np.abs(y - caixas[:, 1]), np.abs(y - caixas[:, 3]))
+    return np.hypot(dx, dy)
+
+def _blocos(indices, arestas):
+    """Divide "indices" em blocos para limitar a matriz pontos x arestas."""
+    tamanho = max(1, ELEMENTOS_POR_BLOCO // max(arestas, 1))
+    for inicio in range(0, len(indices), tamanho):
+        yield indices[inicio:inicio + tamanho]
+
+class IndiceEspacial:
+    """
+    R-tree estática construída sobre os polígonos de uma ColecaoGeometrias.
+
+    As coordenadas são convertidas para um plano local em metros
+    (equiretangular centrado na coleção), adequado às distâncias regionais
+    da triagem de ocorrências.
+    """
+
+    def __init__(self, geometrias, capacidade=CAPACIDADE_NO):
+        self.geometrias = geometrias
+        coordenadas = geometrias.coordenadas
+        self._lat0 = float(coordenadas[:, 0].mean()) if len(coordenadas) else 0.0
+        self._escala_x = np.cos(np.radians(self._lat0)) * np.pi / 180 * RAIO_MEDIO
+        self._escala_y = np.pi / 180 * RAIO_MEDIO
+        self._plano = self._projetar(coordenadas[:, 0], coordenadas[:, 1])
+
+        # Intervalo de vértices de cada polígono (todos os anéis)
+        inicio_aneis = geometrias.inicio_aneis
+        self._inicio_vertices = inicio_aneis[geometrias.inicio_poligonos]
+        total = geometrias.total_poligonos
+        if total:
+            caixas = _caixas_dos_grupos(
+                np.column_stack([self._plano, self._plano]), self._inicio_vertices
+            )
+        else:
+            caixas = np.empty((0, 4))
+        self.caixas_poligonos = caixas
+
+        # Arestas: cada vértice liga-se ao próximo do mesmo anel
+        proximo = np.arange(1, len(coordenadas) + 1)
+        proximo[inicio_aneis[1:] - 1] = inicio_aneis[:-1]
+        self._proximo = proximo
+
+        # Construção de baixo para cima: em cada nível as entradas são
+        # ordenadas por STR e agrupadas de "capacidade" em "capacidade"; os
+        # filhos do nó i são filhos[inicio_filhos[i]:inicio_filhos[i + 1]]
+        niveis = []
+        entradas = caixas
+        while len(entradas):
+            ordem = _ordem_str(entradas, capacidade)
+            inicio_filhos = np.append(np.arange(0, len(entradas), capacidade), len(entradas))
+            pais = _caixas_dos_grupos(entradas[ordem], inicio_filhos)
+            niveis.append(NivelArvore(pais, inicio_filhos, ordem))
+            if len(pais) <= 1:
+                break
+            entradas = pais
+        self._niveis = niveis[::-1]  # raiz primeiro
+
+    def _projetar(self, latitudes, longitudes):
+        return np.column_stack([
+            np.asarray(longitudes, dtype=np.float64) * self._escala_x,
+            (np.asarray(latitudes, dtype=np.float64) - self._lat0) * self._escala_y,
+        ])
+
+    # ------------------------------------------------------------------
+    # Percurso da árvore
+    # ------------------------------------------------------------------
+
+    def _candidatos(self, x, y, criterio):
+        """
+        Percorre a árvore e retorna os pares (ponto, polígono) candidatos.
+
+        "criterio(pontos, caixas, x, y)" recebe os índices dos pontos e as
+        caixas dos nós de cada par e retorna a máscara dos pares mantidos.
+        """
+        if not self.geometrias.total_poligonos:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio
+        pontos = np.arange(len(x))
+        nos = np.zeros(len(x), dtype=np.int64)  # todos começam na raiz
+        for nivel in self._niveis:
+            manter = criterio(pontos, nivel.caixas[nos], x, y)
+            pontos, nos = pontos[manter], nos[manter]
+            inicio = nivel.inicio_filhos[nos]
+            quantidades = nivel.inicio_filhos[nos + 1] - inicio
+            pontos = np.repeat(pontos, quantidades)
+            deslocamentos = np.arange(quantidades.sum()) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+            nos = nivel.filhos[np.repeat(inicio, quantidades) + deslocamentos]
+        # No último nível os filhos já são os índices dos polígonos
+        manter = criterio(pontos, self.caixas_poligonos[nos], x, y)
+        return pontos[manter], nos[manter]
+
+    def _pontos_no_plano(self, latitudes, longitudes):
+        plano = self._projetar(np.atleast_1d(latitudes), np.atleast_1d(longitudes))
+        return plano[:, 0], plano[:, 1]
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _dentro(self, x, y, pontos, poligonos):
+        """Teste par-ímpar (ray casting) para cada par (ponto, polígono)."""
+        resultado = np.zeros(len(pontos), dtype=bool)
+        ordem = np.argsort(poligonos, kind="stable")
+        pontos, poligonos = pontos[ordem], poligonos[ordem]
+        limites = np.flatnonzero(np.diff(poligonos)) + 1
+        for grupo in np.split(np.arange(len(pontos)), limites):
+            if not len(grupo):
+                continue
+            p = poligonos[grupo[0]]
+            inicio, fim = self._inicio_vertices[p], self._inicio_vertices[p + 1]
+            a = self._plano[inicio:fim]
+            b = self._plano[self._proximo[inicio:fim]]
+            for bloco in _blocos(grupo, len(a)):
+                px, py = x[pontos[bloco]][:, None], y[pontos[bloco]][:, None]
+                cruza = (a[:, 1] > py) != (b[:, 1] > py)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    x_cruzamento = a[:, 0] + (py - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+                resultado[ordem[bloco]] = (np.count_nonzero(cruza & (px < x_cruzamento), axis=1) % 2) == 1
+        return resultado
+
+    def poligonos_contendo(self, latitudes, longitudes):
+        """
+        Retorna os pares (indice_ponto, indice_poligono) em que o ponto está
+        dentro do polígono (furos excluídos).
+        """
+        x, y = self._pontos_no_plano(latitudes, longitudes)
+
+        def contem(pontos, caixas, x, y):
+            px, py = x[pontos], y[pontos]
+            return (caixas[:, 0] <= px) & (px <= caixas[:, 2]) & (caixas[:, 1] <= py) & (py <= caixas[:, 3])
+
+        pontos, poligonos = self._candidatos(x, y, contem)
+        dentro = self._dentro(x, y, pontos, poligonos)
+        return pontos[dentro], poligonos[dentro]
+
+    def pontos_em_poligonos(self, latitudes, longitudes):
+        """
+        Para cada ponto, o índice do primeiro polígono que o contém (ou -1).
+        """
+        total = len(np.atleast_1d(latitudes))
+        pontos, poligonos = self.poligonos_contendo(latitudes, longitudes)
+        resultado = np.full(total, -1, dtype=np.int64)
+        # Percorre do fim para o início para que o menor índice prevaleça
+        resultado[pontos[::-1]] = poligonos[::-1]
+        return resultado
+
+    def poligono_mais_proximo(self, latitudes, longitudes):
+        """
+        Para cada ponto, retorna (indice_poligono, distancia_em_metros).
+
+        A distância é até o contorno mais próximo e vale zero quando o ponto
+        está dentro do polígono.
+        """
+        x, y = self._pontos_no_plano(latitudes, longitudes)
+        total = len(x)
+        if not self.geometrias.total_poligonos:
+            return np.full(total, -1, dtype=np.int64), np.full(total, np.inf)
+
+        def promissor(pontos, caixas, x, y):
+            px, py = x[pontos], y[pontos]
+            minima = _distancia_caixa(px, py, caixas)
+            # Qualquer objeto de um nó está a no máximo a distância do canto
+            # mais distante; nós cuja distância mínima excede o menor desses
+            # limites (para o mesmo ponto) não podem conter o mais próximo.
+            maxima = _distancia_maxima_caixa(px, py, caixas)
+            limite = np.full(total, np.inf)
+            np.minimum.at(limite, pontos, maxima)
+            return minima <= limite[pontos]
+
+        pontos, poligonos = self._candidatos(x, y, promissor)
+        distancias = self._distancia_contorno(x, y, pontos, poligonos)
+        distancias[self._dentro(x, y, pontos, poligonos)] = 0.0
+
+        melhor = np.full(total, np.inf)
+        np.minimum.at(melhor, pontos, distancias)
+        vencedores = distancias == melhor[pontos]
+        indices = np.full(total, -1, dtype=np.int64)
+        indices[pontos[vencedores][::-1]] = poligonos[vencedores][::-1]
+        return indices, melhor
+
+    def _distancia_contorno(self, x, y, pontos, poligonos):
+        """Distância de cada ponto ao contorno (todas as arestas) do polígono do par."""
+        resultado = np.empty(len(pontos))
+        ordem = np.argsort(poligonos, kind="stable")
+        limites = np.flatnonzero(np.diff(poligonos[ordem])) + 1
+        for grupo in np.split(ordem, limites):
+            if not len(grupo):
+                continue
+            p = poligonos[grupo[0]]
+            inicio, fim = self._inicio_vertices[p], self._inicio_vertices[p + 1]
+            a = self._plano[inicio:fim]
+            ab = self._plano[self._proximo[inicio:fim]] - a
+            comprimento2 = (ab ** 2).sum(axis=1)
+            for bloco in _blocos(grupo, len(a)):
+                px, py = x[pontos[bloco]][:, None], y[pontos[bloco]][:, None]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    t = ((px - a[:, 0]) * ab[:, 0] + (py - a[:, 1]) * ab[:, 1]) / comprimento2
+                t = np.clip(np.nan_to_num(t), 0, 1)
+                dx = a[:, 0] + t * ab[:, 0] - px
+                dy = a[:, 1] + t * ab[:, 1] - py
+                resultado[bloco] = np.sqrt(dx ** 2 + dy ** 2).min(axis=1)
+        return resultado
+
+def areas_geodesicas(geometrias):
+    """
+    Área (m²) de cada polígono, descontando os furos.
+
+    Usa a fórmula de área de polígonos na esfera (Chamberlain e Duquette,
+    2007) com o raio autálico do GRS80, vetorizada para todos os anéis.
+    """
+    if not geometrias.total_poligonos:
+        return np.empty(0)
+    coordenadas = np.radians(geometrias.coordenadas)
+    inicio_aneis = geometrias.inicio_aneis
+    proximo = np.arange(1, len(coordenadas) + 1)
+    proximo[inicio_aneis[1:] - 1] = inicio_aneis[:-1]
+    lat1, lon1 = coordenadas[:, 0], coordenadas[:, 1]
+    lat2, lon2 = lat1[proximo], lon1[proximo]
+    delta_lon = np.remainder(lon2 - lon1 + np.pi, 2 * np.pi) - np.pi
+    termos = delta_lon * (2 + np.sin(lat1) + np.sin(lat2))
+    area_aneis = np.abs(np.add.reduceat(termos, inicio_aneis[:-1])) * RAIO_AUTALICO ** 2 / 2
+    externos = np.zeros(len(area_aneis), dtype=bool)
+    externos[geometrias.inicio_poligonos[:-1]] = True
+    return np.add.reduceat(np.where(externos, area_aneis, -area_aneis), geometrias.inicio_poligonos[:-1])
+
+def perimetros_geodesicos(geometrias):
+    """
+    Perímetro (m) de cada polígono (todos os anéis), pela fórmula de haversine.
+    """
+    if not geometrias.total_poligonos:
+        return np.empty(0)
+    coordenadas = np.radians(geometrias.coordenadas)
+    inicio_aneis = geometrias.inicio_aneis
+    proximo = np.arange(1, len(coordenadas) + 1)
+    proximo[inicio_aneis[1:] - 1] = inicio_aneis[:-1]
+    lat1, lon1 = coordenadas[:, 0], coordenadas[:, 1]
+    lat2, lon2 = lat1[proximo], lon1[proximo]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    segmentos = 2 * RAIO_MEDIO * np.arcsin(np.sqrt(h))
+    por_anel = np.add.reduceat(segmentos, inicio_aneis[:-1])
+    return np.add.reduceat(por_anel, geometrias.inicio_poligonos[:-1])
@@ -0,0 +1,180 @@
+"""
+Medição de tempo por etapa e contadores (acertos de cache etc.).
+
+As etapas do processamento são marcadas com medir("nome"), como
+gerenciador de contexto ou decorador, e os eventos com contar("nome").
+Cada medição entra nas estatísticas do processo (últimas
+JANELA_ESTATISTICAS durações por etapa) e, se houver uma coleta ativa no
+contexto atual (iniciar_coleta), na lista de etapas dessa coleta, com a
+profundidade de aninhamento. A coleta pode ainda gravar um perfil
+(cProfile, ou pyinstrument se instalado) e ser exportada em JSON Lines para
+agregar latências entre sessões.
+
+Só usa a biblioteca padrão: o custo de uma medição é o de duas chamadas a
+time.perf_counter, então as marcações podem ficar no código de produção.
+"""
+# Bibliotecas padrão do Python
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime as dt
+
+JANELA_ESTATISTICAS = 500
+VARIAVEL_ARQUIVO = "EXTRATOR_DIAGNOSTICO"  # Se definida, cada coleta é anexada a este .jsonl
+PERFILADORES = ("cprofile", "pyinstrument")
+
+_coleta_atual = contextvars.ContextVar("coleta_atual", default=None)
+_profundidade = contextvars.ContextVar("profundidade", default=0)
+_trava = threading.Lock()
+_duracoes = defaultdict(lambda: deque(maxlen=JANELA_ESTATISTICAS))
+_contadores = Counter()
+
+class Coleta:
+    """
+    Etapas e contadores registrados durante uma execução (uma execução do
+    script do Streamlit, uma requisição do serviço...).
+    """
+
+    def __init__(self, rotulo=""):
+        self.rotulo = rotulo
+        self.inicio = time.perf_counter()
+        self.criada_em = dt.now().isoformat(timespec="seconds")
+        self.etapas = []  # (nome, início relativo em s, duração em s, profundidade)
+        self.contadores = Counter()
+        self.duracao = None
+        self.perfil = None
+
+    def como_dict(self):
+        return {
+            "rotulo": self.rotulo,
+            "criada_em": self.criada_em,
+            "duracao_ms": round(self.duracao * 1000, 3) if self.duracao is not None else None,
+            "etapas": [
+                {"nome": nome, "inicio_ms": round(inicio * 1000, 3), "duracao_ms": round(duracao * 1000, 3), "profundidade": profundidade}
+                for nome, inicio, duracao, profundidade in self.etapas
+            ],
+            "contadores": dict(self.contadores),
+        }
+
+    def como_jsonl(self):
+        return json.dumps(self.como_dict(), ensure_ascii=False)
+
+@contextmanager
+def medir(nome):
+    """
+    Mede o bloco como a etapa "nome". Também serve de decorador, medindo
+    cada chamada: @medir("kml.ler").
+    """
+    profundidade = _profundidade.get()
+    marcador = _profundidade.set(profundidade + 1)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        _profundidade.reset(marcador)
+        with _trava:
+            _duracoes[nome].append(duracao)
+        coleta = _coleta_atual.get()
+        if coleta is not None:
+            coleta.etapas.append((nome, inicio - coleta.inicio, duracao, profundidade))
+
+def contar(nome, quantidade=1):
+    """Soma "quantidade" ao contador "nome" (no processo e na coleta ativa)."""
+    with _trava:
+        _contadores[nome] += quantidade
+    coleta = _coleta_atual.get()
+    if coleta is not None:
+        coleta.contadores[nome] += quantidade
+
+@contextmanager
+def iniciar_coleta(rotulo="", perfilador=None):
+    """
+    Registra as etapas e contadores do bloco em uma nova Coleta.
+
+    "perfilador" ("cprofile" ou "pyinstrument") grava também o perfil do
+    bloco, como texto, em coleta.perfil. Se a variável de ambiente
+    EXTRATOR_DIAGNOSTICO apontar para um arquivo, a coleta é anexada a ele
+    em JSON Lines ao final.
+    """
+    coleta = Coleta(rotulo)
+    marcador = _coleta_atual.set(coleta)
+    perfil = _iniciar_perfil(perfilador)
+    try:
+        yield coleta
+    finally:
+        coleta.duracao = time.perf_counter() - coleta.inicio
+        if perfil is not None:
+            coleta.perfil = _encerrar_perfil(perfil)
+        _coleta_atual.reset(marcador)
+        arquivo = os.environ.get(VARIAVEL_ARQUIVO)
+        if arquivo:
+            exportar_jsonl([coleta], arquivo)
+
+def _iniciar_perfil(perfilador):
+    if perfilador is None:
+        return None
+    if perfilador == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            pass  # Dependência opcional: sem ela, usa o cProfile
+        else:
+            perfil = Profiler()
+            perfil.start()
+            return perfil
+    import cProfile
+
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+def _encerrar_perfil(perfil):
+    if type(perfil).__module__.startswith("pyinstrument"):
+        perfil.stop()
+        return perfil.output_text()
+    import io
+    import pstats
+
+    perfil.disable()
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(40)
+    return texto.getvalue()
+
+def _percentil(ordenados, fracao):
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+def estatisticas():
+    """
+    Resumo do processo: por etapa, amostras, p50, p95 e máximo (ms), e os
+    contadores.
+    """
+    with _trava:
+        duracoes = {nome: sorted(valores) for nome, valores in _duracoes.items()}
+        contadores = dict(_contadores)
+    etapas = {
+        nome: {
+            "amostras": len(valores),
+            "p50_ms": round(_percentil(valores, 0.5) * 1000, 2),
+            "p95_ms": round(_percentil(valores, 0.95) * 1000, 2),
+            "max_ms": round(valores[-1] * 1000, 2),
+        }
+        for nome, valores in sorted(duracoes.items()) if valores
+    }
+    return {"etapas": etapas, "contadores": contadores}
+
+def exportar_jsonl(coletas, destino):
+    """
+    Anexa as coletas a "destino" (caminho ou arquivo de texto aberto), uma
+    por linha.
+    """
+    linhas = "".join(coleta.como_jsonl() + "\n" for coleta in coletas)
+    if hasattr(destino, "write"):
+        destino.write(linhas)
+        return
+    with _trava, open(destino, "a", encoding="utf-8") as arquivo:
+        arquivo.write(linhas)
@@ -0,0 +1,46 @@
+"""
+Leitura de GeoJSON (Polygon/MultiPolygon) para uma ColecaoGeometrias.
+"""
+# Bibliotecas padrão do Python
+import json
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.geometria import ColecaoGeometrias
+from extrator.instrumentacao import medir
+
+# Propriedades usadas como nome da feição, em ordem de preferência
+# (a malha municipal do IBGE usa NM_MUN)
+CAMPOS_NOME = ("NM_MUN", "nm_mun", "NOME", "nome", "name", "Name", "MUNICIPIO", "municipio")
+
+@medir("geojson.ler")
+def carregar_geojson(caminho):
+    """
+    Lê um GeoJSON (FeatureCollection de Polygon/MultiPolygon) para uma
+    ColecaoGeometrias, usando as propriedades como dados da feição.
+
+    "caminho" também pode ser um arquivo já aberto.
+    """
+    if isinstance(caminho, str):
+        with open(caminho, encoding="utf-8") as arquivo:
+            documento = json.load(arquivo)
+    else:
+        documento = json.load(caminho)
+    feicoes = documento.get("features", [documento] if documento.get("type") == "Feature" else [])
+    colecao = ColecaoGeometrias()
+    for feicao in feicoes:
+        geometria = feicao.get("geometry") or {}
+        propriedades = feicao.get("properties") or {}
+        if geometria.get("type") == "Polygon":
+            poligonos = [geometria["coordinates"]]
+        elif geometria.get("type") == "MultiPolygon":
+            poligonos = geometria["coordinates"]
+        else:
+            continue
+        # GeoJSON usa (lon, lat); a coleção guarda (lat, lon)
+        poligonos = [[np.asarray(anel, dtype=np.float64)[:, 1::-1] for anel in aneis] for aneis in poligonos]
+        nome = next((str(propriedades[campo]) for campo in CAMPOS_NOME if propriedades.get(campo)), "")
+        colecao.adicionar_feicao(poligonos, nome=nome, dados=propriedades)
+    return colecao
@@ -0,0 +1,134 @@
+"""
+Leitura em fluxo (streaming) de arquivos KML/KMZ.
+
+O documento é percorrido com iterparse e cada Placemark é descartado logo
+depois de processado, então o consumo de memória não depende do tamanho do
+arquivo, apenas da maior feição.
+"""
+# Bibliotecas padrão do Python
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import namedtuple
+from contextlib import ExitStack
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.geometria import ColecaoGeometrias
+from extrator.instrumentacao import medir
+
+Feicao = namedtuple("Feicao", ["nome", "dados", "poligonos"])
+
+_ESPACO_APOS_VIRGULA = re.compile(r"\s*,\s*")
+
+def _nome_local(tag):
+    """Remove o namespace ("{http://...}Polygon" -> "Polygon")."""
+    return tag.rsplit("}", 1)[-1]
+
+def converter_texto_coordenadas(texto):
+    """
+    Converte o texto de um elemento <coordinates> em array (n, 2) de (lat, lon).
+
+    As tuplas "lon,lat[,alt]" são convertidas de uma só vez pelo NumPy; só
+    quando as tuplas misturam 2 e 3 valores a conversão é feita uma a uma.
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return np.empty((0, 2))
+    if ", " in texto or " ," in texto:
+        texto = _ESPACO_APOS_VIRGULA.sub(",", texto)
+    tuplas = texto.split()
+    dimensoes = tuplas[0].count(",") + 1
+    valores = np.array(texto.replace(",", " ").split(), dtype=np.float64)
+    if dimensoes in (2, 3) and len(valores) == len(tuplas) * dimensoes:
+        valores = valores.reshape(-1, dimensoes)
+    else:
+        valores = np.array([[float(v) for v in tupla.split(",")[:2]] for tupla in tuplas])
+    return valores[:, 1::-1].copy()
+
+def _abrir_kml(arquivo, nome, pilha):
+    """
+    Retorna um arquivo binário com o conteúdo KML (descompactando KMZ).
+
+    Os arquivos abertos aqui são registrados em "pilha" (ExitStack).
+    """
+    nome = nome or getattr(arquivo, "name", "") or (arquivo if isinstance(arquivo, str) else "")
+    if str(nome).lower().endswith(".kmz"):
+        kmz = pilha.enter_context(zipfile.ZipFile(arquivo, "r"))
+        membros = [f for f in kmz.namelist() if f.lower().endswith(".kml")]
+        if not membros:
+            raise ValueError("O arquivo KMZ não contém nenhum KML.")
+        # doc.kml é o documento principal por convenção; os demais são anexos
+        principal = next((f for f in membros if f.lower().endswith("doc.kml")), membros[0])
+        return pilha.enter_context(kmz.open(principal))
+    if isinstance(arquivo, str):
+        return pilha.enter_context(open(arquivo, "rb"))
+    return arquivo
+
+def iterar_placemarks(arquivo, nome=""):
+    """
+    Percorre o KML/KMZ e gera uma Feicao por Placemark que contenha polígonos.
+
+    Cada Feicao traz o nome, os dados estendidos (ExtendedData) e a lista de
+    polígonos; cada polígono é uma lista de anéis (arrays de lat/lon) com o
+    contorno externo primeiro e os furos em seguida. Polígonos dentro de
+    MultiGeometry pertencem ao mesmo Placemark.
+    """
+    pilha = ExitStack()
+    fonte = _abrir_kml(arquivo, nome, pilha)
+    elementos = []  # pilha de elementos abertos
+    tags = []  # pilha com os nomes locais correspondentes
+    poligonos = []
+    nome_placemark = ""
+    dados = {}
+    try:
+        for evento, elemento in ET.iterparse(fonte, events=("start", "end")):
+            if evento == "start":
+                elementos.append(elemento)
+                tags.append(_nome_local(elemento.tag))
+                if tags[-1] == "Polygon":
+                    poligonos.append([])
+                continue
+
+            tag = tags.pop()
+            elementos.pop()
+            pai = tags[-1] if tags else ""
+
+            if tag == "coordinates" and "Polygon" in tags and "LinearRing" in tags:
+                anel = converter_texto_coordenadas(elemento.text)
+                if "outerBoundaryIs" in tags:
+                    poligonos[-1].insert(0, anel)
+                else:
+                    poligonos[-1].append(anel)
+                elemento.clear()
+            elif tag == "name" and pai == "Placemark":
+                nome_placemark = (elemento.text or "").strip()
+            elif tag == "Data" and "ExtendedData" in tags:
+                valor = elemento.find("{*}value")
+                dados[elemento.get("name", "")] = (valor.text or "").strip() if valor is not None else ""
+            elif tag == "SimpleData" and "ExtendedData" in tags:
+                dados[elemento.get("name", "")] = (elemento.text or "").strip()
+            elif tag == "Placemark":
+                poligonos = [aneis for aneis in poligonos if aneis]
+                if poligonos:
+                    yield Feicao(nome_placemark, dados, poligonos)
+                poligonos, nome_placemark, dados = [], "", {}
+                # Ao final do elemento ele é sempre o último filho do pai;
+                # removê-lo libera a subárvore já processada.
+                elemento.clear()
+                if elementos:
+                    del elementos[-1][-1]
+    finally:
+        pilha.close()
+
+@medir("kml.ler")
+def carregar_geometrias(arquivo, nome=""):
+    """
+    Lê todas as feições do KML/KMZ para uma ColecaoGeometrias.
+    """
+    colecao = ColecaoGeometrias()
+    for feicao in iterar_placemarks(arquivo, nome):
+        colecao.adicionar_feicao(feicao.poligonos, nome=feicao.nome, dados=feicao.dados)
+    return colecao
@@ -0,0 +1,260 @@
+"""
+Conversão em lote de arquivos KML/KMZ.
+
+Lê todos os KML/KMZ de um diretório (com subdiretórios) ou de um arquivo
+ZIP, distribui a leitura entre processos e consolida as feições em uma
+única coleção, gravada em um arquivo (KMZ, GeoJSON...) e em uma tabela de
+coordenadas em graus decimais e GMS.
+
+Exemplo:
+    python -m extrator merge kmls/ -o consolidado.kmz --processos 8
+    python -m extrator merge entregas.zip -o consolidado.geojson --tabela coordenadas.csv
+
+Cada KMZ tem todos os seus KML lidos (não só o doc.kml). Feições com a
+mesma geometria (mesmos polígonos, coordenadas arredondadas para
+CASAS_DECIMAIS) entram uma vez só, na primeira ocorrência, que segue a
+ordem dos arquivos; os dados estendidos recebem o campo "origem" com o
+arquivo de onde a feição veio.
+"""
+# Bibliotecas padrão do Python
+import argparse
+import hashlib
+import os
+import sys
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.exportacao import FORMATO_CSV_GMS, FORMATOS, exportar, formato_pela_extensao
+from extrator.geometria import ColecaoGeometrias
+from extrator.instrumentacao import medir
+from extrator.leitura_kml import iterar_placemarks
+
+CASAS_DECIMAIS = 7  # ~1 cm: a mesma área exportada com outra precisão ainda é duplicata
+EXTENSOES = (".kml", ".kmz")
+MAXIMO_POR_BLOCO = 32  # Arquivos por tarefa enviada a um processo
+CAMPO_ORIGEM = "origem"
+
+# Arquivo a ler: "caminho" no disco ou, se "membro" não for None, o membro
+# "membro" do ZIP em "caminho"
+Origem = namedtuple("Origem", ["caminho", "membro", "nome"])
+
+# Resultado da leitura de um arquivo: feições como (hash, nome, dados, poligonos)
+Leitura = namedtuple("Leitura", ["nome", "feicoes", "documentos", "erro"])
+
+def listar_origens(entrada):
+    """
+    Lista as Origem de "entrada": um diretório (percorrido em ordem
+    alfabética, com subdiretórios), um ZIP com KML/KMZ ou um único KML/KMZ.
+    """
+    if os.path.isdir(entrada):
+        origens = []
+        for raiz, diretorios, arquivos in os.walk(entrada):
+            diretorios.sort()
+            for arquivo in sorted(arquivos):
+                if arquivo.lower().endswith(EXTENSOES):
+                    caminho = os.path.join(raiz, arquivo)
+                    origens.append(Origem(caminho, None, os.path.relpath(caminho, entrada).replace(os.sep, "/")))
+        return origens
+    if entrada.lower().endswith(EXTENSOES):
+        return [Origem(entrada, None, os.path.basename(entrada))]
+    if zipfile.is_zipfile(entrada):
+        with zipfile.ZipFile(entrada) as arquivo_zip:
+            return [
+                Origem(entrada, membro, membro)
+                for membro in arquivo_zip.namelist()
+                if membro.lower().endswith(EXTENSOES) and not membro.endswith("/")
+            ]
+    raise ValueError(f"{entrada} não é um diretório, um ZIP nem um arquivo KML/KMZ.")
+
+def hash_poligonos(poligonos):
+    """
+    Identificador (SHA-256) da geometria de uma feição: a estrutura de
+    polígonos e anéis e as coordenadas arredondadas para CASAS_DECIMAIS.
+    """
+    resumo = hashlib.sha256()
+    for aneis in poligonos:
+        resumo.update(b"P%d" % len(aneis))
+        for anel in aneis:
+            # "+ 0.0" troca -0.0 por 0.0, que tem outros bytes
+            pontos = np.round(np.asarray(anel, dtype=np.float64), CASAS_DECIMAIS) + 0.0
+            resumo.update(b"A%d" % len(pontos))
+            resumo.update(pontos.tobytes())
+    return resumo.hexdigest()
+
+def _documentos_kml(fonte, nome):
+    """
+    Gera (origem, nome do KML, arquivo) de cada documento KML de "fonte"
+    (caminho ou arquivo binário): o próprio KML ou todos os KML de um KMZ,
+    com o doc.kml primeiro.
+    """
+    if not nome.lower().endswith(".kmz"):
+        yield nome, nome, fonte
+        return
+    with zipfile.ZipFile(fonte) as kmz:
+        membros = [membro for membro in kmz.namelist() if membro.lower().endswith(".kml")]
+        if not membros:
+            raise ValueError("O arquivo KMZ não contém nenhum KML.")
+        membros.sort(key=lambda membro: not membro.lower().endswith("doc.kml"))
+        for membro in membros:
+            with kmz.open(membro) as documento:
+                yield (nome if len(membros) == 1 else f"{nome}/{membro}"), membro, documento
+
+def ler_arquivo(fonte, nome):
+    """
+    Lê todas as feições de um KML/KMZ (caminho ou arquivo binário). Retorna
+    uma Leitura; erros de leitura ficam em Leitura.erro.
+    """
+    feicoes = []
+    documentos = 0
+    try:
+        for origem, nome_kml, documento in _documentos_kml(fonte, nome):
+            documentos += 1
+            for feicao in iterar_placemarks(documento, nome_kml):
+                dados = {**feicao.dados, CAMPO_ORIGEM: origem}
+                feicoes.append((hash_poligonos(feicao.poligonos), feicao.nome, dados, feicao.poligonos))
+    except Exception as e:
+        return Leitura(nome, feicoes, documentos, f"{type(e).__name__}: {e}")
+    return Leitura(nome, feicoes, documentos, None)
+
+@lru_cache(maxsize=4)
+def _zip_entrada(caminho):
+    """ZIP de entrada aberto uma vez por processo de trabalho."""
+    return zipfile.ZipFile(caminho)
+
+def ler_bloco(origens):
+    """Lê um bloco de Origem dentro de um processo do pool; retorna a lista de Leitura."""
+    leituras = []
+    for origem in origens:
+        if origem.membro is None:
+            leituras.append(ler_arquivo(origem.caminho, origem.nome))
+            continue
+        try:
+            dados = _zip_entrada(origem.caminho).read(origem.membro)
+        except Exception as e:
+            leituras.append(Leitura(origem.nome, [], 0, f"{type(e).__name__}: {e}"))
+            continue
+        leituras.append(ler_arquivo(BytesIO(dados), origem.nome))
+    return leituras
+
+class Consolidacao:
+    """
+    Coleção consolidada e contagens de uma conversão em lote. As leituras
+    devem ser adicionadas na ordem dos arquivos para que a primeira
+    ocorrência de cada geometria seja sempre a mesma.
+    """
+
+    def __init__(self):
+        self.geometrias = ColecaoGeometrias()
+        self.hashes = set()
+        self.arquivos = 0
+        self.documentos = 0
+        self.feicoes_lidas = 0
+        self.duplicadas = 0
+        self.erros = []  # (nome do arquivo, mensagem)
+
+    def adicionar(self, leitura):
+        self.arquivos += 1
+        self.documentos += leitura.documentos
+        if leitura.erro:
+            self.erros.append((leitura.nome, leitura.erro))
+        for hash_feicao, nome, dados, poligonos in leitura.feicoes:
+            self.feicoes_lidas += 1
+            if hash_feicao in self.hashes:
+                self.duplicadas += 1
+                continue
+            self.hashes.add(hash_feicao)
+            self.geometrias.adicionar_feicao(poligonos, nome=nome, dados=dados)
+
+@medir("kml.lote")
+def consolidar(origens, processos=None, ao_ler=None):
+    """
+    Lê as Origem em paralelo e retorna a Consolidacao. "ao_ler" é chamado
+    com cada Leitura, na ordem dos arquivos.
+    """
+    processos = processos or os.cpu_count() or 1
+    # Blocos pequenos o bastante para equilibrar os processos, grandes o
+    # bastante para que a troca de mensagens não domine arquivos pequenos
+    tamanho_bloco = max(1, min(MAXIMO_POR_BLOCO, len(origens) // (processos * 4)))
+    blocos = [origens[inicio:inicio + tamanho_bloco] for inicio in range(0, len(origens), tamanho_bloco)]
+    consolidacao = Consolidacao()
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        # map devolve os blocos na ordem de envio: a deduplicação é determinística
+        for leituras in executor.map(ler_bloco, blocos):
+            for leitura in leituras:
+                consolidacao.adicionar(leitura)
+                if ao_ler:
+                    ao_ler(leitura)
+    return consolidacao
+
+def configurar_argumentos(parser):
+    """
+    Declara os argumentos da conversão em lote (usado também por "python -m extrator merge").
+    """
+    parser.add_argument("entrada", help="Diretório ou ZIP com arquivos KML/KMZ")
+    parser.add_argument("-o", "--saida", default="consolidado.kmz", help="Arquivo consolidado (formato pela extensão)")
+    parser.add_argument("-f", "--formato", choices=list(FORMATOS), help="Formato do arquivo consolidado")
+    parser.add_argument("--tabela", help="Tabela de coordenadas em decimal e GMS (padrão: <saída>_coordenadas.csv)")
+    parser.add_argument("--sem-tabela", action="store_true", help="Não grava a tabela de coordenadas")
+    parser.add_argument("-p", "--processos", type=int, default=None, help="Número de processos (padrão: número de núcleos)")
+    return parser
+
+def executar(args):
+    """
+    Converte a entrada descrita pelos argumentos; retorna o código de saída.
+    """
+    try:
+        # Antes da leitura: uma extensão de saída desconhecida não deve custar a conversão inteira
+        formato = formato_pela_extensao(args.saida, args.formato)
+        origens = listar_origens(args.entrada)
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    if not origens:
+        print("Nenhum arquivo KML/KMZ encontrado.", file=sys.stderr)
+        return 1
+
+    def ao_ler(leitura):
+        if leitura.erro:
+            print(f"[ERRO] {leitura.nome} - {leitura.erro}", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    consolidacao = consolidar(origens, args.processos, ao_ler)
+    geometrias = consolidacao.geometrias
+    if not geometrias:
+        print("Nenhum polígono encontrado.", file=sys.stderr)
+        return 1
+    exportar(geometrias, formato, args.saida)
+    destinos = [args.saida]
+    if not args.sem_tabela:
+        tabela = args.tabela or f"{os.path.splitext(args.saida)[0]}_coordenadas.csv"
+        exportar(geometrias, FORMATO_CSV_GMS, tabela)
+        destinos.append(tabela)
+    total = time.perf_counter() - inicio
+
+    print(
+        f"{consolidacao.arquivos} arquivo(s), {consolidacao.documentos} documento(s) KML, "
+        f"{consolidacao.feicoes_lidas} feição(ões) lida(s), {consolidacao.duplicadas} duplicada(s), "
+        f"{len(consolidacao.erros)} erro(s) em {total:.2f}s",
+        file=sys.stderr,
+    )
+    print(
+        f"{len(geometrias)} feição(ões), {geometrias.total_poligonos} polígono(s), "
+        f"{geometrias.total_vertices} vértice(s) -> {', '.join(destinos)}",
+        file=sys.stderr,
+    )
+    return 1 if consolidacao.erros else 0
+
+def main(argv=None):
+    parser = configurar_argumentos(argparse.ArgumentParser(description="Consolida arquivos KML/KMZ de um diretório ou ZIP."))
+    return executar(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
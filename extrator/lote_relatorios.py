@@ -0,0 +1,193 @@
+"""
+Geração em lote de relatórios de análise de ocorrências.
+
+Lê um manifesto (JSON ou CSV) com um relatório por entrada, distribui as
+chamadas a gerar_pdf entre processos e grava os PDFs em um arquivo ZIP à
+medida que ficam prontos.
+
+Exemplo:
+    python -m extrator batch manifesto.csv -o relatorios.zip --processos 8
+
+Cada entrada do manifesto usa as mesmas chaves do dicionário "relatorio"
+montado em analise_ocorrencias. As imagens vêm na lista "imagens" (itens
+com "imagem", "data" e "fonte") ou, em CSV, nos campos numerados imagem1,
+imagem2... (com data_imagem1, fonte_imagem1...), sempre com o caminho
+relativo ao manifesto. O campo opcional "arquivo" define o nome do PDF
+dentro do ZIP.
+"""
+# Bibliotecas padrão do Python
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Módulos do projeto
+from extrator.relatorio_pdf import gerar_pdf, modelo_pdf
+
+PADRAO_CAMPO_IMAGEM = re.compile(r"imagem\d+")
+CAMPOS_BOOLEANOS = ("conclusao_fiscalizacao", "conclusao_encerramento")
+VALORES_VERDADEIROS = {"1", "true", "sim", "s", "x", "yes"}
+
+def carregar_manifesto(caminho):
+    """
+    Lê o manifesto e retorna a lista de entradas (dicionários).
+    """
+    if caminho.lower().endswith(".csv"):
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            entradas = list(csv.DictReader(arquivo))
+        for entrada in entradas:
+            for campo in CAMPOS_BOOLEANOS:
+                if campo in entrada:
+                    entrada[campo] = str(entrada[campo]).strip().lower() in VALORES_VERDADEIROS
+        return entradas
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    if isinstance(dados, dict):
+        dados = dados.get("relatorios", [])
+    return dados
+
+def nome_arquivo_pdf(indice, entrada):
+    """
+    Define o nome do PDF dentro do ZIP.
+    """
+    nome = entrada.get("arquivo") or f"relatorio_{entrada.get('numero_relatorio') or indice + 1}"
+    nome = os.path.basename(str(nome))
+    if not nome.lower().endswith(".pdf"):
+        nome += ".pdf"
+    return nome
+
+def inicializar_worker():
+    """
+    Aquece os caches de recursos do PDF no início de cada processo: o
+    ModeloPdf carrega os estilos e as imagens da moldura já decodificadas.
+    """
+    modelo_pdf()
+
+def ler_imagem(caminho, diretorio_base):
+    """Bytes da imagem em "caminho" (relativo ao manifesto), ou None."""
+    if not caminho:
+        return None
+    with open(os.path.join(diretorio_base, caminho), "rb") as arquivo:
+        return arquivo.read()
+
+def renderizar_entrada(indice, entrada, diretorio_base):
+    """
+    Gera o PDF de uma entrada do manifesto dentro de um processo do pool.
+
+    Retorna (indice, dados_pdf, segundos, erro); em caso de falha dados_pdf é
+    None e erro traz a mensagem.
+    """
+    inicio = time.perf_counter()
+    relatorio = dict(entrada)
+    try:
+        # As imagens são lidas aqui e reduzidas em paralelo dentro de gerar_pdf
+        relatorio["imagens"] = [
+            dict(item, imagem=ler_imagem(item.get("imagem"), diretorio_base)) for item in relatorio.get("imagens") or []
+        ]
+        for campo in list(relatorio):
+            if PADRAO_CAMPO_IMAGEM.fullmatch(campo):
+                relatorio[campo] = ler_imagem(relatorio[campo], diretorio_base)
+        dados = gerar_pdf(relatorio).getvalue()
+        return indice, dados, time.perf_counter() - inicio, None
+    except Exception as e:
+        return indice, None, time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+
+def gerar_lote(entradas, destino, diretorio_base=".", processos=None, ao_concluir=None):
+    """
+    Gera os PDFs das entradas em paralelo e os grava no ZIP "destino".
+
+    "destino" pode ser um caminho ou um arquivo binário aberto (inclusive não
+    posicionável, como sys.stdout.buffer). Os PDFs são gravados assim que
+    ficam prontos e no máximo 4 tarefas por processo ficam pendentes, então a
+    memória não cresce com o tamanho do lote. "ao_concluir" é chamado com
+    (nome, segundos, erro) para cada relatório. Retorna a lista de resultados.
+    """
+    processos = processos or os.cpu_count() or 1
+    limite_pendentes = processos * 4
+    resultados = []
+    nomes_usados = set()
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zip_saida, \
+            ProcessPoolExecutor(max_workers=processos, initializer=inicializar_worker) as executor:
+        pendentes = {}
+        fila = iter(enumerate(entradas))
+
+        def enviar_proximas():
+            for indice, entrada in fila:
+                futuro = executor.submit(renderizar_entrada, indice, entrada, diretorio_base)
+                pendentes[futuro] = entrada
+                if len(pendentes) >= limite_pendentes:
+                    break
+
+        enviar_proximas()
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                entrada = pendentes.pop(futuro)
+                indice, dados, segundos, erro = futuro.result()
+                nome = nome_arquivo_pdf(indice, entrada)
+                if nome in nomes_usados:
+                    nome = f"{os.path.splitext(nome)[0]}_{indice + 1}.pdf"
+                nomes_usados.add(nome)
+                if dados is not None:
+                    zip_saida.writestr(nome, dados)
+                resultados.append({"indice": indice, "arquivo": nome, "segundos": round(segundos, 4), "erro": erro})
+                if ao_concluir:
+                    ao_concluir(nome, segundos, erro)
+            enviar_proximas()
+
+    resultados.sort(key=lambda resultado: resultado["indice"])
+    return resultados
+
+def configurar_argumentos(parser):
+    """
+    Declara os argumentos da geração em lote (usado também por "python -m extrator batch").
+    """
+    parser.add_argument("manifesto", help="Arquivo JSON ou CSV com os relatórios")
+    parser.add_argument("-o", "--saida", default="relatorios.zip", help="Arquivo ZIP de saída ('-' para a saída padrão)")
+    parser.add_argument("-p", "--processos", type=int, default=None, help="Número de processos (padrão: número de núcleos)")
+    parser.add_argument("--tempos", help="Grava o tempo de cada relatório neste arquivo (JSON lines)")
+    return parser
+
+def executar(args):
+    """
+    Gera o lote descrito pelos argumentos; retorna o código de saída.
+    """
+    entradas = carregar_manifesto(args.manifesto)
+    diretorio_base = os.path.dirname(os.path.abspath(args.manifesto))
+    destino = sys.stdout.buffer if args.saida == "-" else args.saida
+
+    def ao_concluir(nome, segundos, erro):
+        situacao = "ERRO" if erro else "ok"
+        detalhe = f" - {erro}" if erro else ""
+        print(f"[{situacao}] {nome} {segundos:.3f}s{detalhe}", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    resultados = gerar_lote(entradas, destino, diretorio_base, args.processos, ao_concluir)
+    total = time.perf_counter() - inicio
+
+    if args.tempos:
+        with open(args.tempos, "w", encoding="utf-8") as arquivo:
+            for resultado in resultados:
+                arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+    falhas = [resultado for resultado in resultados if resultado["erro"]]
+    taxa = len(resultados) / total if total else 0.0
+    print(
+        f"{len(resultados) - len(falhas)} relatório(s) gerado(s), {len(falhas)} falha(s) "
+        f"em {total:.2f}s ({taxa:.1f} relatórios/s)",
+        file=sys.stderr,
+    )
+    return 1 if falhas else 0
+
+def main(argv=None):
+    parser = configurar_argumentos(argparse.ArgumentParser(description="Gera relatórios de análise de ocorrências em lote."))
+    return executar(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
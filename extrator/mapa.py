@@ -0,0 +1,129 @@
+"""
+Mapa folium dos polígonos do extrator.
+
+Separado da página do extrator para que o folium (a dependência mais
+pesada da interface) só seja importado quando um mapa é gerado.
+"""
+# Bibliotecas padrão do Python
+import math
+
+# Bibliotecas de terceiros
+import folium
+from branca.colormap import LinearColormap
+from branca.element import MacroElement
+from jinja2 import Template
+
+# Módulos do projeto
+from extrator.historico import limites_celula
+from extrator.instrumentacao import medir
+from extrator.simplificacao import DOUGLAS_PEUCKER, gerar_niveis_detalhe
+
+# Precisão de geohash exibida em cada faixa de zoom do mapa de ocorrências
+PRECISAO_POR_ZOOM = ((0, 6, 3), (7, 9, 4), (10, 12, 5), (13, 18, 6))
+MAXIMO_CELULAS_POR_CAMADA = 5000  # Acima disso a precisão anterior segue até o zoom máximo
+CORES_OCORRENCIAS = ["#ffffb2", "#fecc5c", "#fd8d3c", "#f03b20", "#bd0026"]
+
+class CamadasPorZoom(MacroElement):
+    """
+    Mostra no mapa apenas a camada (nível de detalhe) da faixa de zoom atual.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var mapa = {{ this._parent.get_name() }};
+            var niveis = [
+                {% for camada, zoom_min, zoom_max in this.niveis %}
+                [{{ camada.get_name() }}, {{ zoom_min }}, {{ zoom_max }}],
+                {% endfor %}
+            ];
+            function atualizar() {
+                var zoom = mapa.getZoom();
+                niveis.forEach(function(nivel) {
+                    var visivel = zoom >= nivel[1] && zoom <= nivel[2];
+                    if (visivel && !mapa.hasLayer(nivel[0])) { mapa.addLayer(nivel[0]); }
+                    if (!visivel && mapa.hasLayer(nivel[0])) { mapa.removeLayer(nivel[0]); }
+                });
+            }
+            mapa.on("zoomend", atualizar);
+            atualizar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, niveis):
+        super().__init__()
+        self._name = "CamadasPorZoom"
+        self.niveis = niveis
+
+@medir("mapa.montar")
+def gerar_mapa(geometrias, metodo=DOUGLAS_PEUCKER):
+    """
+    Monta o mapa com um nível de detalhe por faixa de zoom e enquadra a coleção.
+    """
+    mapa = folium.Map(location=list(geometrias.centroide()), zoom_start=15)
+    # Cada nível de detalhe vira uma camada, exibida só na sua faixa de zoom
+    camadas = []
+    for zoom_min, zoom_max, poligonos in gerar_niveis_detalhe(geometrias, metodo=metodo):
+        camada = folium.FeatureGroup(name=f"Zoom {zoom_min}-{zoom_max}", control=False)
+        for aneis in poligonos:
+            folium.Polygon(locations=[anel.tolist() for anel in aneis], color="blue", fill=True, fill_opacity=0.4).add_to(camada)
+        camada.add_to(mapa)
+        camadas.append((camada, zoom_min, zoom_max))
+    (lat_min, lon_min), (lat_max, lon_max) = geometrias.limites()
+    mapa.fit_bounds([[lat_min, lon_min], [lat_max, lon_max]])
+    CamadasPorZoom(camadas).add_to(mapa)
+    return mapa
+
+@medir("mapa.ocorrencias")
+def gerar_mapa_ocorrencias(historico):
+    """
+    Mapa regional das ocorrências do histórico, agregadas em células de
+    geohash: cada faixa de zoom mostra as contagens de uma precisão. O HTML
+    cresce com o número de células, não com o número de relatórios; uma
+    precisão com mais de MAXIMO_CELULAS_POR_CAMADA células não é exibida.
+    Retorna None se o histórico não tiver coordenadas.
+    """
+    niveis = []
+    for zoom_min, zoom_max, precisao in PRECISAO_POR_ZOOM:
+        agregados = historico.agregados(precisao)
+        if niveis and len(agregados) > MAXIMO_CELULAS_POR_CAMADA:
+            niveis[-1] = (*niveis[-1][:1], PRECISAO_POR_ZOOM[-1][1], niveis[-1][2])
+            break
+        niveis.append((zoom_min, zoom_max, agregados))
+    todas = [celula for _, _, agregados in niveis for celula in agregados]
+    if not todas:
+        return None
+    maximo = max(total for _, total, _, _ in todas)
+    # Escala logarítmica: poucas células concentram a maior parte das ocorrências
+    escala = LinearColormap(CORES_OCORRENCIAS, vmin=0, vmax=math.log10(maximo + 1))
+    mapa = folium.Map()
+    camadas = []
+    for zoom_min, zoom_max, agregados in niveis:
+        feicoes = []
+        for celula, total, _, _ in agregados:
+            (lat_min, lon_min), (lat_max, lon_max) = limites_celula(celula)
+            feicoes.append({
+                "type": "Feature",
+                "properties": {"total": total, "cor": escala(math.log10(total + 1))},
+                "geometry": {"type": "Polygon", "coordinates": [[
+                    [lon_min, lat_min], [lon_max, lat_min], [lon_max, lat_max], [lon_min, lat_max], [lon_min, lat_min],
+                ]]},
+            })
+        camada = folium.GeoJson(
+            {"type": "FeatureCollection", "features": feicoes},
+            name=f"Zoom {zoom_min}-{zoom_max}",
+            control=False,
+            style_function=lambda feicao: {
+                "fillColor": feicao["properties"]["cor"], "fillOpacity": 0.6, "color": "#555555", "weight": 0.5,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["total"], aliases=["Ocorrências"]),
+        )
+        camada.add_to(mapa)
+        camadas.append((camada, zoom_min, zoom_max))
+    latitudes = [lat for _, _, lat, _ in niveis[0][2]]
+    longitudes = [lon for _, _, _, lon in niveis[0][2]]
+    mapa.fit_bounds([[min(latitudes), min(longitudes)], [max(latitudes), max(longitudes)]])
+    escala.caption = "Ocorrências por célula (log10)"
+    escala.add_to(mapa)
+    CamadasPorZoom(camadas).add_to(mapa)
+    return mapa
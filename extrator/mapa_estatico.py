@@ -0,0 +1,201 @@
+"""
+Mapa de localização estático para o PDF, desenhado em gráficos vetoriais
+do ReportLab, sem navegador.
+
+Desenha os polígonos da área, o ponto da ocorrência, a escala gráfica e a
+seta do norte em projeção Web Mercator. Se houver tiles em cache local em PNG
+(dados/tiles/{z}/{x}/{y}.png, ou o diretório da variável de ambiente
+EXTRATOR_TILES, no esquema XYZ do OpenStreetMap), eles formam o fundo;
+sem eles o fundo é liso. Nenhum tile é baixado: o mapa funciona offline,
+no lote e no serviço.
+"""
+# Bibliotecas padrão do Python
+import math
+import os
+
+# Bibliotecas de terceiros
+import numpy as np
+from reportlab.graphics.shapes import FILL_EVEN_ODD, Circle, Drawing, Group, Image, Path, Polygon, Rect, String
+from reportlab.lib import colors
+
+# Módulos do projeto
+from extrator.conversao_coordenadas import converter_valores
+from extrator.geometria import ColecaoGeometrias
+from extrator.instrumentacao import medir
+from extrator.municipios import DIRETORIO_DADOS
+
+DIRETORIO_TILES = os.path.join(DIRETORIO_DADOS, "tiles")
+VARIAVEL_TILES = "EXTRATOR_TILES"
+TAMANHO_TILE = 256
+ZOOM_MAXIMO = 18
+RAIO_MERCATOR = 6_378_137.0
+MARGEM = 0.15  # Folga em volta da área, em fração da extensão
+EXTENSAO_MINIMA_M = 1000  # Extensão mínima do mapa quando só há o ponto
+LARGURA_PADRAO, ALTURA_PADRAO = 480, 300
+VERTICES_POR_ANEL = 2000  # Anéis maiores são reamostrados para o desenho
+
+COR_FUNDO = colors.HexColor("#eef2e6")
+COR_POLIGONO = colors.HexColor("#1f4fd1")
+COR_PONTO = colors.HexColor("#d7191c")
+
+def mercator(latitudes, longitudes):
+    """Coordenadas Web Mercator (metros) de arrays de latitude/longitude."""
+    latitudes = np.clip(np.asarray(latitudes, dtype=np.float64), -85.0511, 85.0511)
+    x = RAIO_MERCATOR * np.radians(longitudes)
+    y = RAIO_MERCATOR * np.log(np.tan(np.pi / 4 + np.radians(latitudes) / 2))
+    return x, y
+
+def geometrias_do_relatorio(relatorio):
+    """
+    Área do relatório: relatorio["area"] como ColecaoGeometrias ou lista de
+    anéis [[lat, lon], ...] (relatórios em JSON). Retorna None sem área.
+    """
+    area = relatorio.get("area")
+    if area is None or isinstance(area, ColecaoGeometrias):
+        return area or None
+    colecao = ColecaoGeometrias()
+    for anel in area:
+        colecao.adicionar_feicao([[anel]])
+    return colecao if colecao.total_vertices else None
+
+def ponto_do_relatorio(relatorio):
+    """(lat, lon) da ocorrência em graus decimais, ou None."""
+    (lat, lon), validos = converter_valores([relatorio.get("latitude") or "", relatorio.get("longitude") or ""])
+    return (float(lat), float(lon)) if validos.all() else None
+
+def _distancia_redonda(metros):
+    """Maior valor 1, 2 ou 5 x 10^n que não passa de "metros"."""
+    potencia = 10 ** math.floor(math.log10(metros))
+    return max(passo * potencia for passo in (1, 2, 5) if passo * potencia <= metros)
+
+def _diretorio_tiles():
+    return os.environ.get(VARIAVEL_TILES) or DIRETORIO_TILES
+
+def _fundo_tiles(limites, largura):
+    """
+    Mosaico (Pillow) dos tiles em cache que cobrem "limites", recortado
+    exatamente ao quadro, ou None se não houver tiles. O recorte evita que
+    os tiles vazem para fora do desenho no PDF.
+    """
+    diretorio = _diretorio_tiles()
+    if not os.path.isdir(diretorio):
+        return None
+    x_min, y_min, x_max, y_max = limites
+    # Zoom cujo tile tem aproximadamente a resolução do desenho
+    metros_por_ponto = (x_max - x_min) / largura
+    zoom = int(np.clip(round(math.log2(2 * math.pi * RAIO_MERCATOR / (TAMANHO_TILE * metros_por_ponto))), 0, ZOOM_MAXIMO))
+    lado_tile = 2 * math.pi * RAIO_MERCATOR / 2 ** zoom
+
+    # Índices XYZ: colunas a partir do oeste, linhas a partir do norte
+    def coluna(x):
+        return (x + math.pi * RAIO_MERCATOR) / lado_tile
+
+    def linha(y):
+        return (math.pi * RAIO_MERCATOR - y) / lado_tile
+
+    colunas = range(int(coluna(x_min)), int(coluna(x_max)) + 1)
+    linhas = range(int(linha(y_max)), int(linha(y_min)) + 1)
+    caminhos = {
+        (tx, ty): os.path.join(diretorio, str(zoom), str(tx), f"{ty}.png")
+        for tx in colunas for ty in linhas
+    }
+    caminhos = {indice: caminho for indice, caminho in caminhos.items() if os.path.exists(caminho)}
+    if not caminhos:
+        return None
+
+    from PIL import Image as ImagemPIL
+
+    mosaico = ImagemPIL.new("RGB", (len(colunas) * TAMANHO_TILE, len(linhas) * TAMANHO_TILE), (238, 242, 230))
+    for (tx, ty), caminho in caminhos.items():
+        with ImagemPIL.open(caminho) as tile:
+            mosaico.paste(tile.convert("RGB"), ((tx - colunas.start) * TAMANHO_TILE, (ty - linhas.start) * TAMANHO_TILE))
+    caixa = [
+        (coluna(x_min) - colunas.start) * TAMANHO_TILE, (linha(y_max) - linhas.start) * TAMANHO_TILE,
+        (coluna(x_max) - colunas.start) * TAMANHO_TILE, (linha(y_min) - linhas.start) * TAMANHO_TILE,
+    ]
+    return mosaico.crop(tuple(round(valor) for valor in caixa))
+
+def _seta_norte(x, y, tamanho=22):
+    seta = Group(
+        Polygon([x, y + tamanho, x - tamanho / 3, y, x, y + tamanho / 4], fillColor=colors.black, strokeColor=colors.black, strokeWidth=0.5),
+        Polygon([x, y + tamanho, x + tamanho / 3, y, x, y + tamanho / 4], fillColor=colors.white, strokeColor=colors.black, strokeWidth=0.5),
+        String(x, y + tamanho + 3, "N", fontName="Helvetica-Bold", fontSize=10, textAnchor="middle"),
+    )
+    return seta
+
+def _escala_grafica(x, y, metros_por_ponto, largura_maxima):
+    distancia = _distancia_redonda(largura_maxima * metros_por_ponto)
+    comprimento = distancia / metros_por_ponto
+    rotulo = f"{distancia / 1000:g} km" if distancia >= 1000 else f"{distancia:g} m"
+    metade = comprimento / 2
+    return Group(
+        Rect(x, y, metade, 4, fillColor=colors.black, strokeColor=colors.black, strokeWidth=0.5),
+        Rect(x + metade, y, metade, 4, fillColor=colors.white, strokeColor=colors.black, strokeWidth=0.5),
+        String(x, y + 7, "0", fontName="Helvetica", fontSize=7, textAnchor="middle"),
+        String(x + comprimento, y + 7, rotulo, fontName="Helvetica", fontSize=7, textAnchor="middle"),
+    )
+
+@medir("pdf.mapa_localizacao")
+def desenhar_mapa(ponto=None, geometrias=None, largura=LARGURA_PADRAO, altura=ALTURA_PADRAO):
+    """
+    Drawing (flowable do ReportLab) com a área e/ou o ponto (lat, lon).
+    Retorna None se não houver nada para desenhar.
+    """
+    xs, ys = [], []
+    if geometrias is not None and geometrias.total_vertices:
+        gx, gy = mercator(geometrias.coordenadas[:, 0], geometrias.coordenadas[:, 1])
+        xs += [gx.min(), gx.max()]
+        ys += [gy.min(), gy.max()]
+    if ponto is not None:
+        px, py = mercator(ponto[0], ponto[1])
+        xs.append(float(px))
+        ys.append(float(py))
+    if not xs:
+        return None
+    latitude_centro = ponto[0] if ponto is not None else float(np.mean(geometrias.limites(), axis=0)[0])
+    # A escala de Mercator cresce com 1/cos(lat): a extensão mínima é no terreno
+    minimo = EXTENSAO_MINIMA_M / math.cos(math.radians(latitude_centro))
+    centro_x, centro_y = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+    extensao_x = max(max(xs) - min(xs), minimo) * (1 + 2 * MARGEM)
+    extensao_y = max(max(ys) - min(ys), minimo) * (1 + 2 * MARGEM)
+    # Ajusta à proporção do quadro, sem distorcer
+    escala = min(largura / extensao_x, altura / extensao_y)
+    x_min, y_min = centro_x - largura / escala / 2, centro_y - altura / escala / 2
+    limites = (x_min, y_min, x_min + largura / escala, y_min + altura / escala)
+
+    desenho = Drawing(largura, altura)
+    desenho.add(Rect(0, 0, largura, altura, fillColor=COR_FUNDO, strokeColor=None))
+    fundo = _fundo_tiles(limites, largura)
+    if fundo is not None:
+        desenho.add(Image(0, 0, largura, altura, fundo))
+
+    if geometrias is not None and geometrias.total_vertices:
+        for poligono in range(geometrias.total_poligonos):
+            # Contorno e furos em um único caminho par-ímpar: os furos ficam sem preenchimento
+            caminho = Path(fillMode=FILL_EVEN_ODD, fillColor=COR_POLIGONO, fillOpacity=0.25, strokeColor=COR_POLIGONO, strokeWidth=1.2)
+            for anel in geometrias.aneis_do_poligono(poligono):
+                pontos = geometrias.anel(anel)
+                if len(pontos) > VERTICES_POR_ANEL:
+                    pontos = pontos[np.linspace(0, len(pontos) - 1, VERTICES_POR_ANEL).astype(int)]
+                ax, ay = mercator(pontos[:, 0], pontos[:, 1])
+                xs_anel, ys_anel = ((ax - x_min) * escala).tolist(), ((ay - y_min) * escala).tolist()
+                caminho.moveTo(xs_anel[0], ys_anel[0])
+                for x, y in zip(xs_anel[1:], ys_anel[1:]):
+                    caminho.lineTo(x, y)
+                caminho.closePath()
+            desenho.add(caminho)
+    if ponto is not None:
+        x, y = (px - x_min) * escala, (py - y_min) * escala
+        desenho.add(Circle(float(x), float(y), 4.5, fillColor=COR_PONTO, strokeColor=colors.white, strokeWidth=1.5))
+
+    metros_por_ponto = math.cos(math.radians(latitude_centro)) / escala
+    desenho.add(Rect(8, 6, largura / 4 + 24, 24, fillColor=colors.white, fillOpacity=0.8, strokeColor=None))
+    desenho.add(_escala_grafica(16, 12, metros_por_ponto, largura / 4))
+    desenho.add(Rect(largura - 34, altura - 46, 26, 40, fillColor=colors.white, fillOpacity=0.8, strokeColor=None))
+    desenho.add(_seta_norte(largura - 21, altura - 40))
+    desenho.add(Rect(0, 0, largura, altura, fillColor=None, strokeColor=colors.black, strokeWidth=1))
+    return desenho
+
+def mapa_do_relatorio(relatorio, largura=LARGURA_PADRAO, altura=ALTURA_PADRAO):
+    """Mapa de localização do relatório (ponto e área), ou None."""
+    return desenhar_mapa(ponto_do_relatorio(relatorio), geometrias_do_relatorio(relatorio), largura, altura)
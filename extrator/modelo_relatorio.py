@@ -0,0 +1,79 @@
+"""
+Modelo do relatório de análise de ocorrências, sem dependências pesadas.
+
+A interface calcula a chave do relatório a cada execução do script, então
+este módulo não importa o ReportLab nem o Pillow; relatorio_pdf.py só é
+carregado quando o PDF é de fato gerado.
+"""
+# Bibliotecas padrão do Python
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+# Módulos do projeto
+from extrator.geometria import ColecaoGeometrias
+from extrator.imagens import ImagemProcessada
+
+# Imagem da série temporal do relatório, já na ordem de exibição
+ImagemDatada = namedtuple("ImagemDatada", ["imagem", "data", "fonte"])
+
+def imagens_do_relatorio(relatorio):
+    """
+    Lista ordenada de ImagemDatada do relatório.
+
+    Usa relatorio["imagens"], uma lista de dicionários com "imagem" (bytes ou
+    ImagemProcessada), "data" e "fonte", seguida dos campos numerados
+    imagem1, imagem2... (com data_imagem1, fonte_imagem1...) dos
+    relatórios antigos e dos manifestos em CSV. Itens sem imagem são ignorados.
+    """
+    imagens = [
+        ImagemDatada(item.get("imagem"), item.get("data", ""), item.get("fonte", ""))
+        for item in relatorio.get("imagens") or []
+    ]
+    numeros = sorted(int(m.group(1)) for m in map(re.compile(r"imagem(\d+)").fullmatch, relatorio) if m)
+    for numero in numeros:
+        imagens.append(ImagemDatada(
+            relatorio[f"imagem{numero}"], relatorio.get(f"data_imagem{numero}", ""), relatorio.get(f"fonte_imagem{numero}", "")
+        ))
+    return [item for item in imagens if item.imagem]
+
+def _valor_para_chave(valor):
+    """
+    Troca imagens (bytes ou ImagemProcessada) e áreas (ColecaoGeometrias)
+    pelo hash do conteúdo e remove
+    os valores None, para que o relatório possa ser serializado na chave.
+    """
+    if isinstance(valor, ImagemProcessada):
+        return valor.hash
+    if isinstance(valor, ColecaoGeometrias):
+        # Área do relatório: entra pelo hash das coordenadas e da estrutura
+        resumo = hashlib.sha256()
+        for array in (valor.coordenadas, valor.inicio_aneis, valor.inicio_poligonos, valor.inicio_feicoes):
+            resumo.update(array.tobytes())
+        return resumo.hexdigest()
+    if isinstance(valor, (bytes, bytearray)):
+        return hashlib.sha256(valor).hexdigest()
+    if isinstance(valor, dict):
+        return {str(campo): _valor_para_chave(item) for campo, item in valor.items() if item is not None}
+    if isinstance(valor, (list, tuple)):
+        return [_valor_para_chave(item) for item in valor]
+    return valor
+
+def relatorio_serializavel(relatorio):
+    """
+    Cópia do relatório que pode ser gravada em JSON (imagens pelo hash).
+    """
+    return _valor_para_chave(relatorio)
+
+def chave_relatorio(relatorio, imagens=None):
+    """
+    Calcula o hash (SHA-256) que identifica um relatório pelo seu conteúdo.
+
+    "relatorio" traz os campos do formulário, inclusive a lista "imagens";
+    "imagens" pode mapear campos de imagem avulsos para seus bytes (ou
+    ImagemProcessada). As imagens entram pelo hash do conteúdo. Campos com
+    valor None e a ordem das chaves não alteram o resultado.
+    """
+    campos = _valor_para_chave({**relatorio, **(imagens or {})})
+    return hashlib.sha256(json.dumps(campos, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
@@ -0,0 +1,141 @@
+"""
+Municípios da área do 5° BPAMB e identificação do município por coordenada.
+
+A lista de municípios vem de dados/municipios_5bpamb.txt. Os limites
+municipais são lidos de um GeoJSON ou KML/KMZ (por exemplo, a malha
+municipal do IBGE), informado pela variável de ambiente
+EXTRATOR_LIMITES_MUNICIPIOS ou salvo em dados/ como
+municipios_5bpamb.geojson/.kml/.kmz. Na primeira leitura as geometrias
+são convertidas para arrays .npy em dados/.cache; nas seguintes esses
+arrays são apenas mapeados em memória, sem nova leitura do arquivo.
+"""
+# Bibliotecas padrão do Python
+import hashlib
+import logging
+import os
+import unicodedata
+from functools import lru_cache
+
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.geometria import ColecaoGeometrias, carregar_colecao, salvar_colecao
+from extrator.indice_espacial import IndiceEspacial
+from extrator.leitura_geojson import CAMPOS_NOME, carregar_geojson
+from extrator.leitura_kml import carregar_geometrias
+
+# dados/ fica na raiz do projeto (ao lado do pacote), com os limites e o cache
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dados")
+DIRETORIO_CACHE = os.path.join(DIRETORIO_DADOS, ".cache")
+ARQUIVO_LISTA = os.path.join(DIRETORIO_DADOS, "municipios_5bpamb.txt")
+ARQUIVOS_LIMITES = ("municipios_5bpamb.geojson", "municipios_5bpamb.json", "municipios_5bpamb.kml", "municipios_5bpamb.kmz")
+VARIAVEL_LIMITES = "EXTRATOR_LIMITES_MUNICIPIOS"
+VERSAO_CACHE = 2  # 2: sem nenhum município da lista, o cache fica vazio
+
+logger = logging.getLogger(__name__)
+
+def chave_nome(nome):
+    """Forma de comparação do nome: sem acentos, maiúsculas e espaços simples."""
+    sem_acentos = unicodedata.normalize("NFKD", nome or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(sem_acentos.upper().split())
+
+@lru_cache(maxsize=None)
+def listar_municipios():
+    """Municípios da área, na ordem do arquivo e sem repetições."""
+    with open(ARQUIVO_LISTA, encoding="utf-8") as arquivo:
+        nomes = [" ".join(linha.split()) for linha in arquivo]
+    return list(dict.fromkeys(nome for nome in nomes if nome))
+
+def _ler_limites(caminho):
+    if caminho.lower().endswith((".geojson", ".json")):
+        return carregar_geojson(caminho)
+    colecao = carregar_geometrias(caminho)
+    # Em KML o nome também pode estar nos dados estendidos
+    for indice, dados in enumerate(colecao.dados):
+        nome = next((dados[campo] for campo in CAMPOS_NOME if dados.get(campo)), "")
+        if nome:
+            colecao.nomes[indice] = nome
+    return colecao
+
+def _filtrar_municipios_da_area(colecao):
+    """
+    Mantém apenas os municípios da lista, já com a grafia da lista. Se nenhum
+    nome coincidir, a coleção volta vazia: um nome de fora da lista não pode
+    ser sugerido no formulário.
+    """
+    nomes_lista = {chave_nome(nome): nome for nome in listar_municipios()}
+    filtrada = ColecaoGeometrias()
+    for nome, dados, poligonos in colecao:
+        if chave_nome(nome) in nomes_lista:
+            filtrada.adicionar_feicao(poligonos, nome=nomes_lista[chave_nome(nome)], dados=dados)
+    if not len(filtrada):
+        logger.warning(
+            "Nenhum dos %d limites municipais tem nome da lista %s; a sugestão de município fica desativada",
+            len(colecao), os.path.basename(ARQUIVO_LISTA),
+        )
+    return filtrada
+
+def localizar_arquivo_limites():
+    """Caminho do arquivo de limites municipais configurado, ou None."""
+    caminho = os.environ.get(VARIAVEL_LIMITES)
+    if caminho:
+        return caminho if os.path.exists(caminho) else None
+    for nome in ARQUIVOS_LIMITES:
+        caminho = os.path.join(DIRETORIO_DADOS, nome)
+        if os.path.exists(caminho):
+            return caminho
+    return None
+
+def _diretorio_cache(caminho):
+    """O cache é invalidado quando o arquivo de origem muda (caminho, tamanho, data)."""
+    estado = os.stat(caminho)
+    assinatura = f"{VERSAO_CACHE}|{os.path.abspath(caminho)}|{estado.st_size}|{estado.st_mtime_ns}"
+    return os.path.join(DIRETORIO_CACHE, "municipios-" + hashlib.sha1(assinatura.encode("utf-8")).hexdigest()[:16])
+
+class LocalizadorMunicipios:
+    """
+    Identifica o município de coordenadas usando um índice espacial dos limites.
+    """
+
+    def __init__(self, geometrias):
+        self.geometrias = geometrias
+        self.indice = IndiceEspacial(geometrias)
+        # O último item (None) atende aos pontos fora de todos os polígonos (índice -1)
+        nomes = np.asarray(geometrias.nomes, dtype=object)
+        self._nome_por_poligono = np.append(nomes[geometrias.feicoes_dos_poligonos()], None)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Carrega os limites de "caminho", usando (ou criando) o cache binário.
+        """
+        cache = _diretorio_cache(caminho)
+        if not os.path.isdir(cache):
+            salvar_colecao(_filtrar_municipios_da_area(_ler_limites(caminho)), cache)
+        return cls(carregar_colecao(cache))
+
+    @property
+    def nomes(self):
+        return sorted(set(self.geometrias.nomes))
+
+    def localizar(self, latitudes, longitudes):
+        """Array com o município de cada ponto (None fora dos limites)."""
+        return self._nome_por_poligono[self.indice.pontos_em_poligonos(latitudes, longitudes)]
+
+    def municipio(self, latitude, longitude):
+        """Município de um único ponto, ou None."""
+        return self.localizar(latitude, longitude)[0]
+
+@lru_cache(maxsize=None)
+def localizador_padrao():
+    """
+    Localizador com os limites configurados (carregado uma vez por
+    processo), ou None se nenhum arquivo de limites estiver disponível ou
+    se nenhum limite for de um município da lista.
+    """
+    caminho = localizar_arquivo_limites()
+    if not caminho:
+        return None
+    localizador = LocalizadorMunicipios.carregar(caminho)
+    return localizador if len(localizador.geometrias) else None
@@ -0,0 +1,481 @@
+"""
+Geração do PDF do relatório de análise de ocorrências.
+
+Este módulo não depende do Streamlit, para que o mesmo código seja usado
+pela interface, pela geração em lote (lote_relatorios.py) e pela linha de
+comando (python -m extrator report).
+"""
+# Bibliotecas padrão do Python
+import copy
+import logging
+import os
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+# Bibliotecas de terceiros
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.colors import black
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+    Image as PlatypusImage,
+)
+
+# Módulos do projeto
+from extrator.imagens import dimensoes_no_quadro, processar_imagens
+from extrator.instrumentacao import medir
+from extrator.mapa_estatico import mapa_do_relatorio
+from extrator.modelo_relatorio import imagens_do_relatorio
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def folha_estilos():
+    """
+    Folha de estilos padrão do ReportLab, criada no primeiro uso e
+    compartilhada pelas páginas e relatórios seguintes.
+    """
+    return getSampleStyleSheet()
+
+# ==========================================
+# Recursos gráficos do PDF (carregados uma única vez por processo)
+# ==========================================
+
+DIRETORIO_RECURSOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recursos")
+ARQUIVO_BRASAO = os.path.join(DIRETORIO_RECURSOS, "Brasão_do_estado_de_São_Paulo.png")
+ARQUIVO_PMESP = os.path.join(DIRETORIO_RECURSOS, "pmesp.png")
+ARQUIVO_MARCA_DAGUA = os.path.join(DIRETORIO_RECURSOS, "Asa_Ambiental.png")
+
+# Tamanho máximo (em pixels) dos recursos após a redução. Os brasões são
+# desenhados com 75 pt e a marca d'água com 400x200 pt, então esses limites
+# mantêm ~300 dpi nos brasões sem carregar as imagens originais inteiras.
+TAMANHO_MAXIMO_BRASAO = (320, 320)
+TAMANHO_MAXIMO_MARCA_DAGUA = (1000, 500)
+OPACIDADE_MARCA_DAGUA = 0.3  # Valor entre 0 (totalmente transparente) e 1 (totalmente opaco)
+
+# Grade de imagens: 3 colunas de 150 pt ocupam a largura útil da página A4
+COLUNAS_GRADE_IMAGENS = 3
+LARGURA_COLUNA_IMAGEM = 150
+LADO_QUADRO_IMAGEM = 140
+LARGURA_QUADRO_MUDANCAS = 300
+
+def _preparar_image_reader(imagem):
+    """
+    Cria um ImageReader com os dados RGB já decodificados.
+
+    Como o mesmo objeto é reutilizado em todas as páginas, o ReportLab
+    encontra o XObject já registrado no documento e apenas o referencia,
+    sem reinserir a imagem a cada página.
+    """
+    leitor = ImageReader(imagem)
+    leitor.getRGBData()
+    return leitor
+
+@lru_cache(maxsize=None)
+def carregar_brasao(caminho):
+    """
+    Carrega e reduz um brasão do cabeçalho.
+    """
+    with Image.open(caminho) as imagem:
+        imagem.draft("RGB", TAMANHO_MAXIMO_BRASAO)
+        imagem = imagem.convert("RGBA")
+    imagem.thumbnail(TAMANHO_MAXIMO_BRASAO, Image.LANCZOS)
+    return _preparar_image_reader(imagem)
+
+@lru_cache(maxsize=None)
+def carregar_marca_dagua(caminho=ARQUIVO_MARCA_DAGUA, opacidade=OPACIDADE_MARCA_DAGUA):
+    """
+    Carrega a marca d'água, reduz o tamanho e aplica a opacidade no canal alfa.
+    """
+    with Image.open(caminho) as imagem:
+        imagem = imagem.convert("RGBA")  # Garante que a imagem tenha canal alfa
+    imagem.thumbnail(TAMANHO_MAXIMO_MARCA_DAGUA, Image.LANCZOS)
+    # Ajusta a transparência em uma única operação sobre a banda alfa
+    alfa = imagem.getchannel("A").point(lambda valor: int(valor * opacidade))
+    imagem.putalpha(alfa)
+    return _preparar_image_reader(imagem)
+
+# Textos fixos do PDF
+LINHAS_CABECALHO = (
+    "SECRETARIA DA SEGURANÇA PÚBLICA",
+    "POLÍCIA MILITAR DO ESTADO DE SÃO PAULO",
+    "COMANDO DE POLICIAMENTO AMBIENTAL",
+    "5° BPAMB / 3ª CIA / SEÇÃO TÉCNICA",
+)
+TEXTO_RODAPE = "“Nós, Policiais Militares, sob a proteção de Deus, estamos compromissados com a Defesa da Vida, da Integridade Física e da Dignidade da Pessoa Humana”"
+CONCLUSAO_FISCALIZACAO = "Diante das informações apresentadas, sugiro o envio de equipe para fiscalização 'in loco' com fulcro da constatação de crimes ambientais, para eventual adoção de medidas penais e administrativas em caso de confirmação das informações descritas neste termo."
+CONCLUSAO_ENCERRAMENTO = "Diante das informações apresentadas, sugiro o encerramento e arquivamento da ocorrência, até nova solicitação."
+SEM_CONCLUSAO = "Nenhuma conclusão foi selecionada."
+
+# Form XObject com cabeçalho, rodapé e marca d'água, desenhado uma vez por
+# documento e referenciado por todas as páginas
+NOME_MOLDURA = "moldura_pagina"
+LARGURAS_TABELA = (200, 300)
+
+# O ASCII85 só serve para transporte em 7 bits: sem ele os fluxos do PDF
+# ficam 25% menores e o ReportLab não passa pelo codificador em Python puro
+# (sem ele, as imagens da moldura levam ~150 ms por relatório). O ReportLab
+# lê a opção global a cada fluxo codificado, sem opção por canvas, e trocá-la
+# só durante um relatório afetaria os gerados ao mesmo tempo em outras
+# threads. Por isso vale para o processo todo: todo PDF do projeto (a
+# interface, o lote, o serviço e o mapa estático, desenhado dentro do
+# relatório) é gravado como binário, em arquivo, BytesIO ou corpo HTTP, e
+# nunca passa por um canal de 7 bits. A variável de ambiente RL_useA85 do
+# ReportLab, se definida, prevalece.
+if "RL_useA85" not in os.environ:
+    rl_config.useA85 = 0
+
+@lru_cache(maxsize=None)
+def estilos_cabecalho_rodape():
+    """
+    Retorna os estilos (cabeçalho, rodapé) usados nas páginas do PDF.
+    """
+    estilo_cabecalho = ParagraphStyle(
+        name="Cabecalho",
+        parent=folha_estilos()["Normal"],
+        fontSize=10,
+        alignment=1,  # Centralizado
+        spaceAfter=6,
+        textColor=black
+    )
+    estilo_rodape = ParagraphStyle(
+        name="Rodape",
+        parent=folha_estilos()["Normal"],
+        fontSize=6,
+        alignment=1,  # Centralizado
+        spaceBefore=10,
+        textColor=black
+    )
+    return estilo_cabecalho, estilo_rodape
+
+class ModeloPdf:
+    """
+    Partes fixas do relatório, montadas uma vez por processo (ver
+    modelo_pdf): estilos, estilos de tabela, altura das linhas das tabelas
+    de dados, linhas do cabeçalho e do rodapé já quebradas e as imagens da
+    moldura já decodificadas. Cada relatório só monta os campos variáveis.
+    """
+
+    def __init__(self):
+        styles = folha_estilos()
+        self.estilo_titulo = styles["Title"]
+        self.estilo_secao = styles["Heading2"]
+        self.estilo_normal = styles["Normal"]
+        self.estilo_italico = styles["Italic"]
+        self.estilo_responsavel = ParagraphStyle(
+            name="Responsavel",
+            parent=styles["Normal"],
+            fontSize=12,
+            alignment=TA_RIGHT,  # Alinhado à direita
+            spaceBefore=20,
+            textColor=colors.black
+        )
+        self.estilo_conclusao = ParagraphStyle(
+            name="Conclusao",
+            parent=styles["Normal"],
+            fontSize=12,
+            alignment=4,  # 4 = Justificado
+            leading=14,   # Espaçamento entre linhas
+            splitLongWords=True,  # Quebra de palavras longas
+        )
+        self.estilo_legenda = ParagraphStyle(name="LegendaImagem", parent=styles["Normal"], fontSize=10, alignment=TA_CENTER, spaceAfter=4)
+
+        self.estilo_tabela = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),  # Bordas pretas
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),  # Alinhamento à esquerda
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # Alinhamento vertical no topo
+            ('WORDWRAP', (0, 0), (-1, -1), True),  # Quebra de texto automática
+            ('SPLITLONGWORDS', (0, 0), (-1, -1), True),  # Quebra de palavras longas
+        ])
+        self.estilo_grade_imagens = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ])
+        # Altura de uma linha de texto simples nas tabelas de dados: com ela
+        # a tabela não precisa medir cada célula
+        amostra = Table([["", ""]], colWidths=LARGURAS_TABELA)
+        amostra.setStyle(self.estilo_tabela)
+        amostra.wrap(sum(LARGURAS_TABELA), A4[1])
+        self.altura_linha_tabela = amostra._rowHeights[0]
+
+        # Cabeçalho e rodapé já quebrados na largura da página
+        largura_pagina = A4[0]
+        estilo_cabecalho, estilo_rodape = estilos_cabecalho_rodape()
+        self.linhas_cabecalho = []
+        for linha in LINHAS_CABECALHO:
+            paragrafo = Paragraph(linha, estilo_cabecalho)
+            paragrafo.wrap(largura_pagina - 200, 50)
+            self.linhas_cabecalho.append(paragrafo)
+        self.rodape = Paragraph(TEXTO_RODAPE, estilo_rodape)
+        self.rodape.wrap(largura_pagina - 100, 50)
+
+        # Imagens da moldura já decodificadas e reduzidas (ImageReader em
+        # cache); cada documento as embute pelo drawImage
+        for carregar in (lambda: carregar_brasao(ARQUIVO_BRASAO), lambda: carregar_brasao(ARQUIVO_PMESP), carregar_marca_dagua):
+            try:
+                carregar()
+            except Exception as e:
+                logger.error("Erro ao carregar imagem da moldura: %s", e)
+
+    def tabela(self, dados):
+        """Tabela de dados (rótulo, valor) com o estilo e as larguras fixas."""
+        # Valores com quebra de linha ou flowables têm altura variável
+        simples = all(isinstance(valor, str) and "\n" not in valor for _, valor in dados)
+        tabela = Table(dados, colWidths=LARGURAS_TABELA, rowHeights=[self.altura_linha_tabela] * len(dados) if simples else None)
+        tabela.setStyle(self.estilo_tabela)
+        return tabela
+
+@lru_cache(maxsize=None)
+def modelo_pdf():
+    """
+    ModeloPdf do processo, criado no primeiro relatório.
+    """
+    return ModeloPdf()
+
+@medir("pdf.cabecalho_rodape")
+def adicionar_cabecalho_rodape(canvas, doc):
+    """
+    Adiciona um cabeçalho e um rodapé ao PDF.
+    """
+    canvas.saveState()
+    modelo = modelo_pdf()
+
+    # Dimensões da página A4
+    largura_pagina, altura_pagina = A4
+
+    # =================== CABEÇALHO ===================
+    # Imagem à esquerda
+    try:
+        imagem_esquerda = carregar_brasao(ARQUIVO_BRASAO)
+        canvas.drawImage(imagem_esquerda, 50, altura_pagina - 150, width=75, height=75, mask='auto')
+    except Exception as e:
+        logger.error("Erro ao carregar imagem esquerda: %s", e)
+
+    # Imagem à direita
+    try:
+        imagem_direita = carregar_brasao(ARQUIVO_PMESP)
+        canvas.drawImage(imagem_direita, largura_pagina - 125, altura_pagina - 150, width=75, height=75, mask='auto')
+    except Exception as e:
+        logger.error("Erro ao carregar imagem direita: %s", e)
+
+    # Linhas do cabeçalho, centralizadas. Os parágrafos já quebrados são
+    # compartilhados entre threads; drawOn anota o canvas no objeto, então
+    # cada documento desenha uma cópia rasa
+    y = altura_pagina - 80
+    for linha in modelo.linhas_cabecalho:
+        copy.copy(linha).drawOn(canvas, 100, y)
+        y -= 15
+
+    # Adiciona um espaçamento fixo após o cabeçalho
+    canvas.translate(0, -2 * cm)  # Ajuste o valor conforme necessário
+
+    # =================== RODAPÉ ===================
+    copy.copy(modelo.rodape).drawOn(canvas, 50, 30)
+
+    canvas.restoreState()
+
+@medir("pdf.marca_dagua")
+def adicionar_marca_dagua(canvas, doc):
+    """
+    Adiciona uma imagem como marca d'água no PDF, com transparência ajustada.
+    """
+    canvas.saveState()
+    
+    # Carrega a imagem (já clareada e reduzida, compartilhada entre as páginas)
+    try:
+        imagem = carregar_marca_dagua()
+    except Exception as e:
+        logger.error("Erro ao carregar a imagem: %s", e)
+        canvas.restoreState()
+        return
+
+    # Dimensões da página A4
+    largura_pagina, altura_pagina = A4
+
+    # Tamanho da imagem (ajuste conforme necessário)
+    largura_imagem = 400  # Largura da imagem em pixels
+    altura_imagem = 200   # Altura da imagem em pixels
+
+    # Posiciona a imagem no centro da página
+    x = (largura_pagina - largura_imagem) / 2
+    y = (altura_pagina - altura_imagem) / 2
+
+    # Desenha a imagem no PDF
+    canvas.drawImage(imagem, x, y, width=largura_imagem, height=altura_imagem, mask='auto')
+
+    canvas.restoreState()
+
+def adicionar_cabecalho_rodape_e_marca_dagua(canvas, doc):
+    """
+    Adiciona cabeçalho, rodapé e marca d'água ao PDF.
+
+    Tudo é desenhado uma única vez por documento em um Form XObject
+    (NOME_MOLDURA), que cada página apenas referencia.
+    """
+    if not canvas.hasForm(NOME_MOLDURA):
+        canvas.beginForm(NOME_MOLDURA)
+        # Adiciona o cabeçalho e o rodapé
+        adicionar_cabecalho_rodape(canvas, doc)
+        # Adiciona a marca d'água (imagem clareada)
+        adicionar_marca_dagua(canvas, doc)
+        canvas.endForm()
+    canvas.doForm(NOME_MOLDURA)
+
+def adicionar_imagens_ao_pdf(imagens, colunas=COLUNAS_GRADE_IMAGENS):
+    """
+    Monta a grade com as imagens (lista de ImagemDatada) e suas datas.
+
+    As imagens ainda não processadas são reduzidas em paralelo; o JPEG de
+    impressão é embutido diretamente, com a proporção original. Cada célula
+    traz a legenda e a imagem juntas, então a tabela pode ser quebrada entre
+    páginas a cada linha da grade.
+    """
+    if not imagens:
+        return None
+    modelo = modelo_pdf()
+    celulas = []
+    for item, processada in zip(imagens, processar_imagens([item.imagem for item in imagens])):
+        largura, altura = dimensoes_no_quadro(processada, LADO_QUADRO_IMAGEM, LADO_QUADRO_IMAGEM)
+        legenda = f"Data: {escape(str(item.data))}" + (f"<br/>{escape(item.fonte)}" if item.fonte else "")
+        celulas.append([Paragraph(legenda, modelo.estilo_legenda), PlatypusImage(BytesIO(processada.impressao), width=largura, height=altura)])
+    colunas = min(colunas, len(celulas))
+    linhas = [celulas[inicio:inicio + colunas] for inicio in range(0, len(celulas), colunas)]
+    linhas[-1] += [""] * (colunas - len(linhas[-1]))
+    tabela_imagens = Table(linhas, colWidths=[LARGURA_COLUNA_IMAGEM] * colunas)
+    tabela_imagens.setStyle(modelo.estilo_grade_imagens)
+    return tabela_imagens
+
+def adicionar_mudancas_ao_pdf(mudancas):
+    """
+    Seção com o resultado da detecção de mudanças (ver deteccao_mudancas.py):
+    percentuais de perda e ganho de vegetação e a máscara sobreposta.
+    """
+    modelo = modelo_pdf()
+    texto = (
+        f"Comparação entre as imagens de {escape(str(mudancas.get('antes', '')))} e "
+        f"{escape(str(mudancas.get('depois', '')))}: perda de vegetação em "
+        f"<b>{mudancas.get('percentual_perda', 0):.1f}%</b> da área e ganho em "
+        f"<b>{mudancas.get('percentual_ganho', 0):.1f}%</b>."
+    )
+    elementos = [Paragraph("<b>Detecção de Mudanças</b>", modelo.estilo_secao), Paragraph(texto, modelo.estilo_normal)]
+    sobreposicao = mudancas.get("sobreposicao")
+    if sobreposicao:
+        with Image.open(BytesIO(sobreposicao)) as imagem:
+            largura, altura = imagem.size
+        escala = LARGURA_QUADRO_MUDANCAS / largura
+        elementos += [
+            Spacer(1, 8),
+            PlatypusImage(BytesIO(sobreposicao), width=LARGURA_QUADRO_MUDANCAS, height=altura * escala),
+            Paragraph("Vermelho: perda de vegetação; verde: ganho.", modelo.estilo_italico),
+        ]
+    return elementos
+
+# Função para gerar o PDF
+@medir("pdf.gerar")
+def gerar_pdf(relatorio, filename="relatorio_analise.pdf"):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    modelo = modelo_pdf()
+
+    elementos = []
+
+    # Adiciona um espaço no início do conteúdo para evitar sobreposição
+    elementos.append(Spacer(1, 2 * cm))  # 2 cm de espaço (ajuste conforme necessário)
+
+    # Adiciona o conteúdo do relatório
+    elementos.append(Paragraph("Relatório de Análise de Ocorrências", modelo.estilo_titulo))
+    elementos.append(Spacer(1, 12))  # Espaço entre o título e o conteúdo
+
+    # Dados para a primeira tabela
+    dados_tabela1 = [
+        ["Número do Relatório", relatorio.get("numero_relatorio", "N/A")],
+        ["Data do Relatório", relatorio.get("data_relatorio", "N/A")],
+        ["Período de Análise (Início)", relatorio.get("periodo_inicio", "N/A")],  # Nova linha
+        ["Período de Análise (Fim)", relatorio.get("periodo_fim", "N/A")],  # Nova linha
+        ["Município", relatorio.get("municipio", "N/A")],
+        ["Endereço", relatorio.get("endereco", "N/A")],
+        ["Latitude", relatorio.get('lat_gms', 'N/A')],
+        ["Longitude", relatorio.get('lon_gms', 'N/A')],
+        ["Número WEBAIA", relatorio.get("numero_webaia", "N/A")],
+    ]
+
+    # Dados para a segunda tabela (demais informações)
+    dados_tabela2 = [
+        ["Tipo de Área", relatorio.get("tipo_area", "N/A")],
+        ["Bioma", relatorio.get("bioma", "N/A")],
+        ["Tipo de Vegetação", relatorio.get("tipo_vegetacao", "N/A")],
+        ["Estágio Sucessional", relatorio.get("estagio_sucessional", "N/A")],
+        ["Ano do Inventário", relatorio.get("ano_inventario", "N/A")],
+        ["Vegetação no Inventário", relatorio.get("vegetacao_inventario", "N/A")],
+        ["Fiscalizações Anteriores", relatorio.get("fiscalizacao_info", "Nenhuma")],
+        ["Licenças", relatorio.get("descricao_licenca", "Nenhuma")],
+        ["Bases de Dados Consultadas", relatorio.get("bases_dados", "Nenhuma")],  # Nova linha
+    ]
+
+    # Adiciona as tabelas ao PDF
+    elementos.append(modelo.tabela(dados_tabela1))  # Primeira tabela
+    elementos.append(Spacer(1, 20))  # Espaço entre as tabelas
+
+    # Mapa de localização (ponto da ocorrência e área), desenhado em vetor
+    mapa = mapa_do_relatorio(relatorio, largura=500, altura=300)
+    if mapa is not None:
+        elementos.append(Paragraph("<b>Localização</b>", modelo.estilo_secao))
+        elementos.append(mapa)
+        elementos.append(Spacer(1, 20))
+
+    elementos.append(modelo.tabela(dados_tabela2))  # Segunda tabela
+    elementos.append(Spacer(1, 20))  # Espaço entre as tabelas
+
+    # Adiciona as imagens ao PDF (antes da conclusão)
+    imagens = imagens_do_relatorio(relatorio)
+    if imagens:
+        # Adiciona um espaçamento antes da tabela
+        elementos.append(Spacer(1, 20))  # 20 pontos de espaçamento
+
+        # Adiciona a grade de imagens e datas
+        with medir("pdf.imagens"):
+            elementos.append(adicionar_imagens_ao_pdf(imagens))
+
+    # Resultado da detecção de mudanças entre a primeira e a última imagem
+    if relatorio.get("mudancas"):
+        elementos.append(Spacer(1, 10))
+        elementos.extend(adicionar_mudancas_ao_pdf(relatorio["mudancas"]))
+
+    # Adiciona um espaçamento após a tabela
+    elementos.append(Spacer(1, 20))  # 20 pontos de espaçamento
+
+    # Adiciona a conclusão ao PDF
+    if relatorio.get("conclusao_fiscalizacao", False):
+        conclusao_texto = CONCLUSAO_FISCALIZACAO
+    elif relatorio.get("conclusao_encerramento", False):
+        conclusao_texto = CONCLUSAO_ENCERRAMENTO
+    else:
+        conclusao_texto = SEM_CONCLUSAO
+
+    elementos.append(Paragraph("<b>Conclusão</b>", modelo.estilo_secao))  # Título da conclusão
+    elementos.append(Spacer(1, 10))  # Espaço antes do texto
+    elementos.append(Paragraph(conclusao_texto, modelo.estilo_conclusao))  # Texto justificado
+    elementos.append(Spacer(1, 20))  # Espaço após a conclusão
+
+    # Adiciona o responsável centralizado à direita
+    responsavel = f"Responsável: {relatorio.get('responsavel', 'N/A')}"
+    elementos.append(Spacer(1, 20))  # Espaço antes do responsável
+    elementos.append(Paragraph(responsavel, modelo.estilo_responsavel))
+
+    # Gera o PDF com cabeçalho, rodapé e marca d'água
+    with medir("pdf.layout"):
+        doc.build(elementos, onFirstPage=adicionar_cabecalho_rodape_e_marca_dagua, onLaterPages=adicionar_cabecalho_rodape_e_marca_dagua)
+    buffer.seek(0)
+    return buffer
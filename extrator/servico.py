@@ -0,0 +1,368 @@
+"""
+Serviço HTTP local para gerar relatórios em PDF e converter KML/KMZ.
+
+Servidor asyncio (só biblioteca padrão) que repassa o trabalho pesado a um
+pool de processos limitado. Quando todos os processos estão ocupados e a
+fila (processos x fila_por_processo) está cheia, novas requisições recebem
+503 com Retry-After em vez de acumular memória. As respostas são enviadas
+em blocos à medida que o cliente consome.
+
+Rotas:
+    POST /relatorio   JSON com os campos do relatório; as imagens vão em
+                      "imagens" (itens com "imagem" em base64, "data" e
+                      "fonte") ou em imagem1, imagem2... (base64). Responde
+                      application/pdf.
+    POST /converter   Corpo com o KML ou KMZ; ?formato=kmz|kml|geojson|csv|csv_gms|gpkg
+                      (padrão kmz). Responde o arquivo convertido.
+    GET  /metricas    Fila, processos ocupados, contadores e latências (JSON).
+    GET  /saude       "ok".
+
+Exemplo:
+    python -m extrator serve --porta 8765 --processos 4
+    curl -X POST --data-binary @relatorio.json localhost:8765/relatorio -o r.pdf
+"""
+# Bibliotecas padrão do Python
+import asyncio
+import base64
+import json
+import logging
+import os
+import signal
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from http import HTTPStatus
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+# Módulos do projeto
+from extrator.exportacao import FORMATO_KMZ, FORMATOS, exportar
+from extrator.leitura_kml import carregar_geometrias
+from extrator.lote_relatorios import PADRAO_CAMPO_IMAGEM, inicializar_worker
+from extrator.relatorio_pdf import gerar_pdf
+
+logger = logging.getLogger(__name__)
+
+PORTA_PADRAO = 8765
+FILA_POR_PROCESSO = 4
+MAXIMO_CORPO = 64 * 1024 * 1024
+MAXIMO_CABECALHO = 64 * 1024
+BLOCO_RESPOSTA = 64 * 1024
+JANELA_LATENCIAS = 1000  # Últimas requisições usadas nos percentis
+TEMPO_LEITURA = 30  # Segundos para o cliente enviar a requisição
+
+# Rotas atendidas; as demais entram nas métricas sob uma chave fixa, para
+# que caminhos arbitrários enviados pelos clientes não criem entradas novas
+ROTAS = ("GET /saude", "GET /metricas", "POST /relatorio", "POST /converter")
+ROTA_OUTRAS = "outras"
+ROTA_INVALIDA = "?"  # Requisição que não pôde ser lida
+
+class ErroHttp(Exception):
+    """Erro que vira uma resposta HTTP com o status e a mensagem dados."""
+
+    def __init__(self, status, mensagem, cabecalhos=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.cabecalhos = cabecalhos or {}
+
+# ==========================================
+# Tarefas executadas nos processos do pool
+# ==========================================
+
+def _decodificar_imagens(relatorio):
+    relatorio["imagens"] = [
+        dict(item, imagem=base64.b64decode(item["imagem"]) if item.get("imagem") else None)
+        for item in relatorio.get("imagens") or []
+    ]
+    for campo in list(relatorio):
+        if PADRAO_CAMPO_IMAGEM.fullmatch(campo) and relatorio[campo]:
+            relatorio[campo] = base64.b64decode(relatorio[campo])
+    return relatorio
+
+def renderizar_relatorio(relatorio):
+    """Gera o PDF; retorna (bytes, segundos de processamento)."""
+    inicio = time.perf_counter()
+    dados = gerar_pdf(_decodificar_imagens(relatorio)).getvalue()
+    return dados, time.perf_counter() - inicio
+
+def converter_kml(dados, formato):
+    """Converte KML/KMZ para "formato"; retorna (bytes, segundos de processamento)."""
+    inicio = time.perf_counter()
+    nome = "entrada.kmz" if dados[:4] == b"PK\x03\x04" else "entrada.kml"
+    geometrias = carregar_geometrias(BytesIO(dados), nome)
+    if not geometrias.total_poligonos:
+        raise ValueError("nenhum polígono encontrado")
+    saida = BytesIO()
+    exportar(geometrias, formato, saida)
+    return saida.getvalue(), time.perf_counter() - inicio
+
+# ==========================================
+# Métricas
+# ==========================================
+
+def _percentil(valores, fracao):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))] * 1000, 1)
+
+class Metricas:
+    """
+    Contadores por rota/status e latências (total e de processamento) das
+    últimas JANELA_LATENCIAS requisições de cada rota. Só as ROTAS têm
+    entrada própria: o tamanho não depende do que os clientes enviam.
+    """
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.respostas = Counter()
+        self.latencias = defaultdict(lambda: deque(maxlen=JANELA_LATENCIAS))
+        self.processamento = defaultdict(lambda: deque(maxlen=JANELA_LATENCIAS))
+
+    def registrar(self, rota, status, segundos, segundos_processamento=None):
+        if rota not in ROTAS and rota != ROTA_INVALIDA:
+            rota = ROTA_OUTRAS
+        self.respostas[f"{rota} {status}"] += 1
+        self.latencias[rota].append(segundos)
+        if segundos_processamento is not None:
+            self.processamento[rota].append(segundos_processamento)
+
+    def resumo(self, **estado):
+        rotas = {}
+        for rota, latencias in self.latencias.items():
+            processamento = self.processamento.get(rota, ())
+            rotas[rota] = {
+                "amostras": len(latencias),
+                "latencia_p50_ms": _percentil(latencias, 0.5),
+                "latencia_p95_ms": _percentil(latencias, 0.95),
+                "processamento_p50_ms": _percentil(processamento, 0.5),
+                "processamento_p95_ms": _percentil(processamento, 0.95),
+            }
+        return {
+            **estado,
+            "segundos_ativo": round(time.time() - self.inicio, 1),
+            "respostas": dict(self.respostas),
+            "rotas": rotas,
+        }
+
+# ==========================================
+# Servidor
+# ==========================================
+
+class ServicoRelatorios:
+    """
+    Servidor HTTP asyncio com pool de processos limitado.
+    """
+
+    def __init__(self, processos=None, fila_por_processo=FILA_POR_PROCESSO, maximo_corpo=MAXIMO_CORPO):
+        self.processos = processos or os.cpu_count() or 1
+        self.capacidade = self.processos * fila_por_processo
+        self.maximo_corpo = maximo_corpo
+        self.pendentes = 0
+        self.recebendo = 0  # Corpos sendo lidos, que ainda vão para a fila
+        self.metricas = Metricas()
+        self.executor = None
+
+    def iniciar_pool(self):
+        self.executor = ProcessPoolExecutor(self.processos, initializer=inicializar_worker)
+
+    def _recriar_pool(self, quebrado):
+        """Substitui o pool cujo processo morreu (uma vez, mesmo com várias tarefas afetadas)."""
+        if self.executor is not quebrado:
+            return
+        logger.error("Processo de trabalho encerrado inesperadamente; recriando o pool")
+        quebrado.shutdown(wait=False, cancel_futures=True)
+        self.iniciar_pool()
+
+    def encerrar_pool(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def executar(self, funcao, *args):
+        """
+        Executa "funcao" no pool, ou recusa com 503 se a fila estiver cheia.
+        """
+        if self.pendentes >= self.capacidade:
+            raise ErroHttp(HTTPStatus.SERVICE_UNAVAILABLE, "fila cheia, tente novamente", {"Retry-After": "1"})
+        self.pendentes += 1
+        executor = self.executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, partial(funcao, *args))
+        except BrokenProcessPool:
+            self._recriar_pool(executor)
+            raise ErroHttp(HTTPStatus.SERVICE_UNAVAILABLE, "processo de trabalho encerrado, tente novamente", {"Retry-After": "1"})
+        finally:
+            self.pendentes -= 1
+
+    def estado(self):
+        return {
+            "processos": self.processos,
+            "capacidade_fila": self.capacidade,
+            "pendentes": self.pendentes,
+            "recebendo": self.recebendo,
+            "em_execucao": min(self.pendentes, self.processos),
+            "aguardando": max(0, self.pendentes - self.processos),
+        }
+
+    # ------------------------------------------------------------------
+    # Rotas
+    # ------------------------------------------------------------------
+
+    async def rota_relatorio(self, consulta, corpo):
+        try:
+            relatorio = json.loads(corpo)
+        except ValueError as e:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, f"JSON inválido: {e}")
+        if not isinstance(relatorio, dict):
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "o relatório deve ser um objeto JSON")
+        dados, segundos = await self._executar_tarefa(renderizar_relatorio, relatorio)
+        return dados, {"Content-Type": "application/pdf"}, segundos
+
+    async def rota_converter(self, consulta, corpo):
+        formato = consulta.get("formato", [FORMATO_KMZ])[0]
+        if formato not in FORMATOS:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, f"formato desconhecido: {formato}")
+        if not corpo:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "envie o KML/KMZ no corpo da requisição")
+        dados, segundos = await self._executar_tarefa(converter_kml, corpo, formato)
+        cabecalhos = {
+            "Content-Type": FORMATOS[formato].mime,
+            "Content-Disposition": f'attachment; filename="poligono.{FORMATOS[formato].extensao}"',
+        }
+        return dados, cabecalhos, segundos
+
+    async def _executar_tarefa(self, funcao, *args):
+        try:
+            return await self.executar(funcao, *args)
+        except ErroHttp:
+            raise
+        except Exception as e:
+            # Erro nos dados enviados (imagem inválida, KML malformado...)
+            raise ErroHttp(HTTPStatus.UNPROCESSABLE_ENTITY, f"{type(e).__name__}: {e}")
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _ler_requisicao(self, reader):
+        try:
+            bruto = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), TEMPO_LEITURA)
+        except asyncio.LimitOverrunError:
+            raise ErroHttp(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "cabeçalho muito grande")
+        linhas = bruto.decode("latin-1").split("\r\n")
+        try:
+            metodo, alvo, _ = linhas[0].split(" ", 2)
+        except ValueError:
+            raise ErroHttp(HTTPStatus.BAD_REQUEST, "linha de requisição inválida")
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            if ":" in linha:
+                nome, valor = linha.split(":", 1)
+                cabecalhos[nome.strip().lower()] = valor.strip()
+        corpo = b""
+        if metodo == "POST":
+            if "content-length" not in cabecalhos:
+                raise ErroHttp(HTTPStatus.LENGTH_REQUIRED, "informe Content-Length")
+            # Só dígitos ASCII: int() aceitaria também sinal, espaços e "_"
+            valor = cabecalhos["content-length"]
+            if not (valor.isascii() and valor.isdigit()):
+                raise ErroHttp(HTTPStatus.BAD_REQUEST, f"Content-Length inválido: {valor!r}")
+            tamanho = int(valor)
+            if tamanho > self.maximo_corpo:
+                raise ErroHttp(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"corpo maior que {self.maximo_corpo} bytes")
+            # Recusa antes de ler o corpo: com a fila cheia, nada é acumulado em memória
+            if self.pendentes + self.recebendo >= self.capacidade:
+                raise ErroHttp(HTTPStatus.SERVICE_UNAVAILABLE, "fila cheia, tente novamente", {"Retry-After": "1"})
+            self.recebendo += 1
+            try:
+                corpo = await asyncio.wait_for(reader.readexactly(tamanho), TEMPO_LEITURA)
+            finally:
+                self.recebendo -= 1
+        return metodo, urlsplit(alvo), corpo
+
+    async def _responder(self, writer, status, dados, cabecalhos=None):
+        cabecalhos = {"Content-Length": str(len(dados)), "Connection": "close", **(cabecalhos or {})}
+        linhas = [f"HTTP/1.1 {status.value} {status.phrase}"] + [f"{nome}: {valor}" for nome, valor in cabecalhos.items()]
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1"))
+        # Envia em blocos, respeitando o ritmo de leitura do cliente
+        visao = memoryview(dados)
+        for inicio in range(0, len(dados), BLOCO_RESPOSTA):
+            writer.write(visao[inicio:inicio + BLOCO_RESPOSTA])
+            await writer.drain()
+        await writer.drain()
+
+    async def atender(self, reader, writer):
+        inicio = time.perf_counter()
+        rota = ROTA_INVALIDA
+        segundos_processamento = None
+        try:
+            try:
+                metodo, url, corpo = await self._ler_requisicao(reader)
+                rota = f"{metodo} {url.path}"
+                consulta = parse_qs(url.query)
+                if rota == "GET /saude":
+                    status, dados, cabecalhos = HTTPStatus.OK, b"ok", {"Content-Type": "text/plain"}
+                elif rota == "GET /metricas":
+                    dados = json.dumps(self.metricas.resumo(**self.estado()), ensure_ascii=False).encode("utf-8")
+                    status, cabecalhos = HTTPStatus.OK, {"Content-Type": "application/json"}
+                elif rota == "POST /relatorio":
+                    dados, cabecalhos, segundos_processamento = await self.rota_relatorio(consulta, corpo)
+                    status = HTTPStatus.OK
+                elif rota == "POST /converter":
+                    dados, cabecalhos, segundos_processamento = await self.rota_converter(consulta, corpo)
+                    status = HTTPStatus.OK
+                else:
+                    raise ErroHttp(HTTPStatus.NOT_FOUND, f"rota desconhecida: {rota}")
+            except ErroHttp as e:
+                status, cabecalhos = e.status, {"Content-Type": "application/json", **e.cabecalhos}
+                dados = json.dumps({"erro": str(e)}, ensure_ascii=False).encode("utf-8")
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                return
+            await self._responder(writer, status, dados, cabecalhos)
+            self.metricas.registrar(rota, status.value, time.perf_counter() - inicio, segundos_processamento)
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception("Erro ao atender %s", rota)
+        finally:
+            writer.close()
+
+    async def servir(self, host="127.0.0.1", porta=PORTA_PADRAO):
+        """
+        Atende até receber SIGINT/SIGTERM.
+        """
+        self.iniciar_pool()
+        servidor = await asyncio.start_server(self.atender, host, porta, limit=MAXIMO_CABECALHO)
+        parar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sinal, parar.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows ou thread secundária: encerra com Ctrl+C
+        enderecos = ", ".join(str(socket.getsockname()) for socket in servidor.sockets)
+        logger.info("Servindo em %s com %d processo(s), fila de %d", enderecos, self.processos, self.capacidade)
+        try:
+            async with servidor:
+                await parar.wait()
+        finally:
+            self.encerrar_pool()
+
+def configurar_argumentos(parser):
+    """
+    Declara os argumentos do serviço (usado por "python -m extrator serve").
+    """
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: somente local)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help="Porta TCP")
+    parser.add_argument("-p", "--processos", type=int, default=None, help="Processos de renderização (padrão: número de núcleos)")
+    parser.add_argument("--fila", type=int, default=FILA_POR_PROCESSO, help="Requisições pendentes por processo antes de responder 503")
+    return parser
+
+def executar(args):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    servico = ServicoRelatorios(args.processos, args.fila)
+    asyncio.run(servico.servir(args.host, args.porta))
+    return 0
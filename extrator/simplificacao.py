@@ -0,0 +1,159 @@
+"""
+Simplificação de polígonos e níveis de detalhe (LOD) para o mapa.
+
+A tolerância de cada nível é derivada do tamanho do pixel no zoom do mapa
+(escala do Web Mercator), então o número de vértices enviados ao navegador
+depende do que é visível na tela, e não do número de vértices do
+levantamento. O KMZ exportado continua usando a geometria completa.
+"""
+# Bibliotecas de terceiros
+import numpy as np
+
+# Módulos do projeto
+from extrator.instrumentacao import medir
+
+DOUGLAS_PEUCKER = "douglas_peucker"
+VISVALINGAM = "visvalingam"
+
+# Faixas de zoom de cada nível de detalhe: (zoom mínimo, zoom máximo)
+FAIXAS_ZOOM_PADRAO = ((0, 10), (11, 13), (14, 16), (17, 18))
+METROS_POR_GRAU = 111_320.0
+CASAS_DECIMAIS_MAPA = 6  # ~0,1 m, abaixo do pixel no zoom máximo (18) do mapa
+
+def metros_por_pixel(zoom, latitude):
+    """Tamanho do pixel (em metros) no zoom e latitude informados."""
+    return 156_543.03392 * np.cos(np.radians(latitude)) / 2 ** zoom
+
+def tolerancia_para_zoom(zoom, latitude, pixels=1.0):
+    """Tolerância (em graus de latitude) equivalente a "pixels" no zoom dado."""
+    return pixels * metros_por_pixel(zoom, latitude) / METROS_POR_GRAU
+
+def _plano_local(pontos):
+    """
+    Projeta (lat, lon) em um plano aproximadamente isométrico (graus de latitude).
+    """
+    escala_lon = np.cos(np.radians(pontos[:, 0].mean()))
+    return np.column_stack([pontos[:, 0], pontos[:, 1] * escala_lon])
+
+def _douglas_peucker_aberto(plano, tolerancia):
+    """
+    Douglas–Peucker iterativo em uma linha aberta; retorna a máscara dos vértices mantidos.
+    """
+    manter = np.zeros(len(plano), dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, len(plano) - 1)]
+    while pilha:
+        inicio, fim = pilha.pop()
+        if fim - inicio < 2:
+            continue
+        a, b = plano[inicio], plano[fim]
+        trecho = plano[inicio + 1:fim]
+        segmento = b - a
+        comprimento = np.hypot(*segmento)
+        if comprimento == 0:
+            distancias = np.hypot(*(trecho - a).T)
+        else:
+            distancias = np.abs(segmento[0] * (trecho[:, 1] - a[1]) - segmento[1] * (trecho[:, 0] - a[0])) / comprimento
+        maior = int(np.argmax(distancias))
+        if distancias[maior] > tolerancia:
+            indice = inicio + 1 + maior
+            manter[indice] = True
+            pilha.append((inicio, indice))
+            pilha.append((indice, fim))
+    return manter
+
+def douglas_peucker(anel, tolerancia):
+    """
+    Simplifica um anel (sem vértice de fechamento) por Douglas–Peucker.
+
+    O anel é dividido no vértice mais distante do primeiro, para que a
+    simplificação de um anel fechado seja bem definida. Sempre mantém ao
+    menos 3 vértices. Retorna a máscara dos vértices mantidos.
+    """
+    if len(anel) <= 3:
+        return np.ones(len(anel), dtype=bool)
+    plano = _plano_local(anel)
+    oposto = int(np.argmax(np.hypot(*(plano - plano[0]).T)))
+    fechado = np.vstack([plano, plano[:1]])
+    manter = np.zeros(len(anel), dtype=bool)
+    manter[:oposto + 1] = _douglas_peucker_aberto(fechado[:oposto + 1], tolerancia)
+    manter[oposto:] |= _douglas_peucker_aberto(fechado[oposto:], tolerancia)[:-1]
+    if manter.sum() < 3:
+        # Garante um triângulo: acrescenta o vértice mais distante da corda
+        a, b = plano[0], plano[oposto]
+        segmento = b - a
+        distancias = np.abs(segmento[0] * (plano[:, 1] - a[1]) - segmento[1] * (plano[:, 0] - a[0]))
+        distancias[manter] = -1
+        manter[int(np.argmax(distancias))] = True
+    return manter
+
+def visvalingam(anel, tolerancia):
+    """
+    Simplifica um anel pelo método de Visvalingam–Whyatt.
+
+    Remove, em rodadas vetorizadas, os vértices cuja área efetiva (triângulo
+    com os vizinhos) é menor que tolerancia² e é mínima entre os vizinhos;
+    assim dois vértices adjacentes nunca são removidos na mesma rodada.
+    Sempre mantém ao menos 3 vértices. Retorna a máscara dos vértices mantidos.
+    """
+    manter = np.ones(len(anel), dtype=bool)
+    if len(anel) <= 3:
+        return manter
+    plano = _plano_local(anel)
+    limite = tolerancia ** 2
+    while True:
+        indices = np.flatnonzero(manter)
+        if len(indices) <= 3:
+            break
+        atual = plano[indices]
+        anterior = np.roll(atual, 1, axis=0)
+        seguinte = np.roll(atual, -1, axis=0)
+        areas = np.abs(
+            (anterior[:, 0] - seguinte[:, 0]) * (atual[:, 1] - anterior[:, 1])
+            - (anterior[:, 0] - atual[:, 0]) * (seguinte[:, 1] - anterior[:, 1])
+        ) / 2
+        minimo_local = (areas < np.roll(areas, 1)) & (areas <= np.roll(areas, -1))
+        remover = (areas < limite) & minimo_local
+        if not remover.any():
+            break
+        # Nunca deixa o anel com menos de 3 vértices
+        excesso = remover.sum() - (len(indices) - 3)
+        if excesso > 0:
+            candidatos = np.flatnonzero(remover)
+            remover[candidatos[np.argsort(areas[candidatos])[::-1][:excesso]]] = False
+        manter[indices[remover]] = False
+    return manter
+
+METODOS = {DOUGLAS_PEUCKER: douglas_peucker, VISVALINGAM: visvalingam}
+
+def simplificar_anel(anel, tolerancia, metodo=DOUGLAS_PEUCKER):
+    """Retorna a cópia simplificada do anel."""
+    return anel[METODOS[metodo](anel, tolerancia)]
+
+@medir("mapa.simplificar")
+def gerar_niveis_detalhe(geometrias, faixas_zoom=FAIXAS_ZOOM_PADRAO, metodo=DOUGLAS_PEUCKER, pixels=1.0):
+    """
+    Pré-calcula os níveis de detalhe de uma ColecaoGeometrias.
+
+    Para cada faixa (zoom mínimo, zoom máximo) a tolerância é a de "pixels"
+    no zoom máximo da faixa. Furos menores que a tolerância são omitidos.
+    Retorna uma lista de (zoom_min, zoom_max, poligonos), em que poligonos
+    é uma lista de listas de anéis já arredondados para o mapa.
+    """
+    if not geometrias:
+        return []
+    latitude_media = float(geometrias.coordenadas[:, 0].mean())
+    niveis = []
+    for zoom_min, zoom_max in faixas_zoom:
+        tolerancia = tolerancia_para_zoom(zoom_max, latitude_media, pixels)
+        poligonos = []
+        for indice in range(geometrias.total_poligonos):
+            aneis = []
+            for posicao, anel in enumerate(geometrias.poligono(indice)):
+                if posicao > 0 and np.ptp(anel, axis=0).max() < tolerancia:
+                    continue
+                simplificado = simplificar_anel(anel, tolerancia, metodo)
+                aneis.append(np.round(simplificado, CASAS_DECIMAIS_MAPA))
+            poligonos.append(aneis)
+        niveis.append((zoom_min, zoom_max, poligonos))
+    return niveis
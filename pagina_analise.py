@@ -0,0 +1,414 @@
+"""
+Página "Análise de Ocorrências" da interface: formulário e relatório em PDF.
+
+O ReportLab e o Pillow são importados só quando um PDF ou uma imagem é de
+fato processado.
+"""
+# Bibliotecas padrão do Python
+import base64
+import datetime
+import os
+from datetime import datetime as dt
+from functools import partial
+from io import BytesIO
+
+# Bibliotecas de terceiros
+import streamlit as st
+
+# Módulos do projeto
+from extrator.armazenamento import armazem_padrao
+from extrator.conversao_coordenadas import converter_coordenada, converter_valores
+from extrator.deteccao_mudancas import SUGESTAO_FISCALIZACAO, comparar_imagens
+from extrator.historico import RAIO_PADRAO_M, historico_padrao, resumo_fiscalizacoes
+from extrator.imagens import processar_imagens
+from extrator.indice_espacial import IndiceEspacial, areas_geodesicas
+from extrator.instrumentacao import contar, medir
+from extrator.leitura_kml import carregar_geometrias
+from extrator.modelo_relatorio import chave_relatorio
+from extrator.municipios import listar_municipios, localizador_padrao
+
+bases_dados = ["WEBAIA", "PAMBGEO", "SIGAM", "DATAGEO", "SINESP-BRASIL MAIS", "GOOGLE EARTH", "EAMBIENTE", "SISTEMA DOF LEGADO", "SISTEMA DOF +", "MAP BIOMAS ALERTA"]
+biomas = {"Mata Atlântica": ["Floresta Ombrófila Mista", "Floresta Estacional"], "Cerrado": ["Cerrado Sensu Stricto", "Campo Rupestre"]}
+estagios_sucessionais = ["Pioneiro", "Inicial", "Médio", "Avançado"]
+anos_inventario = ["2000", "2010", "2020"]
+policiais = ["1° SGT PM 130896-3 SILVA", "CB PM CLAUDIO", "CB PM BRISOLA", "CB PM ALVES", "CB PM MASAYOSHI"]
+
+# PDFs gerados ficam no armazém de blobs em disco, compartilhado entre
+# execuções do script e sessões; a sessão guarda só o Blob. A chave é o hash
+# do conteúdo do relatório.
+def bytes_pdf(relatorio):
+    """
+    Gera o PDF do relatório. Sem chamadas ao Streamlit: também é usado pelo
+    download adiado, executado fora do script.
+    """
+    # Importado só aqui: o ReportLab é carregado na primeira geração de PDF
+    from extrator.relatorio_pdf import gerar_pdf
+
+    contar("pdf.cache_falta")
+    return gerar_pdf(relatorio).getvalue()
+
+def obter_pdf(chave, relatorio):
+    """Blob do PDF do relatório, gerado só se ainda não estiver no armazém."""
+    def gerar():
+        with st.spinner("Gerando relatório..."):
+            return bytes_pdf(relatorio)
+
+    return armazem_padrao().obter(chave, gerar, ".pdf")
+
+def carregar_imagens_enviadas(arquivos, fontes_imagens, fonte_padrao, colunas=3):
+    """
+    Processa as imagens enviadas (em paralelo, com cache pelo hash do
+    arquivo), exibe as miniaturas em grade com a data e a fonte de cada uma
+    e retorna a série para o relatório, ordenada pela data, e o Blob do
+    arquivo original de cada imagem pelo hash.
+    """
+    if not arquivos:
+        return [], {}
+    from PIL import Image
+
+    try:
+        with st.spinner("Processando imagens..."):
+            processadas = processar_imagens([arquivo.getvalue() for arquivo in arquivos])
+    except (OSError, Image.DecompressionBombError) as e:
+        st.error(f"Não foi possível ler as imagens enviadas: {e}")
+        return [], {}
+    serie = []
+    grade = st.columns(colunas)
+    for posicao, (arquivo, imagem) in enumerate(zip(arquivos, processadas)):
+        with grade[posicao % colunas]:
+            largura, altura = imagem.tamanho_original
+            st.image(imagem.miniatura, caption=f"{arquivo.name} ({largura} x {altura} px)", width="stretch")
+            data = st.date_input("Data da imagem", datetime.date.today(), format="DD/MM/YYYY", key=f"data_imagem_{imagem.hash}")
+            fonte = st.selectbox("Fonte", fontes_imagens, index=fontes_imagens.index(fonte_padrao), key=f"fonte_imagem_{imagem.hash}")
+        serie.append((data, {"imagem": imagem, "data": data.strftime("%d/%m/%Y"), "fonte": fonte}))
+    serie.sort(key=lambda item: item[0])
+    # Originais no armazém em disco: a comparação de mudanças os lê de lá
+    armazem = armazem_padrao()
+    originais = {
+        imagem.hash: armazem.guardar(arquivo.getvalue(), os.path.splitext(arquivo.name)[1].lower(), hash_conteudo=imagem.hash)
+        for arquivo, imagem in zip(arquivos, processadas)
+    }
+    return [item for _, item in serie], originais
+
+# Comparação cacheada pelos hashes das duas imagens
+@st.cache_resource(max_entries=16, show_spinner="Comparando as imagens...")
+def analisar_mudancas(hash_antes, hash_depois, _antes, _depois):
+    armazem = armazem_padrao()
+    antes, depois = armazem.ler(_antes), armazem.ler(_depois)
+    if antes is None or depois is None:
+        raise OSError("imagem original não está mais no armazém; envie-a novamente")
+    return comparar_imagens(antes, depois)
+
+def deteccao_mudancas(imagens, originais):
+    """
+    Compara a imagem mais antiga com a mais recente, exibe a máscara de
+    mudanças e sugere a conclusão (marcando-a uma vez por par de imagens).
+    Retorna o resumo para o relatório, ou None com menos de duas imagens.
+    """
+    if len(imagens) < 2:
+        return None
+    antes, depois = imagens[0], imagens[-1]
+    par = (antes["imagem"].hash, depois["imagem"].hash)
+    try:
+        resultado = analisar_mudancas(*par, originais[par[0]], originais[par[1]])
+    except OSError as e:
+        st.error(f"Não foi possível comparar as imagens: {e}")
+        return None
+    fiscalizacao = resultado.sugestao == SUGESTAO_FISCALIZACAO
+    with st.expander("🌳 Detecção de mudanças na vegetação", expanded=True):
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.image(resultado.sobreposicao, caption=f"{antes['data']} → {depois['data']}: vermelho = perda, verde = ganho", width="stretch")
+        with col2:
+            st.metric("Perda de vegetação", f"{resultado.percentual_perda:.1f}% da área")
+            st.metric("Ganho de vegetação", f"{resultado.percentual_ganho:.1f}% da área")
+            st.metric("Vegetação", f"{resultado.vegetacao_depois:.0f}%", f"{resultado.vegetacao_depois - resultado.vegetacao_antes:+.1f} p.p.")
+            st.caption("Sugestão: " + ("fiscalização in loco." if fiscalizacao else "encerramento da ocorrência."))
+    if st.session_state.get("par_mudancas") != par:
+        st.session_state.par_mudancas = par
+        st.session_state.conclusao_fiscalizacao = fiscalizacao
+        st.session_state.conclusao_encerramento = not fiscalizacao
+    return {
+        "antes": antes["data"],
+        "depois": depois["data"],
+        "percentual_perda": round(resultado.percentual_perda, 2),
+        "percentual_ganho": round(resultado.percentual_ganho, 2),
+        "sobreposicao": resultado.sobreposicao,
+    }
+
+def visualizar_pdf(blob):
+    """
+    Exibe o PDF embutido na página em base64, só para a sessão atual. Com os
+    blobs públicos ligados (ver extrator.armazenamento) e
+    server.enableStaticServing, o iframe aponta para o arquivo estático.
+    """
+    armazem = armazem_padrao()
+    url = armazem.url(blob) if st.get_option("server.enableStaticServing") else None
+    if url is None:
+        with medir("pdf.base64"):
+            url = "data:application/pdf;base64," + base64.b64encode(armazem.ler(blob)).decode("utf-8")
+    st.markdown(f'<iframe src="{url}" width="700" height="900" type="application/pdf"></iframe>', unsafe_allow_html=True)
+
+@st.cache_resource(max_entries=4, show_spinner="Indexando áreas de referência...")
+def carregar_indice_referencia(nome, dados):
+    """
+    Lê um KML/KMZ de áreas de referência (APP, unidades de conservação...) e
+    constrói o índice espacial, uma única vez por conteúdo de arquivo.
+    """
+    geometrias = carregar_geometrias(BytesIO(dados), nome)
+    return IndiceEspacial(geometrias), areas_geodesicas(geometrias)
+
+def triagem_areas_referencia(latitude, longitude):
+    """
+    Verifica se a coordenada da ocorrência está dentro de alguma área de referência.
+    """
+    with st.expander("🗺️ Triagem em áreas de referência (APP / áreas protegidas)"):
+        arquivo = st.file_uploader("Polígonos de referência (KML/KMZ)", type=["kml", "kmz"], key="areas_referencia")
+        if arquivo is None:
+            return
+        indice, areas = carregar_indice_referencia(arquivo.name, arquivo.getvalue())
+        geometrias = indice.geometrias
+        st.caption(f"{geometrias.total_poligonos} polígono(s) indexado(s).")
+        (lat, lon), validos = converter_valores([latitude, longitude])
+        if not (latitude and longitude) or not validos.all():
+            st.info("Informe a latitude e a longitude da ocorrência para a triagem.")
+            return
+        feicao_por_poligono = geometrias.feicoes_dos_poligonos()
+        _, poligonos = indice.poligonos_contendo(lat, lon)
+        if len(poligonos):
+            for poligono in poligonos:
+                nome = geometrias.nomes[feicao_por_poligono[poligono]] or f"Polígono {poligono + 1}"
+                st.warning(f"A ocorrência está dentro de **{nome}** ({areas[poligono] / 10_000:.2f} ha).")
+        else:
+            proximo, distancia = indice.poligono_mais_proximo(lat, lon)
+            nome = geometrias.nomes[feicao_por_poligono[proximo[0]]] or f"Polígono {proximo[0] + 1}"
+            st.success(f"A ocorrência está fora das áreas de referência. Mais próxima: **{nome}**, a {distancia[0]:.0f} m.")
+
+def sugerir_municipio(latitude, longitude):
+    """
+    Seleciona no formulário o município que contém a coordenada digitada,
+    quando há limites municipais configurados. A escolha manual do analista
+    é mantida enquanto a coordenada não mudar.
+    """
+    localizador = localizador_padrao()
+    if localizador is None or not (latitude and longitude):
+        return
+    (lat, lon), validos = converter_valores([latitude, longitude])
+    if not validos.all():
+        return
+    municipio = localizador.municipio(lat, lon)
+    # Só nomes que são opções do selectbox: outro valor o faria voltar à primeira opção
+    if municipio in listar_municipios() and st.session_state.get("coordenada_municipio") != (latitude, longitude):
+        st.session_state.coordenada_municipio = (latitude, longitude)
+        st.session_state.municipio = municipio
+
+def sugerir_fiscalizacoes(latitude, longitude):
+    """
+    Busca no histórico os relatórios próximos da coordenada digitada e, se
+    houver, marca "Existência de Fiscalizações do PAMB Anteriormente" com o
+    resumo deles. Como no município, a edição do analista é mantida
+    enquanto a coordenada não mudar.
+    """
+    if not (latitude and longitude):
+        return
+    (lat, lon), validos = converter_valores([latitude, longitude])
+    if not validos.all():
+        return
+    anteriores = historico_padrao().proximos(float(lat), float(lon))
+    if anteriores:
+        st.caption(f"📚 {len(anteriores)} relatório(s) anterior(es) a até {RAIO_PADRAO_M} m desta coordenada.")
+    if anteriores and st.session_state.get("coordenada_fiscalizacoes") != (latitude, longitude):
+        st.session_state.coordenada_fiscalizacoes = (latitude, longitude)
+        st.session_state.fiscalizacao_check = True
+        st.session_state.fiscalizacao_info = resumo_fiscalizacoes(anteriores)[:1000]
+
+def consultar_historico():
+    """
+    Busca nos relatórios já gerados por WEBAIA, município e período.
+    """
+    with st.expander("📚 Histórico de relatórios"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            numero_webaia = st.text_input("WEBAIA", key="historico_webaia")
+        with col2:
+            municipio = st.selectbox("Município", [""] + listar_municipios(), key="historico_municipio")
+        with col3:
+            periodo = st.date_input("Período", value=(), format="DD/MM/YYYY", key="historico_periodo")
+        inicio, fim = (tuple(periodo) + (None, None))[:2]
+        if not (numero_webaia or municipio or inicio):
+            st.caption(f"{len(historico_padrao())} relatório(s) no histórico. Informe um filtro para buscar.")
+            return
+        encontrados = historico_padrao().buscar(numero_webaia, municipio, inicio, fim or inicio)
+        if not encontrados:
+            st.info("Nenhum relatório encontrado.")
+            return
+        st.dataframe(encontrados, hide_index=True, column_order=(
+            "numero_relatorio", "data", "numero_webaia", "municipio", "conclusao", "responsavel", "latitude", "longitude",
+        ))
+
+def validar_data(data_str, formato="%d/%m/%Y"):
+    try:
+        return dt.strptime(data_str, formato).date()
+    except ValueError:
+        return None
+
+def analise_ocorrencias():
+    st.header("Análise de Ocorrências")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        numero_relatorio = st.text_input("Número do Relatório")
+    
+    with col2:
+        data_relatorio_str = st.text_input("Data do Relatório (dd/mm/aaaa)", value=datetime.date.today().strftime("%d/%m/%Y"))
+        data_relatorio = validar_data(data_relatorio_str)
+        if data_relatorio is None:
+            st.error("Formato de data inválido. Use dd/mm/aaaa.")
+    
+    with col3:
+        periodo_inicio_str = st.text_input("Período de Análise - Início (dd/mm/aaaa)", value=datetime.date.today().strftime("%d/%m/%Y"))
+        periodo_inicio = validar_data(periodo_inicio_str)
+        if periodo_inicio is None:
+            st.error("Formato de data inválido. Use dd/mm/aaaa.")
+    
+    with col4:
+        periodo_fim_str = st.text_input("Período de Análise - Fim (dd/mm/aaaa)", value=datetime.date.today().strftime("%d/%m/%Y"))
+        periodo_fim = validar_data(periodo_fim_str)
+        if periodo_fim is None:
+            st.error("Formato de data inválido. Use dd/mm/aaaa.")
+    
+    
+    st.markdown("### 📌 Dados da área de interesse")
+    col1, col2 = st.columns(2)
+    with col1:
+        latitude = st.text_input("Latitude (ex: 123456,78)")
+        lat_gms = converter_coordenada(latitude) if latitude else "N/A"
+        st.text(f"Formato GMS: {lat_gms}")
+    with col2:
+        longitude = st.text_input("Longitude (ex: 123456,78)")
+        lon_gms = converter_coordenada(longitude) if longitude else "N/A"
+        st.text(f"Formato GMS: {lon_gms}")
+    sugerir_municipio(latitude, longitude)
+    municipio = st.selectbox("Município", listar_municipios(), key="municipio")
+    endereco = st.text_input("Endereço")
+    numero_webaia = st.text_input("Número da WEBAIA")
+    triagem_areas_referencia(latitude, longitude)
+    # Polígonos desenhados na página do extrator entram no mapa de localização do PDF
+    geometrias_extrator = st.session_state.get("geometrias")
+    incluir_area = bool(geometrias_extrator) and st.checkbox("Incluir no mapa de localização os polígonos do Extrator")
+    sugerir_fiscalizacoes(latitude, longitude)
+    consultar_historico()
+
+    st.markdown("### 🔎 Consulta Base de Dados")
+    selecionados = {}
+    for base in bases_dados:
+        selecionados[base] = st.checkbox(base)
+    if selecionados.get("Outros"):
+        info_outros = st.text_area("Descreva outras bases de dados utilizadas")
+
+    # Título do formulário
+    st.markdown("### 📷 Imagens")
+
+    # Opções para o menu suspenso
+    fontes_imagens = ["Google Earth", "SINESP MAIS", "Sentinel", "Outros"]
+
+    # Menu suspenso para escolher a fonte das imagens
+    fonte_escolhida = st.selectbox("Fonte das Imagens", fontes_imagens)
+
+     # Título dinâmico com a fonte escolhida
+    st.title(f"IMAGENS: {fonte_escolhida}")
+
+    # Série temporal de imagens (antes/depois), em qualquer quantidade
+    arquivos_imagens = st.file_uploader("Carregar Imagens", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+    imagens, originais = carregar_imagens_enviadas(arquivos_imagens, fontes_imagens, fonte_escolhida)
+    mudancas = deteccao_mudancas(imagens, originais)
+
+
+    st.markdown("### 📋 Análise")
+    tipo_area = st.selectbox("Área", ["Área de Preservação Permanente (APP)", "Área Comum"])
+    bioma = st.selectbox("Bioma", list(biomas.keys()))
+    tipo_vegetacao = st.selectbox("Tipo de Vegetação", biomas[bioma])
+    estagio_sucessional = st.selectbox("Estágio Sucessional da Vegetação", estagios_sucessionais)
+    inventario_check = st.checkbox("Inventário Florestal")
+    if inventario_check:
+        ano_inventario = st.selectbox("Ano do Inventário", anos_inventario)
+        vegetacao_inventario = st.selectbox("Tipo de Vegetação no Inventário", biomas[bioma])
+    fiscalizacao_check = st.checkbox("Existência de Fiscalizações do PAMB Anteriormente", key="fiscalizacao_check")
+    if fiscalizacao_check:
+        fiscalizacao_info = st.text_area("Detalhes da fiscalização anterior (máx 1000 caracteres)", max_chars=1000, key="fiscalizacao_info")
+    else:
+        fiscalizacao_info = "Nenhuma"
+
+    licenca_check = st.checkbox("Licenças")
+    nao_ha_licenca = st.checkbox("Não há licença")  # Novo checkbox
+    if not nao_ha_licenca:
+        descricao_licenca = st.text_area("Descreva as licenças encontradas")
+    else:
+        descricao_licenca = "Nenhuma"
+
+    st.markdown("### 🔍 Conclusão")
+    conclusao_fiscalizacao = st.checkbox(
+        "Diante das informações apresentadas, sugiro o envio de equipe para fiscalização 'in loco' com fulcro da constatação de crimes ambientais, para eventual adoção de medidas penais e administrativas em caso de confirmação das informações descritas neste termo.",
+        key="conclusao_fiscalizacao",
+    )
+    conclusao_encerramento = st.checkbox(
+        "Diante das informações apresentadas, sugiro o encerramento e arquivamento da ocorrência, até nova solicitação.",
+        key="conclusao_encerramento",
+    )
+    responsavel = st.selectbox("Responsável pela análise", policiais)
+
+    if data_relatorio is None:
+        # Sem data válida (inclusive enquanto é digitada) não há relatório
+        st.button("Visualizar Relatório", disabled=True)
+        st.button("Gerar PDF", disabled=True)
+        st.caption("Corrija a data do relatório para visualizar ou gerar o PDF.")
+        return
+
+    relatorio = {
+        "numero_relatorio": numero_relatorio,
+        "data_relatorio": data_relatorio.strftime("%d/%m/%Y"),
+        "municipio": municipio,
+        "endereco": endereco,
+        "latitude": latitude,
+        "longitude": longitude,
+        "lat_gms": lat_gms,
+        "lon_gms": lon_gms,
+        "numero_webaia": numero_webaia,
+        "tipo_area": tipo_area,
+        "bioma": bioma,
+        "tipo_vegetacao": tipo_vegetacao,
+        "estagio_sucessional": estagio_sucessional,
+        "ano_inventario": ano_inventario if inventario_check else "N/A",
+        "vegetacao_inventario": vegetacao_inventario if inventario_check else "N/A",
+        "fiscalizacao_info": fiscalizacao_info if fiscalizacao_check else "Nenhuma",
+        "descricao_licenca": descricao_licenca if licenca_check else "Nenhuma",
+        "conclusao_fiscalizacao": conclusao_fiscalizacao,
+        "conclusao_encerramento": conclusao_encerramento,
+        "responsavel": responsavel,
+        "bases_dados": ", ".join([base for base, selecionado in selecionados.items() if selecionado]),
+        "imagens": imagens,  # Imagens com data (dd/mm/aaaa) e fonte, em ordem cronológica
+        "mudancas": mudancas,  # Comparação da primeira com a última imagem (ou None)
+        "area": geometrias_extrator if incluir_area else None,  # Polígonos do mapa de localização
+    }
+    # O relatório é identificado pelo conteúdo: enquanto o formulário e as
+    # imagens não mudarem, visualização, download e novas execuções do script
+    # reutilizam o mesmo PDF já gerado.
+    chave = chave_relatorio(relatorio)
+
+    if st.button("Visualizar Relatório"):
+        with medir("pdf.visualizar"):
+            blob = obter_pdf(chave, relatorio)
+            st.success("Relatório gerado com sucesso!")
+            visualizar_pdf(blob)
+    
+    if st.button("Gerar PDF"):
+        st.session_state.chave_pdf_gerado = chave
+        # Guarda no histórico para as buscas por WEBAIA, município e proximidade
+        historico_padrao().registrar(relatorio, armazem_padrao().ler(obter_pdf(chave, relatorio)))
+    if st.session_state.get("chave_pdf_gerado") == chave:
+        # Os bytes só são lidos do armazém quando o download é pedido; se o
+        # PDF já tiver sido descartado, é gerado de novo
+        st.download_button(
+            label="Baixar Relatório em PDF", data=partial(armazem_padrao().ler_ou_gerar, chave, partial(bytes_pdf, relatorio), ".pdf"),
+            file_name="relatorio_analise.pdf", mime="application/pdf",
+        )
@@ -0,0 +1,244 @@
+"""
+Página "Extrator" da interface: entrada, visualização e exportação de polígonos.
+"""
+# Bibliotecas padrão do Python
+import csv
+from functools import partial
+from io import BytesIO, StringIO
+
+# Bibliotecas de terceiros
+import numpy as np
+import streamlit as st
+
+# Módulos do projeto
+from componente_mapa import mapa_incremental
+from extrator.armazenamento import armazem_padrao
+from extrator.conversao_coordenadas import ZONA_UTM_PADRAO, converter_valores, interpretar_coordenadas, linhas_invalidas
+from extrator.exportacao import FORMATO_KMZ, FORMATOS, exportar
+from extrator.geometria import ColecaoGeometrias
+from extrator.instrumentacao import medir
+from extrator.leitura_kml import carregar_geometrias
+from extrator.modelo_relatorio import chave_relatorio
+from extrator.simplificacao import DOUGLAS_PEUCKER, VISVALINGAM
+
+def adicionar_coordenadas_manual(texto, zona_utm=ZONA_UTM_PADRAO):
+    convertidas = interpretar_coordenadas(texto, zona_utm=zona_utm)
+    pontos = np.column_stack([convertidas.latitudes, convertidas.longitudes])
+    st.session_state.geometrias.adicionar_vertices(pontos[convertidas.validos])
+    return [f"Formato inválido na linha {numero}: {linha}" for numero, linha in linhas_invalidas(convertidas)]
+
+def adicionar_coordenadas_csv(arquivo, coluna_lat, coluna_lon):
+    """
+    Adiciona as coordenadas de duas colunas de um CSV já lido (dicionário de listas).
+    """
+    latitudes, lat_validas = converter_valores(arquivo[coluna_lat])
+    longitudes, lon_validas = converter_valores(arquivo[coluna_lon])
+    validos = lat_validas & lon_validas & (np.abs(latitudes) <= 90)
+    st.session_state.geometrias.adicionar_vertices(np.column_stack([latitudes, longitudes])[validos])
+    return [f"Formato inválido na linha {numero + 2} do CSV" for numero in np.flatnonzero(~validos)]
+
+def ler_csv(uploaded_file):
+    """
+    Lê um CSV enviado para um dicionário {coluna: lista de valores}.
+    """
+    texto = uploaded_file.getvalue().decode("utf-8-sig", errors="replace")
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(StringIO(texto), dialeto)
+    cabecalho = next(leitor, [])
+    colunas = {nome: [] for nome in cabecalho}
+    for registro in leitor:
+        for nome, valor in zip(cabecalho, registro):
+            colunas[nome].append(valor)
+    return colunas
+
+def exibir_erros(erros, limite=20):
+    """
+    Mostra os erros de conversão em uma única mensagem.
+    """
+    if not erros:
+        return
+    mensagem = "\n".join(f"- {erro}" for erro in erros[:limite])
+    if len(erros) > limite:
+        mensagem += f"\n- ... e mais {len(erros) - limite} linha(s)"
+    st.error(f"{len(erros)} linha(s) não convertida(s):\n{mensagem}")
+
+def limpar():
+    st.session_state.geometrias.limpar()
+
+def gerar_poligono(metodo=DOUGLAS_PEUCKER):
+    geometrias = st.session_state.geometrias
+    if not geometrias:
+        st.error("Nenhuma coordenada inserida.")
+        return None
+    # Importado só aqui: o folium é a dependência mais pesada da interface
+    from extrator.mapa import gerar_mapa
+
+    return gerar_mapa(geometrias, metodo)
+
+def gerar_mapa_historico():
+    from extrator.historico import historico_padrao
+    from extrator.mapa import gerar_mapa_ocorrencias
+
+    mapa = gerar_mapa_ocorrencias(historico_padrao())
+    if mapa is None:
+        st.info("Nenhum relatório com coordenadas no histórico.")
+    return mapa
+
+def exportar_geometrias(formato):
+    """
+    Exporta as coordenadas para o armazém de blobs em disco; a sessão não
+    guarda o arquivo gerado. Retorna a função que lê os bytes para o
+    download adiado (gerando o arquivo de novo se já tiver sido descartado),
+    ou None sem coordenadas.
+    """
+    geometrias = st.session_state.geometrias
+    if not geometrias:
+        st.error("Nenhuma coordenada para exportação.")
+        return None
+    # Cópia: a coleção da sessão é alterada pelas próximas edições
+    copia = ColecaoGeometrias.de_arrays(
+        geometrias.coordenadas.copy(), geometrias.inicio_aneis.copy(), geometrias.inicio_poligonos.copy(),
+        geometrias.inicio_feicoes.copy(), geometrias.nomes, geometrias.dados,
+    )
+
+    def gerar():
+        buffer = BytesIO()
+        exportar(copia, formato, buffer)
+        return buffer.getvalue()
+
+    chave = chave_relatorio({"exportacao": formato, "geometrias": copia, "nomes": copia.nomes, "dados": copia.dados})
+    extensao = f".{FORMATOS[formato].extensao}"
+    armazem = armazem_padrao()
+    armazem.obter(chave, gerar, extensao)
+    return partial(armazem.ler_ou_gerar, chave, gerar, extensao)
+
+def carregar_kml_kmz(uploaded_file):
+    if uploaded_file is None:
+        return "Nenhum arquivo enviado."
+    try:
+        geometrias = carregar_geometrias(uploaded_file, uploaded_file.name)
+        if not geometrias.total_poligonos:
+            return "Erro ao carregar o arquivo KML/KMZ: nenhum polígono encontrado."
+        st.session_state.geometrias = geometrias
+        return (
+            f"Coordenadas extraídas com sucesso! {len(geometrias)} feição(ões), "
+            f"{geometrias.total_poligonos} polígono(s), {geometrias.total_vertices} vértice(s)."
+        )
+    except Exception as e:
+        return f"Erro ao carregar o arquivo KML/KMZ: {e}"
+
+def exibir_coordenadas():
+    """
+    Mostra as coordenadas atuais em GMS em uma única tabela.
+    """
+    geometrias = st.session_state.geometrias
+    if not geometrias:
+        st.info("Nenhuma coordenada registrada.")
+        return
+    latitudes, longitudes = geometrias.formatar_gms()
+    feicoes, poligonos, _ = geometrias.indices_vertices()
+    colunas = {"Latitude": latitudes, "Longitude": longitudes}
+    if geometrias.total_poligonos > 1:
+        nomes = np.asarray(geometrias.nomes, dtype=object)
+        colunas = {"Feição": nomes[feicoes], "Polígono": poligonos + 1, **colunas}
+    st.dataframe(colunas)
+
+# Função para o submenu do Extrator
+def extrator():
+    # Gerenciamento de estado para o extrator: todas as coordenadas ficam em
+    # uma ColecaoGeometrias (arrays float64), não em uma lista de tuplas
+    if 'geometrias' not in st.session_state:
+        st.session_state.geometrias = ColecaoGeometrias()
+    st.header("Extrator de Coordenadas KML/KMZ")
+    operacao = st.radio("Escolha a operação:", ["Inserção Manual", "Carregar Arquivo", "Gerar Polígono", "Mapa de Ocorrências", "Exportar Coordenadas", "Limpar Coordenadas"])
+    if operacao == "Inserção Manual":
+        st.subheader("Inserção Manual de Coordenadas")
+        texto = st.text_area(
+            "Insira múltiplas coordenadas (ex: -24°01'37.72\" -49°21'42.51\")",
+            help="Aceita GMS, graus decimais, o formato compacto 240137,72 492142,51 e UTM SIRGAS 2000 (ex: 23K 250000 7340000).",
+        )
+        zona_utm = st.number_input("Fuso UTM (quando não informado na linha)", min_value=1, max_value=60, value=ZONA_UTM_PADRAO)
+        if st.button("Adicionar Coordenadas Manualmente"):
+            erros = adicionar_coordenadas_manual(texto, zona_utm=zona_utm)
+            if erros:
+                exibir_erros(erros)
+            else:
+                st.success("Coordenadas adicionadas com sucesso!")
+        arquivo_csv = st.file_uploader("Ou carregue uma planilha CSV", type=["csv", "txt"])
+        if arquivo_csv is not None:
+            colunas = ler_csv(arquivo_csv)
+            nomes_colunas = list(colunas)
+            col1, col2 = st.columns(2)
+            with col1:
+                coluna_lat = st.selectbox("Coluna de latitude", nomes_colunas)
+            with col2:
+                coluna_lon = st.selectbox("Coluna de longitude", nomes_colunas, index=min(1, len(nomes_colunas) - 1))
+            if st.button("Adicionar Coordenadas do CSV"):
+                erros = adicionar_coordenadas_csv(colunas, coluna_lat, coluna_lon)
+                if erros:
+                    exibir_erros(erros)
+                else:
+                    st.success("Coordenadas adicionadas com sucesso!")
+        st.write("**Coordenadas Atuais:**")
+        exibir_coordenadas()
+        mapa_incremental(st.session_state.geometrias)
+    elif operacao == "Carregar Arquivo":
+        st.subheader("Carregar Arquivo KML/KMZ")
+        uploaded_file = st.file_uploader("Carregar arquivo", type=["kml", "kmz"])
+        if uploaded_file is not None:
+            mensagem = carregar_kml_kmz(uploaded_file)
+            if "sucesso" in mensagem.lower():
+                st.success(mensagem)
+            else:
+                st.error(mensagem)
+        st.write("**Coordenadas Extraídas:**")
+        exibir_coordenadas()
+    elif operacao == "Gerar Polígono":
+        st.subheader("Gerar Polígono")
+        # Mapa vivo: cada alteração envia só as diferenças ao navegador
+        mapa_incremental(st.session_state.geometrias)
+        with st.expander("Mapa estático com níveis de detalhe"):
+            metodo = st.radio(
+                "Simplificação para exibição",
+                [DOUGLAS_PEUCKER, VISVALINGAM],
+                format_func={DOUGLAS_PEUCKER: "Douglas–Peucker", VISVALINGAM: "Visvalingam–Whyatt"}.get,
+                horizontal=True,
+                help="Afeta apenas o mapa; o KMZ exportado mantém todos os vértices.",
+            )
+            if st.button("Gerar Polígono"):
+                mapa = gerar_poligono(metodo)
+                if mapa:
+                    with medir("mapa.html"):
+                        mapa_html = mapa._repr_html_()
+                    st.components.v1.html(mapa_html, height=500)
+    elif operacao == "Mapa de Ocorrências":
+        st.subheader("Mapa de Ocorrências")
+        st.caption("Relatórios do histórico agregados por área; aproxime o mapa para ver células menores.")
+        if st.button("Gerar Mapa"):
+            mapa = gerar_mapa_historico()
+            if mapa:
+                with medir("mapa.html"):
+                    mapa_html = mapa._repr_html_()
+                st.components.v1.html(mapa_html, height=500)
+    elif operacao == "Exportar Coordenadas":
+        st.subheader("Exportar Coordenadas")
+        formato = st.selectbox(
+            "Formato", list(FORMATOS), index=list(FORMATOS).index(FORMATO_KMZ), format_func=lambda f: FORMATOS[f].descricao
+        )
+        if st.button("Exportar"):
+            ler = exportar_geometrias(formato)
+            if ler:
+                extensao = FORMATOS[formato].extensao
+                # Os bytes só são lidos do armazém quando o download é pedido
+                st.download_button(
+                    label=f"Download {extensao.upper()}", data=ler,
+                    file_name=f"poligono.{extensao}", mime=FORMATOS[formato].mime,
+                )
+    elif operacao == "Limpar Coordenadas":
+        st.subheader("Limpar Coordenadas")
+        if st.button("Limpar Coordenadas"):
+            limpar()
+            st.success("Coordenadas limpas!")
@@ -0,0 +1,132 @@
+"""
+Testes da conversão em massa de coordenadas (extrator.conversao_coordenadas).
+"""
+# Bibliotecas padrão do Python
+import math
+
+# Bibliotecas de terceiros
+import numpy as np
+import pytest
+
+# Módulos do projeto
+from extrator.conversao_coordenadas import (
+    FORMATO_COMPACTO,
+    FORMATO_DECIMAL,
+    FORMATO_GMS,
+    FORMATO_INVALIDO,
+    FORMATO_UTM,
+    converter_valores,
+    interpretar_coordenadas,
+    linhas_invalidas,
+)
+
+LATITUDE = -(24 + 1 / 60 + 37.72 / 3600)
+LONGITUDE = -(49 + 21 / 60 + 42.51 / 3600)
+
+def _norte_no_meridiano_central(latitude):
+    """Norte UTM (hemisfério sul) no meridiano central, pelo arco de meridiano do GRS80."""
+    a, f = 6378137.0, 1 / 298.257222101
+    e2 = f * (2 - f)
+    fi = math.radians(latitude)
+    arco = a * (
+        (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256) * fi
+        - (3 * e2 / 8 + 3 * e2 ** 2 / 32 + 45 * e2 ** 3 / 1024) * math.sin(2 * fi)
+        + (15 * e2 ** 2 / 256 + 45 * e2 ** 3 / 1024) * math.sin(4 * fi)
+        - (35 * e2 ** 3 / 3072) * math.sin(6 * fi)
+    )
+    return 10_000_000 + 0.9996 * arco
+
+def _uma(linha, **opcoes):
+    convertidas = interpretar_coordenadas(linha, **opcoes)
+    assert len(convertidas.linhas) == 1
+    return convertidas.latitudes[0], convertidas.longitudes[0], convertidas.validos[0], convertidas.formatos[0]
+
+@pytest.mark.parametrize("linha", [
+    "-24°01'37.72\" -49°21'42.51\"",
+    "24°01'37.72\"S 49°21'42.51\"O",
+    "24°01'37.72\"S 49°21'42.51\"W",
+    "24º 01' 37,72'' S; 49º 21' 42,51'' O",
+    "-24°01’37.72” -49°21’42.51”",
+])
+def test_gms(linha):
+    latitude, longitude, valido, formato = _uma(linha)
+    assert valido and formato == FORMATO_GMS
+    assert latitude == pytest.approx(LATITUDE) and longitude == pytest.approx(LONGITUDE)
+
+@pytest.mark.parametrize("linha", ["-24.027144 -49.361808", "-24,027144; -49,361808", "-24.027144,-49.361808", "-24,027144\t-49,361808"])
+def test_decimal(linha):
+    latitude, longitude, valido, formato = _uma(linha)
+    assert valido and formato == FORMATO_DECIMAL
+    assert latitude == pytest.approx(-24.027144) and longitude == pytest.approx(-49.361808)
+
+@pytest.mark.parametrize("linha", ["240137,72 492142,51", "240137.72 0492142.51", "240137,72 0492142,51"])
+def test_compacto(linha):
+    # Sem sinal, o formato compacto é do hemisfério sul/oeste; a longitude pode ter 7 dígitos
+    latitude, longitude, valido, formato = _uma(linha)
+    assert valido and formato == FORMATO_COMPACTO
+    assert latitude == pytest.approx(LATITUDE) and longitude == pytest.approx(LONGITUDE)
+
+def test_formatos_misturados_na_linha():
+    latitude, longitude, valido, formato = _uma("-24.027144 492142,51")
+    assert valido and formato == f"{FORMATO_DECIMAL}/{FORMATO_COMPACTO}"
+    assert latitude == pytest.approx(-24.027144) and longitude == pytest.approx(LONGITUDE)
+
+def test_utm_no_meridiano_central():
+    norte = _norte_no_meridiano_central(-24.0)
+    latitude, longitude, valido, formato = _uma(f"23K 500000 {norte:.3f}")
+    assert valido and formato == FORMATO_UTM
+    assert latitude == pytest.approx(-24.0, abs=1e-8) and longitude == pytest.approx(-45.0, abs=1e-9)
+
+def test_utm_zona_padrao_e_simetria():
+    # Sem zona, vale zona_utm; pontos simétricos ao meridiano central têm a mesma latitude
+    convertidas = interpretar_coordenadas("440000 7340000\n560000 7340000", zona_utm=22)
+    assert convertidas.validos.all() and list(convertidas.formatos) == [FORMATO_UTM] * 2
+    assert convertidas.latitudes[0] == pytest.approx(convertidas.latitudes[1])
+    assert convertidas.longitudes[0] + convertidas.longitudes[1] == pytest.approx(2 * -51.0)
+
+def test_utm_banda_norte():
+    latitude, _, valido, _ = _uma("23N 500000 1000000")
+    assert valido and latitude == pytest.approx(9.04, abs=0.01)
+
+def test_linha_ambigua_e_compacta_e_nao_utm():
+    # Norte UTM nunca começa com zero: a linha é o par compacto, não leste/norte
+    latitude, longitude, valido, formato = _uma("240137,72 0492142,51")
+    assert valido and formato == FORMATO_COMPACTO
+    assert latitude == pytest.approx(LATITUDE) and longitude == pytest.approx(LONGITUDE)
+
+@pytest.mark.parametrize("linha", [
+    "95.0 -49.0",                       # latitude acima de 90
+    "-24.0 -181.0",                     # longitude acima de 180
+    "-24°61'00\" -49°21'42.51\"",        # minutos acima de 59
+    "246137,72 492142,51",              # minutos acima de 59 no compacto
+    "23K 050000 7340000",               # leste abaixo da faixa UTM
+    "23K 950000 7340000",               # leste acima da faixa UTM
+    "23X 500000 9500000",               # latitude acima de 84 (norte da faixa UTM)
+    "61K 500000 7340000",               # zona inexistente
+    "não é coordenada",
+])
+def test_fora_da_faixa_ou_invalida(linha):
+    latitude, longitude, valido, formato = _uma(linha)
+    assert not valido
+    assert np.isnan(latitude) and np.isnan(longitude)
+    if linha == "não é coordenada":
+        assert formato == FORMATO_INVALIDO
+
+def test_linhas_invalidas_numeradas_pelo_texto():
+    texto = "\n-24.0 -49.0\n\n   \nlixo\n-24.0 -49.0\n95.0 -49.0\n"
+    convertidas = interpretar_coordenadas(texto)
+    assert len(convertidas.linhas) == 4
+    assert list(convertidas.validos) == [True, False, True, False]
+    assert linhas_invalidas(convertidas) == [(5, "lixo"), (7, "95.0 -49.0")]
+
+def test_texto_vazio():
+    convertidas = interpretar_coordenadas("\n  \n")
+    assert len(convertidas.latitudes) == 0 and linhas_invalidas(convertidas) == []
+
+def test_converter_valores():
+    valores = ["-24°01'37.72\"", "24°01'37.72\"S", "-24,027144", "240137,72", "0492142,51", None, "", "abc", "181", "246137,72"]
+    resultado, validos = converter_valores(valores)
+    esperado = [LATITUDE, LATITUDE, -24.027144, LATITUDE, LONGITUDE]
+    assert list(validos) == [True] * 5 + [False] * 5
+    assert resultado[:5] == pytest.approx(esperado)
+    assert np.isnan(resultado[5:]).all()
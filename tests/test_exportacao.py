@@ -0,0 +1,44 @@
+"""
+Testes da escolha do formato de exportação e do KML simples (extrator.exportacao).
+"""
+# Bibliotecas padrão do Python
+import zipfile
+from io import BytesIO
+
+# Bibliotecas de terceiros
+import numpy as np
+import pytest
+
+# Módulos do projeto
+from extrator.exportacao import FORMATO_CSV, FORMATO_GEOJSON, FORMATO_KML, FORMATO_KMZ, exportar, formato_pela_extensao
+from extrator.geometria import ColecaoGeometrias
+from extrator.leitura_kml import carregar_geometrias
+
+@pytest.mark.parametrize("caminho, formato", [
+    ("area.kmz", FORMATO_KMZ),
+    ("area.KML", FORMATO_KML),
+    ("saida/area.geojson", FORMATO_GEOJSON),
+    ("area.csv", FORMATO_CSV),
+])
+def test_formato_pela_extensao(caminho, formato):
+    assert formato_pela_extensao(caminho) == formato
+
+def test_formato_informado_prevalece():
+    assert formato_pela_extensao("area.txt", FORMATO_GEOJSON) == FORMATO_GEOJSON
+
+@pytest.mark.parametrize("caminho", ["area.shp", "area", "consolidado.txt"])
+def test_extensao_desconhecida(caminho):
+    with pytest.raises(ValueError, match="extensão desconhecida"):
+        formato_pela_extensao(caminho)
+
+def test_kml_simples_e_lido_de_volta():
+    geometrias = ColecaoGeometrias()
+    geometrias.adicionar_vertices(np.array([[-24.0, -49.0], [-24.1, -49.0], [-24.1, -49.1]]), nome="Área")
+    destino = BytesIO()
+    exportar(geometrias, FORMATO_KML, destino)
+    dados = destino.getvalue()
+    assert not zipfile.is_zipfile(BytesIO(dados))
+    assert dados.startswith(b"<?xml")
+    lidas = carregar_geometrias(BytesIO(dados), "area.kml")
+    assert lidas.nomes == ["Área"]
+    assert lidas.anel(0)[:3] == pytest.approx(geometrias.anel(0)[:3])
@@ -0,0 +1,40 @@
+"""
+Testes do histórico de relatórios (extrator.historico).
+"""
+# Bibliotecas padrão do Python
+import threading
+
+# Módulos do projeto
+from extrator.historico import HistoricoOcorrencias
+
+RELATORIO = {
+    "numero_relatorio": "1", "data_relatorio": "01/02/2026", "latitude": "-23.5", "longitude": "-46.6",
+    "municipio": "ALAMBARI", "numero_webaia": "W1",
+}
+
+def test_leitura_nao_ve_gravacao_em_andamento(tmp_path):
+    historico = HistoricoOcorrencias(str(tmp_path / "historico.sqlite3"))
+    historico.registrar(RELATORIO, b"%PDF")
+    vistos = []
+
+    def ler():
+        vistos.append((len(historico), len(historico.buscar(numero_webaia="W1"))))
+
+    # Transação aberta na conexão de escrita, como no meio de registrar()
+    with historico.trava:
+        historico.conexao.execute("BEGIN")
+        historico.conexao.execute(
+            "INSERT INTO relatorios (chave, dados, criado_em, numero_webaia) VALUES ('outra', '{}', 'agora', 'W1')"
+        )
+        leitor = threading.Thread(target=ler)
+        leitor.start()
+        leitor.join(10)
+        historico.conexao.rollback()
+    assert vistos == [(1, 1)]
+    historico.fechar()
+
+def test_banco_em_memoria():
+    historico = HistoricoOcorrencias(":memory:")
+    historico.registrar(RELATORIO)
+    assert len(historico) == 1
+    assert [registro["numero_webaia"] for registro in historico.proximos(-23.5, -46.6)] == ["W1"]
@@ -0,0 +1,47 @@
+"""
+Testes da página "Análise de Ocorrências" com o AppTest do Streamlit.
+"""
+# Bibliotecas padrão do Python
+import os
+
+# Bibliotecas de terceiros
+from streamlit.testing.v1 import AppTest
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _pagina(diretorio_raiz):
+    # O AppTest executa só o corpo desta função, como um script isolado
+    import sys
+
+    sys.path.insert(0, diretorio_raiz)
+    from pagina_analise import analise_ocorrencias
+
+    analise_ocorrencias()
+
+def _abrir_pagina():
+    return AppTest.from_function(_pagina, args=(DIRETORIO_RAIZ,), default_timeout=30)
+
+def _campo(app, rotulo):
+    return next(campo for campo in app.text_input if campo.label == rotulo)
+
+def _botao(app, rotulo):
+    return next(botao for botao in app.button if botao.label == rotulo)
+
+def test_data_invalida_desabilita_relatorio():
+    app = _abrir_pagina().run()
+    assert not app.exception
+    for data in ("31/13/2026", "12/0", ""):
+        _campo(app, "Data do Relatório (dd/mm/aaaa)").input(data)
+        app.run()
+        assert not app.exception, data
+        assert any("Formato de data inválido" in erro.value for erro in app.error)
+        assert _botao(app, "Visualizar Relatório").disabled
+        assert _botao(app, "Gerar PDF").disabled
+
+def test_data_valida_habilita_relatorio():
+    app = _abrir_pagina().run()
+    _campo(app, "Data do Relatório (dd/mm/aaaa)").input("18/10/2026")
+    app.run()
+    assert not app.exception
+    assert not _botao(app, "Visualizar Relatório").disabled
+    assert not _botao(app, "Gerar PDF").disabled